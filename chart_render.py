@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Static chart image rendering with warm Kaleido workers and a
+content-addressed on-disk image cache
+"""
+
+import atexit
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+
+# Directory for rendered chart images (one file per figure hash)
+IMAGE_CACHE_DIR = os.environ.get(
+    'CHART_IMAGE_CACHE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.chart_cache')
+)
+
+# Size of the image cache in MB; least recently used images are removed
+# once it is exceeded
+IMAGE_CACHE_MB = float(os.environ.get('CHART_IMAGE_CACHE_MB', '256'))
+
+# Number of warm renderer processes
+RENDER_WORKERS = int(os.environ.get('CHART_RENDER_WORKERS', '2'))
+
+
+def _warm_worker():
+    """Start Kaleido once per worker process so later renders reuse it"""
+    try:
+        import kaleido
+        # Kaleido >= 1.0 keeps a persistent browser when the sync server runs
+        if hasattr(kaleido, 'start_sync_server'):
+            kaleido.start_sync_server(silence_warnings=True)
+        pio.to_image({'data': [], 'layout': {}}, format='png', width=10, height=10)
+    except Exception as e:
+        print(f"Warning: could not warm chart renderer: {e}")
+
+
+def _render_json(fig_json, fmt, width, height, scale):
+    """Render a serialized figure inside a worker process"""
+    fig = pio.from_json(fig_json, skip_invalid=True)
+    return pio.to_image(fig, format=fmt, width=width, height=height, scale=scale)
+
+
+def figure_cache_key(fig_json, fmt, width, height, scale):
+    """Hash of the figure data + layout and the output options"""
+    digest = hashlib.sha256()
+    digest.update(fig_json.encode('utf-8'))
+    digest.update(f"|{fmt}|{width}x{height}|{scale}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ChartRenderer:
+    """
+    Pool of warm renderer processes in front of an image cache.
+
+    Identical figures (same data, range and theme) hash to the same key
+    and are rendered only once; afterwards they are served from disk. Every
+    hit refreshes the file's mtime, and after writing, the least recently
+    used images are removed until the cache fits into max_mb.
+    """
+
+    def __init__(self, workers=RENDER_WORKERS, cache_dir=IMAGE_CACHE_DIR, max_mb=IMAGE_CACHE_MB):
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._pool = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_warm_worker)
+        return self._pool
+
+    def _cache_path(self, key, fmt):
+        return os.path.join(self.cache_dir, f"{key}.{fmt}")
+
+    def _read_cache(self, key, fmt):
+        path = self._cache_path(key, fmt)
+        try:
+            with open(path, 'rb') as f:
+                img_bytes = f.read()
+            os.utime(path)
+            return img_bytes
+        except FileNotFoundError:
+            # Not rendered yet or just evicted
+            return None
+
+    def _write_cache(self, key, fmt, img_bytes):
+        # Write to a temp file first so readers never see a partial image
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(img_bytes)
+            os.replace(tmp_path, self._cache_path(key, fmt))
+        except BaseException:
+            # Do not leave partial temp files in the cache (e.g. disk full)
+            os.unlink(tmp_path)
+            raise
+
+    def _trim_cache(self):
+        """Remove the least recently used images until the cache fits into max_bytes"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # Removed by another process
+                pass
+            total -= size
+
+    def render(self, fig, format='png', width=900, height=400, scale=1):
+        """Render a single figure, returns image bytes"""
+        return self.render_many([fig], format=format, width=width, height=height, scale=scale)[0]
+
+    def render_many(self, figs, format='png', width=900, height=400, scale=1):
+        """
+        Render a batch of figures
+
+        Args:
+            figs: List of plotly figures
+            format, width, height, scale: Output options passed to Kaleido
+
+        Returns:
+            list: Image bytes per figure (None where rendering failed)
+        """
+        results = [None] * len(figs)
+        pending = {}  # cache key -> (figure json, [result positions])
+
+        for i, fig in enumerate(figs):
+            fig_json = pio.to_json(fig, validate=False)
+            key = figure_cache_key(fig_json, format, width, height, scale)
+            cached = self._read_cache(key, format)
+            if cached is not None:
+                results[i] = cached
+            elif key in pending:
+                pending[key][1].append(i)
+            else:
+                pending[key] = (fig_json, [i])
+
+        if not pending:
+            return results
+
+        pool = self._get_pool()
+        futures = {
+            key: pool.submit(_render_json, fig_json, format, width, height, scale)
+            for key, (fig_json, _) in pending.items()
+        }
+        for key, future in futures.items():
+            try:
+                img_bytes = future.result()
+            except Exception as e:
+                print(f"Error rendering chart image: {e}")
+                continue
+            self._write_cache(key, format, img_bytes)
+            for i in pending[key][1]:
+                results[i] = img_bytes
+
+        self._trim_cache()
+        return results
+
+    def close(self):
+        """Shut down the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+_renderer = None
+
+
+def get_renderer():
+    """Shared renderer for the current process"""
+    global _renderer
+    if _renderer is None:
+        _renderer = ChartRenderer()
+        atexit.register(_renderer.close)
+    return _renderer
+
+
+if __name__ == '__main__':
+    import plotly.graph_objects as go
+    import time
+
+    fig = go.Figure(go.Scatter(x=[1, 2, 3], y=[100, 110, 105]))
+    renderer = get_renderer()
+    for attempt in ('cold', 'cached'):
+        t0 = time.perf_counter()
+        img = renderer.render(fig)
+        print(f"{attempt}: {len(img) if img else 0} bytes in {time.perf_counter() - t0:.3f}s")
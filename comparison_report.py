@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Generates the comparison documents (index_vergleich.md, its HTML version
+index_vergleich_tmp.html and währungs.md) from the market data instead of maintaining them by hand
+
+All metrics are computed for every month-end of the history at once
+(running maxima, cumulative sums), so documents for any end date - or for
+all month-ends - are only a lookup and a rendering step.
+
+Examples:
+    # Current documents, written over the files in the repository
+    python comparison_report.py --start 2000-12-31
+
+    # One set per month-end since 2010 in reports/
+    python comparison_report.py --start 2009-12-31 --all-month-ends --out-dir reports
+"""
+import argparse
+import html
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from data_cache import default_fetch
+from market_data import INDEXES, CURRENCY_RATES, BASE_CURRENCIES, convert_to_currency
+
+# Price (without dividends) counterparts of the total return indexes, used
+# for the dividend share; fetched through the shared symbol cache
+PRICE_INDEXES = {
+    'SMI (TR)': '^SSMI',
+    'S&P 500 (TR)': '^GSPC',
+    'NASDAQ-100 (TR)': '^NDX'
+}
+
+DEFAULT_BENCHMARK = 'S&P 500 (TR)'
+
+HTML_STYLE = """
+body { font-family: -apple-system, "Segoe UI", Ubuntu, sans-serif; font-size: 14px; line-height: 22px; padding: 0 26px; max-width: 1000px; }
+table { border-collapse: collapse; margin: 12px 0; }
+th, td { border: 1px solid #ccc; padding: 4px 10px; }
+th { background: #f0f0f0; text-align: left; }
+td.num { text-align: right; }
+"""
+
+
+def _de(value, decimals=1, suffix='', sign=False):
+    """German number format (1.234,5), '–' for missing values"""
+    if value is None or not np.isfinite(value):
+        return '–'
+    text = f"{value:{'+' if sign else ''},.{decimals}f}"
+    return text.replace(',', '_').replace('.', ',').replace('_', '.') + suffix
+
+
+def batch_metrics(values, start_row, benchmark_col=None, periods_per_year=12):
+    """
+    Metrics from start_row to every later row, for all columns at once
+
+    Args:
+        values: Array (T x N) of month-end values, forward filled
+        start_row: Row of the start date
+        benchmark_col: Column the betas are computed against
+
+    Returns:
+        dict of arrays (T x N), NaN up to start_row: 'total_return' and
+        'cagr' (in %), 'volatility' (annualized, %), 'max_drawdown' (%),
+        'peak' / 'trough' (row of the largest drawdown) and 'beta'
+    """
+    values = np.asarray(values, dtype=np.float64)[start_row:]
+    rows, n = values.shape
+    months = np.arange(rows)[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = values / values[0]
+        total_return = (growth - 1) * 100
+        cagr = (growth ** (periods_per_year / months) - 1) * 100
+
+        # Volatility of the log returns from the start to each end
+        log_returns = np.vstack([np.zeros((1, n)), np.diff(np.log(values), axis=0)])
+        sum1 = np.cumsum(log_returns, axis=0)
+        sum2 = np.cumsum(log_returns ** 2, axis=0)
+        variance = (sum2 - sum1 ** 2 / months) / (months - 1)
+        volatility = np.sqrt(np.clip(variance, 0, None) * periods_per_year) * 100
+
+        # Largest drawdown up to each end, with the rows of its peak and trough
+        running_max = np.fmax.accumulate(values, axis=0)
+        drawdown = values / running_max - 1
+        max_drawdown = np.fmin.accumulate(drawdown, axis=0)
+        trough = np.maximum.accumulate(np.where(drawdown == max_drawdown, months, 0), axis=0)
+        peak_rows = np.maximum.accumulate(np.where(values >= running_max, months, 0), axis=0)
+        peak = np.take_along_axis(peak_rows, trough, axis=0)
+
+        beta = np.full((rows, n), np.nan)
+        if benchmark_col is not None:
+            simple = np.vstack([np.zeros((1, n)), values[1:] / values[:-1] - 1])
+            bench = simple[:, benchmark_col:benchmark_col + 1]
+            s_x = np.cumsum(simple, axis=0)
+            s_b = np.cumsum(bench, axis=0)
+            cov = np.cumsum(simple * bench, axis=0) - s_x * s_b / months
+            var = np.cumsum(bench ** 2, axis=0) - s_b ** 2 / months
+            beta = cov / var
+
+    def pad(array, fill=np.nan):
+        return np.vstack([np.full((start_row, n), fill), array])
+
+    return {
+        'total_return': pad(total_return),
+        'cagr': pad(cagr),
+        'volatility': pad(volatility),
+        'max_drawdown': pad(max_drawdown * 100),
+        'peak': pad(peak + start_row, 0).astype(int),
+        'trough': pad(trough + start_row, 0).astype(int),
+        'beta': pad(beta)
+    }
+
+
+class ComparisonData:
+    """
+    Month-end panels (local currency, base currency, price indexes, FX) and
+    their metrics for every end date after start_date
+    """
+
+    def __init__(self, all_data, start_date, assets=None, base_currency='CHF',
+                 benchmark=DEFAULT_BENCHMARK, price_series=None):
+        self.start_date = pd.Timestamp(start_date)
+        self.base_currency = base_currency
+        self.indexes = [idx for idx in INDEXES if assets is None or idx['name'] in assets]
+        self.assets = [idx['name'] for idx in self.indexes]
+        self.benchmark = benchmark if benchmark in self.assets else None
+
+        def month_ends(frame):
+            return frame.resample('ME').last().reindex(self.month_ends).ffill().set_axis(self.dates)
+
+        local = pd.DataFrame({idx['name']: all_data.series(idx['ticker']) for idx in self.indexes})
+        self.month_ends = local.resample('ME').last().index
+        # The current month is labelled with the latest quote, not the coming month-end
+        self.dates = self.month_ends[:-1].append(pd.DatetimeIndex([min(self.month_ends[-1], local.index[-1])]))
+        self.local = month_ends(local)
+        self.base = month_ends(convert_to_currency(all_data, base_currency, self.assets))[self.assets]
+        self.fx = month_ends(pd.DataFrame({ccy: all_data.series(rate) for ccy, rate in CURRENCY_RATES.items()}))
+        self.fx['CHF'] = 1.0
+
+        self.start_row = int(np.searchsorted(self.dates, self.start_date))
+        if self.start_row >= len(self.dates):
+            raise ValueError(f"No data after {self.start_date:%Y-%m-%d}")
+
+        bench_col = self.assets.index(self.benchmark) if self.benchmark else None
+        self.local_metrics = batch_metrics(self.local.to_numpy(), self.start_row)
+        self.base_metrics = batch_metrics(self.base.to_numpy(), self.start_row, bench_col)
+        self.dividend_share = self._dividend_share(price_series or {})
+
+    def _dividend_share(self, price_series):
+        """Share of the log total return that came from dividends, per end row (%)"""
+        share = np.full((len(self.dates), len(self.assets)), np.nan)
+        for col, name in enumerate(self.assets):
+            prices = price_series.get(PRICE_INDEXES.get(name))
+            if prices is None or prices.empty:
+                continue
+            price = prices.resample('ME').last().reindex(self.month_ends).ffill().to_numpy(dtype=np.float64)
+            total = self.local[name].to_numpy(dtype=np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                log_total = np.log(total / total[self.start_row])
+                log_price = np.log(price / price[self.start_row])
+                column = (1 - log_price / log_total) * 100
+            # Only meaningful when the total return was clearly positive
+            column[~(log_total > 0.05)] = np.nan
+            column[:self.start_row + 1] = np.nan
+            share[:, col] = column
+        return share
+
+    def end_rows(self):
+        """Rows of all month-ends after the start"""
+        return range(self.start_row + 1, len(self.dates))
+
+
+def build_sections(data, row):
+    """
+    Content of both documents for one end row, as a format-neutral list
+
+    Returns:
+        dict: 'index_vergleich' and 'währungs' -> list of sections
+            {'title', 'paragraphs', 'header', 'rows'}
+    """
+    start, end = data.dates[data.start_row], data.dates[row]
+    years = (end - start).days / 365.25
+    ccy = data.base_currency
+    local, base = data.local_metrics, data.base_metrics
+
+    returns_rows, risk_rows = [], []
+    for col, idx in enumerate(data.indexes):
+        name = idx['name']
+        peak, trough = base['peak'][row, col], base['trough'][row, col]
+        period = f" ({data.dates[peak]:%Y}–{data.dates[trough]:%Y})" if np.isfinite(base['max_drawdown'][row, col]) else ''
+        returns_rows.append([
+            name,
+            f"{_de(data.local[name].iloc[data.start_row], 0)} {idx['currency']}",
+            f"{_de(data.local[name].iloc[row], 0)} {idx['currency']}",
+            _de(local['total_return'][row, col], 0, ' %', sign=True),
+            _de(local['cagr'][row, col], 1, ' %'),
+            _de(base['cagr'][row, col], 1, ' %')
+        ])
+        risk_rows.append([
+            name,
+            _de(base['max_drawdown'][row, col], 0, ' %') + period,
+            _de(base['volatility'][row, col], 1, ' %'),
+            _de(base['beta'][row, col], 2),
+            _de(data.dividend_share[row, col], 0, ' %')
+        ])
+
+    benchmark = data.benchmark or '–'
+    comparison = [
+        {'title': f"Vergleichende Index-Analyse (Stand: {end:%d.%m.%Y})", 'level': 1,
+         'paragraphs': [], 'header': None, 'rows': None},
+        {'title': '1. Zeitraum der Betrachtung', 'level': 3,
+         'paragraphs': ['Betrachtet wird die Total-Return-Entwicklung (Kurs + reinvestierte Dividenden), '
+                        f"Monatsendwerte von {start:%d.%m.%Y} bis {end:%d.%m.%Y} (ca. {_de(years, 1)} Jahre)."],
+         'header': None, 'rows': None},
+        {'title': '2. Gesamtrenditen und jährliche Renditen', 'level': 3,
+         'paragraphs': [f"Gesamtrendite und CAGR in Lokalwährung, zusätzlich der CAGR in {ccy}."],
+         'header': ['Index', f"Startwert {start:%m.%Y}", f"Endwert {end:%m.%Y}", 'Gesamtrendite',
+                    'CAGR (lokal)', f"CAGR in {ccy}"],
+         'rows': returns_rows},
+        {'title': '3. Risiko- und Volatilitätsvergleich', 'level': 3,
+         'paragraphs': [f"Drawdown, Volatilität (annualisiert, Monatsrenditen) und Beta gegenüber {benchmark} "
+                        f"in {ccy}. Der Dividendenanteil ist der Anteil der Gesamtrendite (logarithmisch), "
+                        "der nicht aus der Kursentwicklung des Preisindex stammt."],
+         'header': ['Index', 'Max. Drawdown', 'Volatilität p.a.', f"Beta (vs. {benchmark})", 'Anteil Dividenden'],
+         'rows': risk_rows},
+        {'title': None, 'level': 0,
+         'paragraphs': [f"Erstellt am {datetime.now():%d.%m.%Y} aus den Kursdaten der Anwendung. "
+                        'Historische Renditen sind keine Garantie für die Zukunft.'],
+         'header': None, 'rows': None}
+    ]
+
+    fx_rows = []
+    for source in BASE_CURRENCIES:
+        for target in BASE_CURRENCIES:
+            if source == target:
+                continue
+            # Rates via CHF: 1 source = fx[source] / fx[target] target
+            then = data.fx[source].iloc[data.start_row] / data.fx[target].iloc[data.start_row]
+            now = data.fx[source].iloc[row] / data.fx[target].iloc[row]
+            fx_rows.append([f"{source} → {target}", f"{then:.5f}", f"{now:.5f}",
+                            _de((then / now - 1) * 100, 2, ' %', sign=True)])
+
+    currencies = [
+        {'title': f"Währungs-Wechselkurse: {start:%Y} vs. {end:%Y}", 'level': 1,
+         'paragraphs': [f"Wechselkurse zwischen EUR, USD und CHF am Monatsende {start:%m.%Y} und {end:%m.%Y}.",
+                        'Relative Änderung = (Kurs damals / Kurs heute − 1) × 100. Ein positiver Wert bedeutet, '
+                        'dass die Ausgangswährung damals stärker gegenüber der Zielwährung war als heute.'],
+         'header': ['Währungspaar', f"Kurs {start:%m.%Y}", f"Kurs {end:%m.%Y}", 'Relative Änderung'],
+         'rows': fx_rows}
+    ]
+    return {'index_vergleich': comparison, 'währungs': currencies}
+
+
+def to_markdown(sections):
+    lines = []
+    for section in sections:
+        if section['title']:
+            lines += ['#' * section['level'] + ' ' + section['title'], '']
+        for paragraph in section['paragraphs']:
+            lines += [paragraph, '']
+        if section['rows']:
+            lines.append('| ' + ' | '.join(section['header']) + ' |')
+            lines.append('|' + '|'.join([' :--- '] + [' ---: '] * (len(section['header']) - 1)) + '|')
+            lines += ['| ' + ' | '.join(row) + ' |' for row in section['rows']]
+            lines.append('')
+    return '\n'.join(lines)
+
+
+def to_html(sections, title):
+    parts = [f"<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"UTF-8\">\n<title>{html.escape(title)}</title>",
+             f"<style>{HTML_STYLE}</style>\n</head>\n<body>"]
+    for section in sections:
+        if section['title']:
+            parts.append(f"<h{section['level']}>{html.escape(section['title'])}</h{section['level']}>")
+        parts += [f"<p>{html.escape(paragraph)}</p>" for paragraph in section['paragraphs']]
+        if section['rows']:
+            parts.append('<table>\n<tr>' + ''.join(f"<th>{html.escape(h)}</th>" for h in section['header']) + '</tr>')
+            for row in section['rows']:
+                cells = [f"<td>{html.escape(row[0])}</td>"] + [f"<td class=\"num\">{html.escape(c)}</td>" for c in row[1:]]
+                parts.append('<tr>' + ''.join(cells) + '</tr>')
+            parts.append('</table>')
+    parts.append('</body>\n</html>\n')
+    return '\n'.join(parts)
+
+
+def write_documents(data, row, out_dir, suffix=''):
+    """Write index_vergleich{suffix}.md, index_vergleich{suffix}_tmp.html and währungs{suffix}.md for one end row"""
+    documents = build_sections(data, row)
+    written = []
+    for name, content in [(f"index_vergleich{suffix}.md", to_markdown(documents['index_vergleich'])),
+                          (f"index_vergleich{suffix}_tmp.html", to_html(documents['index_vergleich'], 'Index-Vergleich')),
+                          (f"währungs{suffix}.md", to_markdown(documents['währungs']))]:
+        path = os.path.join(out_dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        written.append(path)
+    return written
+
+
+def fetch_price_indexes(assets=None):
+    """Price index series for the dividend share (missing ones are skipped)"""
+    from watchlist import symbol_cache
+    symbols = [symbol for name, symbol in PRICE_INDEXES.items() if assets is None or name in assets]
+    series, errors = symbol_cache.get_many(symbols)
+    for symbol, error in errors.items():
+        print(f"Warning: no price index {symbol} ({error}), dividend share left empty")
+    return series
+
+
+def generate(start_date, end_date=None, assets=None, base_currency='CHF', benchmark=DEFAULT_BENCHMARK,
+             out_dir='.', all_month_ends=False, all_data=None):
+    """
+    Regenerate the documents for end_date (default: latest month-end) or for
+    every month-end after start_date
+
+    Returns:
+        list: Written file paths
+    """
+    t0 = time.perf_counter()
+    all_data = all_data if all_data is not None else default_fetch()
+    data = ComparisonData(all_data, start_date, assets, base_currency, benchmark, fetch_price_indexes(assets))
+    t_metrics = time.perf_counter()
+
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    if all_month_ends:
+        for row in data.end_rows():
+            written += write_documents(data, row, out_dir, f"_{data.dates[row]:%Y-%m}")
+    else:
+        end = pd.Timestamp(end_date) if end_date else data.dates[-1]
+        row = int(np.searchsorted(data.dates, end, side='right')) - 1
+        if row <= data.start_row:
+            raise ValueError(f"End date {end:%Y-%m-%d} is not after the start date")
+        written += write_documents(data, row, out_dir)
+
+    elapsed = time.perf_counter() - t0
+    print(f"{len(written)} documents in {elapsed:.2f}s (metrics for all month-ends: {t_metrics - t0:.2f}s incl. data)")
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Regenerate the index and currency comparison documents')
+    parser.add_argument('--start', default='2000-12-31', help='Start date (first month-end on or after it)')
+    parser.add_argument('--end', default=None, help='End date (default: latest month-end)')
+    parser.add_argument('--asset', action='append', default=None, help='Index name (repeatable, default: all)')
+    parser.add_argument('--currency', default='CHF', choices=BASE_CURRENCIES, help='Base currency')
+    parser.add_argument('--benchmark', default=DEFAULT_BENCHMARK, help='Benchmark index for the beta')
+    parser.add_argument('--out-dir', default=os.path.dirname(os.path.abspath(__file__)), help='Output directory')
+    parser.add_argument('--all-month-ends', action='store_true', help='One document set per month-end')
+    args = parser.parse_args()
+
+    generate(args.start, args.end, args.asset, args.currency, args.benchmark, args.out_dir, args.all_month_ends)
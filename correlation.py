@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Rolling correlation and beta for all asset pairs
+
+Window sums of x_i, and x_i * x_j for every pair, come from cumulative sums
+(sum over [t - w, t) = C[t] - C[t - w]), so all pairs and all windows are
+computed in one vectorized pass, O(T * N^2) regardless of the window length.
+"""
+import numpy as np
+import pandas as pd
+
+# Window lengths offered in the dashboard (months)
+WINDOW_OPTIONS = [12, 36, 60]
+
+
+def rolling_moments(returns, window):
+    """
+    Rolling covariance matrices
+
+    Args:
+        returns: Array (T x N) without NaN
+        window: Observations per window
+
+    Returns:
+        ndarray: (T - window + 1) x N x N covariances (sample, ddof=1)
+    """
+    x = np.asarray(returns, dtype=np.float64)
+    # Demeaning keeps the cumulative sums small (better cancellation)
+    x = x - x.mean(axis=0)
+
+    zero = np.zeros((1,) + x.shape[1:])
+    sums = np.concatenate([zero, np.cumsum(x, axis=0)])
+    products = np.concatenate([zero[:, :, None] * zero[:, None, :],
+                               np.cumsum(x[:, :, None] * x[:, None, :], axis=0)])
+
+    window_sums = sums[window:] - sums[:-window]
+    window_products = products[window:] - products[:-window]
+    return (window_products - window_sums[:, :, None] * window_sums[:, None, :] / window) / (window - 1)
+
+
+def rolling_correlation(returns_df, window=36, benchmark=None):
+    """
+    Rolling correlation matrices and betas against a benchmark
+
+    Args:
+        returns_df: DataFrame of periodic returns (date x asset), e.g. from
+            portfolio.monthly_returns()
+        window: Periods per window
+        benchmark: Optional asset name the betas are computed against
+
+    Returns:
+        dict: 'assets', 'dates' (window end dates), 'correlation'
+            (windows x N x N, float32), 'beta' (windows x N, float32, only
+            with a benchmark) and 'full' (N x N correlation over all dates)
+    """
+    returns_df = returns_df.dropna(how='any')
+    assets = list(returns_df.columns)
+    values = returns_df.to_numpy(dtype=np.float64)
+    result = {
+        'assets': assets,
+        'dates': returns_df.index[window - 1:],
+        'full': np.corrcoef(values, rowvar=False).reshape(len(assets), len(assets)) if len(values) > 1 else None
+    }
+    if len(values) < window or window < 2:
+        result['dates'] = pd.DatetimeIndex([])
+        result['correlation'] = np.empty((0, len(assets), len(assets)), dtype=np.float32)
+        result['beta'] = np.empty((0, len(assets)), dtype=np.float32) if benchmark else None
+        return result
+
+    cov = rolling_moments(values, window)
+    variance = np.clip(np.diagonal(cov, axis1=1, axis2=2), 0, None)
+    std = np.sqrt(variance)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        correlation = cov / (std[:, :, None] * std[:, None, :])
+        result['correlation'] = np.clip(correlation, -1, 1).astype(np.float32)
+        if benchmark is not None:
+            b = assets.index(benchmark)
+            result['beta'] = (cov[:, :, b] / variance[:, b:b + 1]).astype(np.float32)
+        else:
+            result['beta'] = None
+    return result
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+REST endpoints serving the normalized panel and statistics from the
+dashboard's data cache, as Arrow IPC (bulk consumers) or columnar JSON
+
+    GET /api/panel?start=2010-01-01&end=2024-12-31&asset=Gold&asset=SMI (TR)&currency=EUR&format=arrow
+    GET /api/statistics?start=...&end=...&format=json
+    GET /api/snapshots
+    POST /api/snapshots/rollback  {"version": ...}  (X-Admin-Token header)
+"""
+import hmac
+import os
+from datetime import datetime
+
+import pyarrow as pa
+from flask import Blueprint, Response, jsonify, request
+
+from data_cache import data_cache, SERVER_PROCESSES
+from market_data import INDEXES, BASE_CURRENCIES
+
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+
+# Token required for rollbacks (rollbacks are disabled without it)
+ADMIN_TOKEN = os.environ.get('CHARTS_ADMIN_TOKEN')
+
+api = Blueprint('data_api', __name__, url_prefix='/api')
+
+
+class InvalidRequest(ValueError):
+    """Bad query parameters (answered with 400)"""
+
+
+def _parse_query():
+    """Range, assets and base currency from the query string"""
+    start_date = request.args.get('start', '2000-01-01')
+    end_date = request.args.get('end', datetime.now().strftime('%Y-%m-%d'))
+    for value in (start_date, end_date):
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            raise InvalidRequest(f"Invalid date: {value} (expected YYYY-MM-DD)")
+
+    assets = request.args.getlist('asset') or None
+    known = {idx['name'] for idx in INDEXES}
+    if assets is not None and not set(assets) <= known:
+        raise InvalidRequest(f"Unknown assets: {sorted(set(assets) - known)}")
+
+    base_currency = request.args.get('currency', 'CHF').upper()
+    if base_currency not in BASE_CURRENCIES:
+        raise InvalidRequest(f"Unsupported currency: {base_currency}")
+
+    return start_date, end_date, assets, base_currency
+
+
+def _wants_arrow():
+    requested = request.args.get('format')
+    if requested:
+        return requested == 'arrow'
+    return request.accept_mimetypes.best_match([ARROW_MIMETYPE, 'application/json']) == ARROW_MIMETYPE
+
+
+def _arrow_response(table, version):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    response = Response(sink.getvalue().to_pybytes(), mimetype=ARROW_MIMETYPE)
+    response.headers['X-Data-Version'] = version
+    return response
+
+
+def _json_response(payload, version):
+    response = jsonify({'version': version, **payload})
+    response.headers['X-Data-Version'] = version
+    return response
+
+
+@api.errorhandler(InvalidRequest)
+def _invalid_request(e):
+    return jsonify({'error': str(e)}), 400
+
+
+@api.route('/panel')
+def panel():
+    """Normalized month-end panel (base 100) for a range, assets and currency"""
+    start_date, end_date, assets, base_currency = _parse_query()
+    version, df = data_cache.get_panel(start_date, end_date, assets, base_currency)
+
+    if _wants_arrow():
+        table = pa.Table.from_pandas(df.rename_axis('date').reset_index(), preserve_index=False)
+        table = table.replace_schema_metadata({
+            'version': version, 'base_currency': base_currency
+        })
+        return _arrow_response(table, version)
+
+    return _json_response({
+        'base_currency': base_currency,
+        'dates': df.index.strftime('%Y-%m-%d').tolist(),
+        'columns': {
+            name: [None if value != value else round(float(value), 4) for value in df[name]]
+            for name in df.columns
+        }
+    }, version)
+
+
+@api.route('/statistics')
+def statistics():
+    """Total return and CAGR per index for a range, assets and currency"""
+    start_date, end_date, assets, base_currency = _parse_query()
+    version, stats = data_cache.get_statistics(start_date, end_date, assets, base_currency)
+
+    columns = {
+        'name': [stat['name'] for stat in stats],
+        'total_return': [stat['total_return'] for stat in stats],
+        'cagr': [stat['cagr'] for stat in stats]
+    }
+
+    if _wants_arrow():
+        table = pa.table(columns).replace_schema_metadata({
+            'version': version, 'base_currency': base_currency
+        })
+        return _arrow_response(table, version)
+
+    return _json_response({'base_currency': base_currency, 'columns': columns}, version)
+
+
+@api.route('/snapshots')
+def snapshots():
+    """
+    Kept data snapshots (version, content hash, creation time, sources),
+    newest first; 'live' is the version with live quotes, if any
+    """
+    live = data_cache.version if data_cache.version != data_cache.snapshot_version else None
+    return jsonify({'current': data_cache.snapshot_version, 'live': live, 'snapshots': data_cache.snapshots.list()})
+
+
+@api.route('/snapshots/rollback', methods=['POST'])
+def rollback():
+    """Serve an earlier snapshot again: {"version": ...} (default: the previous one)"""
+    token = request.headers.get('X-Admin-Token', '')
+    if not ADMIN_TOKEN or not hmac.compare_digest(token, ADMIN_TOKEN):
+        return jsonify({'error': 'Rollback requires a valid X-Admin-Token (CHARTS_ADMIN_TOKEN)'}), 403
+    if SERVER_PROCESSES > 1:
+        # Would only roll back the worker that receives the request
+        return jsonify({'error': 'Rollback needs a single server process (CHARTS_WORKERS=1)'}), 409
+    params = request.get_json(silent=True) or {}
+    try:
+        snapshot = data_cache.rollback(params.get('version'))
+    except KeyError as e:
+        return jsonify({'error': f"Cannot roll back: {e.args[0]}"}), 404
+    return jsonify(snapshot.metadata())
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+In-process cache of the fetched market data and of processed panels,
+shared by the dashboard callbacks and the data API
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from market_data import (fetch_all_data, fetch_offline_data, convert_to_currency, convert_quote, scale_data,
+                         calculate_statistics, HARDCODED_SOURCES, INDEXES)
+from profiling import bypass_cache
+from singleflight import SingleFlight
+from snapshots import Snapshot, SnapshotStore, describe_sources
+
+# Seconds before the raw data is fetched again
+DATA_TTL = int(os.environ.get('CHARTS_DATA_TTL', '3600'))
+
+# Number of processed (range, assets, currency) panels kept per process
+PANEL_CACHE_SIZE = int(os.environ.get('CHARTS_PANEL_CACHE_SIZE', '256'))
+
+# Converted (unfiltered) panels kept, per snapshot version and currency
+CONVERTED_CACHE_SIZE = 12
+
+# 'yahoo' (default) or 'offline' (synthetic data, see fetch_offline_data)
+DATA_SOURCE = os.environ.get('CHARTS_DATA_SOURCE', 'yahoo')
+
+# Simulated download time of the offline source in seconds
+OFFLINE_LATENCY = float(os.environ.get('CHARTS_OFFLINE_LATENCY', '0'))
+
+# Server processes (gunicorn workers, set by gunicorn.conf.py); each has its
+# own DataCache, so features that change the state of one process (e.g.
+# rollback) need a single process
+SERVER_PROCESSES = int(os.environ.get('CHARTS_SERVER_PROCESSES', '1'))
+
+# Appended to the snapshot version (with the tick count) while live quotes
+# are applied, e.g. '3f2a9c1d0b7e4a65-live12'
+LIVE_SUFFIX = '-live'
+
+
+def default_fetch(progress=None):
+    """Fetch function selected by CHARTS_DATA_SOURCE"""
+    if DATA_SOURCE == 'offline':
+        return fetch_offline_data(latency=OFFLINE_LATENCY, progress=progress)
+    return fetch_all_data(progress=progress)
+
+
+class DataCache:
+    """
+    Holds the current snapshot of the raw data and the panels derived from it.
+
+    Every refresh publishes an immutable Snapshot whose version is its
+    content hash; derived results are cached under that version (here and
+    in the other caches), so they are never served for other data, and
+    results of an earlier snapshot are still there after a rollback().
+    Concurrent requests for the same refresh or panel are coalesced into a
+    single computation. Functions registered with on_publish() are called
+    with the version whenever another snapshot becomes current (e.g. to
+    prewarm common views).
+
+    Live quotes (apply_quotes) are kept as a small overlay of the last day
+    next to the snapshot, which is never copied: get_panel() patches only
+    the last month-end row of the cached snapshot panel and returns it
+    under a live version; everything else stays keyed by the snapshot
+    version. The next refresh or rollback drops the overlay.
+    """
+
+    def __init__(self, fetch=default_fetch, ttl=DATA_TTL, max_panels=PANEL_CACHE_SIZE):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_panels = max_panels
+        self.version = None
+        self.snapshot_version = None
+        self._data = None
+        self._live = None
+        self._live_ticks = 0
+        self._fetched_at = 0
+        self._progress = None
+        self._converted = OrderedDict()
+        self._panels = OrderedDict()
+        self.snapshots = SnapshotStore()
+        self._lock = threading.RLock()
+        self._flight = SingleFlight()
+        self._listeners = []
+
+    def on_publish(self, listener):
+        """Call listener(version) whenever a new snapshot is published"""
+        self._listeners.append(listener)
+        return listener
+
+    def _is_fresh(self):
+        return self._data is not None and time.time() - self._fetched_at <= self.ttl
+
+    def is_fresh(self):
+        """True if get_data() returns without fetching"""
+        with self._lock:
+            return self._is_fresh()
+
+    def _report(self, done, total, symbol):
+        self._progress = {'done': done, 'total': total, 'symbol': symbol}
+
+    @property
+    def progress(self):
+        """State of the running refresh ({'done', 'total', 'symbol'}), None if idle"""
+        return self._progress
+
+    def _refresh(self):
+        with self._lock:
+            if self._is_fresh():
+                return self.version, self._data
+
+        # Fetch outside the lock; concurrent callers wait on the single flight
+        self._report(0, 0, None)
+        try:
+            data = self.fetch(progress=self._report)
+        finally:
+            self._progress = None
+
+        sources = describe_sources(data, DATA_SOURCE if self.fetch is default_fetch else self.fetch.__name__,
+                                   HARDCODED_SOURCES)
+        snapshot = self.snapshots.publish(Snapshot(data, sources, datetime.now()))
+        with self._lock:
+            changed = snapshot.version != self.version
+            self._fetched_at = time.time()
+            self._use(snapshot)
+            version, data = self.version, self._data
+
+        if changed:
+            self._notify(version)
+        return version, data
+
+    def _use(self, snapshot):
+        self._data = snapshot.panel
+        self.version = self.snapshot_version = snapshot.version
+        self._live = None
+        self._live_ticks = 0
+
+    def _notify(self, version):
+        for listener in self._listeners:
+            try:
+                listener(version)
+            except Exception as e:
+                print(f"Error in publish listener {listener.__name__}: {e}")
+
+    @property
+    def last_date(self):
+        """Last day (midnight datetime) of the current data, None before the first refresh"""
+        data = self._data
+        return data.dates[-1].to_pydatetime() if data is not None and len(data) else None
+
+    @property
+    def snapshot(self):
+        """Current Snapshot (None before the first refresh)"""
+        return self.snapshots.current
+
+    def snapshot_of(self, version):
+        """Snapshot a data version belongs to (also for live versions), None if no longer kept"""
+        return self.snapshots.get(version.split(LIVE_SUFFIX)[0]) if version else None
+
+    def rollback(self, version=None):
+        """
+        Serve an earlier snapshot again (default: the previous one) for the
+        next TTL period; nothing is recomputed for results still cached
+
+        Raises:
+            KeyError: Unknown version or no earlier snapshot
+        """
+        snapshot = self.snapshots.rollback(version)
+        with self._lock:
+            self._fetched_at = time.time()
+            self._use(snapshot)
+        self._notify(snapshot.version)
+        return snapshot
+
+    def get_data(self):
+        """Current raw data, refreshed when older than the TTL"""
+        with self._lock:
+            if self._is_fresh():
+                return self.version, self._data
+        return self._flight.do('refresh', self._refresh)
+
+    def apply_quotes(self, date, quotes):
+        """
+        Overlay live quotes of one day on the current snapshot; the snapshot
+        and the panels cached for it are not modified
+
+        Quotes of a later day replace the overlay of the previous one.
+
+        Returns:
+            str: New data version (snapshot version + LIVE_SUFFIX + tick count)
+
+        Raises:
+            ValueError: date is before the last day of the data or of the overlay
+        """
+        self.get_data()
+        day = pd.Timestamp(date).normalize()
+        with self._lock:
+            data = self._data
+            if len(data) and day < data.dates[-1]:
+                raise ValueError(f"Cannot set quotes before the last day {data.dates[-1]:%Y-%m-%d}")
+            if self._live is not None and day < self._live[0]:
+                raise ValueError(f"Cannot set quotes before the live day {self._live[0]:%Y-%m-%d}")
+            if self._live is not None and day == self._live[0]:
+                _, live_quotes, prices = self._live
+            else:
+                # Quotes of the day so far: the snapshot's own if it ends on that day
+                same_day = len(data) and day == data.dates[-1]
+                live_quotes = {key: float(data.values[-1, i]) for i, key in enumerate(data.keys)
+                               if same_day and data.valid[-1, i]}
+                prices = {key: data.latest(key) for key in data.keys}
+            quotes = {key: float(price) for key, price in quotes.items() if key in data}
+            # New dicts on every tick: readers keep a consistent overlay without the lock
+            self._live = (day, {**live_quotes, **quotes}, {**prices, **quotes})
+            self._live_ticks += 1
+            self.version = f"{self.snapshot_version}{LIVE_SUFFIX}{self._live_ticks}"
+            return self.version
+
+    def _state(self):
+        """(version, snapshot version, snapshot data, live overlay) of the current data"""
+        self.get_data()
+        with self._lock:
+            return self.version, self.snapshot_version, self._data, self._live
+
+    def _convert(self, version, data, base_currency):
+        converted = convert_to_currency(data, base_currency)
+        with self._lock:
+            self._converted[(version, base_currency)] = converted
+            while len(self._converted) > CONVERTED_CACHE_SIZE:
+                self._converted.popitem(last=False)
+        return converted
+
+    def get_converted(self, base_currency='CHF'):
+        """All indexes of the current snapshot converted to the base currency (unfiltered, without live quotes)"""
+        _, version, data, _ = self._state()
+        return version, self._get_converted(version, data, base_currency)
+
+    def _get_converted(self, version, data, base_currency):
+        with self._lock:
+            if (version, base_currency) in self._converted and not bypass_cache():
+                self._converted.move_to_end((version, base_currency))
+                return self._converted[(version, base_currency)]
+        return self._flight.do(('convert', version, base_currency), self._convert, version, data, base_currency)
+
+    def get_panel(self, start_date, end_date, assets=None, base_currency='CHF', live=True):
+        """
+        Normalized (base 100, month-end) panel for a range, asset set and currency
+
+        With live=True the live quotes are applied to the last row if the
+        live day is in the range; analytic views pass live=False and keep
+        the snapshot panel between ticks.
+
+        Returns:
+            tuple: (version, DataFrame) - the live version only if live quotes are in the panel
+        """
+        version, snapshot_version, data, overlay = self._state()
+        converted = self._get_converted(snapshot_version, data, base_currency)
+        asset_key = tuple(sorted(assets)) if assets is not None else None
+        key = (snapshot_version, start_date, end_date, asset_key, base_currency)
+        df = self._cached_panel(key)
+        if df is None:
+            df = self._flight.do(key, self._scale, key, converted, start_date, end_date, assets)
+
+        if not live or overlay is None or not pd.Timestamp(start_date) <= overlay[0] <= pd.Timestamp(end_date):
+            return snapshot_version, df
+
+        live_key = (version,) + key[1:]
+        panel = self._cached_panel(live_key)
+        if panel is None:
+            panel = self._store_panel(live_key, with_live_quotes(df, converted, overlay, base_currency, start_date))
+        return version, panel
+
+    def _cached_panel(self, key):
+        with self._lock:
+            if key in self._panels and not bypass_cache():
+                self._panels.move_to_end(key)
+                return self._panels[key]
+        return None
+
+    def _scale(self, key, converted, start_date, end_date, assets):
+        if assets is not None:
+            converted = converted[[name for name in converted.columns if name in assets]]
+        return self._store_panel(key, scale_data(converted, start_date, end_date))
+
+    def _store_panel(self, key, df):
+        with self._lock:
+            self._panels[key] = df
+            while len(self._panels) > self.max_panels:
+                self._panels.popitem(last=False)
+        return df
+
+    def get_statistics(self, start_date, end_date, assets=None, base_currency='CHF'):
+        """Statistics of the normalized panel, returns (version, stats)"""
+        version, df = self.get_panel(start_date, end_date, assets, base_currency)
+        return version, calculate_statistics(df)
+
+
+def with_live_quotes(df, converted, overlay, base_currency, start_date):
+    """
+    Copy of a normalized snapshot panel with the live quotes in its last
+    month-end row (appended, forward filled, if the live day starts a new
+    month); only assets quoted on the live day are changed
+
+    Each asset is moved by the ratio of its live value to its last snapshot
+    value, so the history is neither converted nor rescaled again.
+
+    Args:
+        df: Panel of scale_data() for the snapshot
+        converted: Converted snapshot data df was scaled from
+        overlay: (day, quotes of that day, latest prices) of DataCache.apply_quotes
+        base_currency: Currency of converted
+        start_date: Start of the range of df
+    """
+    day, quotes, prices = overlay
+    if df.empty:
+        return df
+    df = df.copy()
+    month_end = day + pd.offsets.MonthEnd(0)
+    if df.index[-1] < month_end:
+        df.loc[month_end] = df.iloc[-1]
+
+    in_range = converted.index >= pd.Timestamp(start_date)
+    for index_config in INDEXES:
+        name = index_config['name']
+        if name not in df.columns or index_config['ticker'] not in quotes:
+            continue
+        history = converted[name].to_numpy()[in_range]
+        valid = np.flatnonzero(~np.isnan(history))
+        if len(valid):
+            last = history[valid[-1]]
+            df.loc[month_end, name] *= convert_quote(prices, index_config, base_currency) / last
+    return df
+
+
+# Shared instance for the server process
+data_cache = DataCache()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Data-quality scan of price series before they reach the warehouse, the
+caches and the charts
+
+All series of a batch are scanned together on one date x series matrix:
+    empty     - series without a single quote                       (error)
+    negative  - values <= 0                                         (error)
+    spike     - an outlier jump that reverts at the next quote      (error)
+    jump      - an outlier jump that persists (level break)         (warning)
+    gap       - distance to the previous quote much longer than the
+                series' usual spacing                               (warning)
+    stale     - STALE_RUN or more identical consecutive quotes      (warning)
+    mismatch  - period returns disagree with a second source        (warning)
+
+Points with errors are quarantined: they are removed from the data and
+reported, the rest of the series is kept.
+
+Usage:
+    python data_quality.py            # scan the configured data source
+    python data_quality.py --warehouse --interval 1d
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from price_panel import PricePanel
+
+# A gap is longer than GAP_FACTOR x the median spacing plus GAP_SLACK_DAYS
+# (daily bars: > 6.5 days, monthly values: a missing month)
+GAP_FACTOR = 1.5
+GAP_SLACK_DAYS = 5.0
+
+# Identical consecutive quotes that count as a stale run
+STALE_RUN = 5
+
+# Outlier: robust z-score of the log return above OUTLIER_Z and a move of at
+# least MIN_JUMP (log return)
+OUTLIER_Z = 8.0
+MIN_JUMP = 0.1
+
+# Largest difference of period log returns between two sources
+CROSS_TOLERANCE = 0.05
+
+ERROR, WARNING = 'error', 'warning'
+
+
+def _issue(key, check, severity, date, value, detail):
+    return {'key': key, 'check': check, 'severity': severity,
+            'date': pd.Timestamp(date) if date is not None else None,
+            'value': None if value is None or not np.isfinite(value) else float(value),
+            'detail': detail}
+
+
+def _nanmedian(a):
+    """Column medians ignoring NaN (sort based, much faster than np.nanmedian on wide arrays)"""
+    ordered = np.sort(a, axis=0)
+    count = np.count_nonzero(~np.isnan(a), axis=0)
+    lower = np.take_along_axis(ordered, np.clip((count - 1) // 2, 0, None)[None, :], axis=0)[0]
+    upper = np.take_along_axis(ordered, np.clip(count // 2, 0, None)[None, :], axis=0)[0]
+    return np.where(count > 0, (lower + upper) / 2, np.nan)
+
+
+def scan(dates, values, keys, valid=None):
+    """
+    Scan all series of a batch in one pass
+
+    Args:
+        dates: Sorted datetime64 array (T,)
+        values: Array (T x N), NaN where a series has no quote
+        keys: Series names (N,)
+        valid: Optional bool array (T x N), default: finite values
+
+    Returns:
+        tuple: (issues, bad) - list of issue dicts (key, check, severity,
+            date, value, detail) and a bool array (T x N) of the points to
+            quarantine
+    """
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(values) if valid is None else np.asarray(valid, dtype=bool) & np.isfinite(values)
+    keys = list(keys)
+    dates = np.asarray(dates, dtype='datetime64[s]')
+    rows, n = values.shape
+    issues = []
+
+    for col in np.flatnonzero(~valid.any(axis=0)):
+        issues.append(_issue(keys[col], 'empty', ERROR, None, None, 'no quotes'))
+
+    # Previous and next quote of every point (row index, -1 / rows if none)
+    index = np.arange(rows)[:, None]
+    last = np.maximum.accumulate(np.where(valid, index, -1), axis=0)
+    prev = np.vstack([np.full((1, n), -1), last[:-1]])
+    first = np.minimum.accumulate(np.where(valid, index, rows)[::-1], axis=0)[::-1]
+    nxt = np.vstack([first[1:], np.full((1, n), rows)])
+    has_prev = valid & (prev >= 0)
+    has_next = valid & (nxt < rows)
+    prev_values = np.take_along_axis(values, np.clip(prev, 0, None), axis=0)
+
+    negative = valid & (values <= 0)
+
+    days = dates.astype(np.int64) / 86400.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        spacing = np.where(has_prev, days[:, None] - days[np.clip(prev, 0, None)], np.nan)
+        usual = _nanmedian(spacing)
+        gap = has_prev & (spacing > GAP_FACTOR * usual + GAP_SLACK_DAYS)
+
+        # Runs of identical quotes: repeats since the last change
+        same = has_prev & (values == prev_values)
+        repeats = np.cumsum(same, axis=0)
+        run = repeats - np.maximum.accumulate(np.where(valid & ~same, repeats, 0), axis=0)
+        next_same = has_next & np.take_along_axis(same, np.clip(nxt, 0, rows - 1), axis=0)
+        stale = valid & (run >= STALE_RUN - 1) & ~next_same
+
+        log_returns = np.where(has_prev & (values > 0) & (prev_values > 0),
+                               np.log(values / prev_values), np.nan)
+        median = _nanmedian(log_returns)
+        mad = _nanmedian(np.abs(log_returns - median)) * 1.4826
+        outlier = (np.abs(log_returns - median) > OUTLIER_Z * mad) & (np.abs(log_returns) > MIN_JUMP)
+        next_returns = np.take_along_axis(log_returns, np.clip(nxt, 0, rows - 1), axis=0)
+        next_outlier = has_next & np.take_along_axis(outlier, np.clip(nxt, 0, rows - 1), axis=0)
+        spike = outlier & next_outlier & (np.sign(next_returns) == -np.sign(log_returns))
+        jump = outlier & ~spike & ~np.vstack([np.zeros((1, n), dtype=bool), spike[:-1]])
+        # The return back from a spike is not a jump of its own
+        for row, col in zip(*np.nonzero(spike)):
+            jump[nxt[row, col], col] = False
+
+    for row, col in zip(*np.nonzero(negative)):
+        issues.append(_issue(keys[col], 'negative', ERROR, dates[row], values[row, col], 'value <= 0'))
+    for row, col in zip(*np.nonzero(spike)):
+        issues.append(_issue(keys[col], 'spike', ERROR, dates[row], values[row, col],
+                             f"{np.expm1(log_returns[row, col]):+.1%}, reverted at the next quote"))
+    for row, col in zip(*np.nonzero(jump)):
+        issues.append(_issue(keys[col], 'jump', WARNING, dates[row], values[row, col],
+                             f"{np.expm1(log_returns[row, col]):+.1%} since {dates[prev[row, col]].astype('datetime64[D]')}"))
+    for row, col in zip(*np.nonzero(gap)):
+        issues.append(_issue(keys[col], 'gap', WARNING, dates[row], values[row, col],
+                             f"{spacing[row, col]:.0f} days since the previous quote (usually {usual[col]:.0f})"))
+    for row, col in zip(*np.nonzero(stale)):
+        issues.append(_issue(keys[col], 'stale', WARNING, dates[row], values[row, col],
+                             f"{run[row, col] + 1} identical quotes"))
+
+    return issues, negative | spike
+
+
+def cross_check(key, series, reference, tolerance=CROSS_TOLERANCE, freq='ME'):
+    """
+    Compare the period returns of a series with a second source
+
+    Levels may differ (other base or dividend treatment); only returns over
+    the same periods are compared.
+
+    Returns:
+        list: One 'mismatch' issue (dated at the worst period) if any period
+            differs by more than tolerance, else empty
+    """
+    if series.empty or reference.empty:
+        return []
+    joined = pd.concat([series.resample(freq).last(), reference.resample(freq).last()], axis=1).dropna()
+    if len(joined) < 2:
+        return []
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.log(joined / joined.shift(1)).iloc[1:]
+    difference = np.abs((returns.iloc[:, 0] - returns.iloc[:, 1]).to_numpy())
+    flagged = int((difference > tolerance).sum())
+    if not flagged:
+        return []
+    worst = int(np.nanargmax(difference))
+    return [_issue(key, 'mismatch', WARNING, returns.index[worst], joined.iloc[worst + 1, 0],
+                   f"{flagged} of {len(difference)} periods differ from the second source by more than "
+                   f"{tolerance:.0%}, worst: {np.expm1(returns.iloc[worst, 0]):+.1%} vs. "
+                   f"{np.expm1(returns.iloc[worst, 1]):+.1%}")]
+
+
+def validate_panel(panel, references=None):
+    """
+    Scan a PricePanel and quarantine its bad points
+
+    Args:
+        panel: PricePanel
+        references: Optional dict key -> Series of a second source
+
+    Returns:
+        tuple: (panel, report) - the panel without quarantined points and a
+            dict with 'issues', 'quarantined' (number of points) and 'seconds'
+    """
+    t0 = time.perf_counter()
+    issues, bad = scan(panel.days.astype('datetime64[D]'), panel.values, panel.keys, panel.valid)
+    for key, reference in (references or {}).items():
+        if key in panel:
+            issues += cross_check(key, panel.series(key), reference)
+
+    if bad.any():
+        values = np.where(bad, np.float32('nan'), panel.values)
+        panel = PricePanel(panel.days, values, panel.valid & ~bad, panel.keys, panel.symbols)
+    return panel, {'issues': issues, 'quarantined': int(bad.sum()), 'seconds': time.perf_counter() - t0}
+
+
+def validate_bars(bars_by_symbol):
+    """
+    Scan warehouse bars (see warehouse.normalize_bars) of several symbols on
+    their close prices and split off the quarantined rows
+
+    Returns:
+        tuple: (clean, quarantined, report) - dicts symbol -> bars, the
+            quarantined bars carry the 'check' and 'detail' of their error
+    """
+    t0 = time.perf_counter()
+    closes = pd.concat({symbol: bars.drop_duplicates('date', keep='last').set_index('date')['close']
+                        for symbol, bars in bars_by_symbol.items()}, axis=1).sort_index()
+    issues, bad = scan(closes.index.to_numpy(), closes.to_numpy(dtype=np.float64), closes.columns)
+
+    errors = {(issue['key'], issue['date']): issue for issue in issues if issue['severity'] == ERROR}
+    clean, quarantined = {}, {}
+    for col, symbol in enumerate(closes.columns):
+        bars = bars_by_symbol[symbol]
+        bad_dates = closes.index[bad[:, col]]
+        is_bad = bars['date'].isin(bad_dates).to_numpy()
+        clean[symbol] = bars[~is_bad].reset_index(drop=True)
+        if is_bad.any():
+            rows = bars[is_bad].reset_index(drop=True)
+            reasons = [errors.get((symbol, pd.Timestamp(date)), {}) for date in rows['date']]
+            rows['check'] = [reason.get('check', '') for reason in reasons]
+            rows['detail'] = [reason.get('detail', '') for reason in reasons]
+            quarantined[symbol] = rows
+
+    report = {'issues': issues, 'quarantined': int(bad.sum()), 'seconds': time.perf_counter() - t0}
+    return clean, quarantined, report
+
+
+def print_report(report, label='Data quality'):
+    """Log a scan report (errors and warnings, one line each)"""
+    issues = report['issues']
+    errors = sum(issue['severity'] == ERROR for issue in issues)
+    print(f"{label}: {errors} errors, {len(issues) - errors} warnings, "
+          f"{report['quarantined']} points quarantined ({report['seconds'] * 1000:.1f} ms)")
+    for issue in issues:
+        date = f"{issue['date']:%Y-%m-%d}" if issue['date'] is not None else '-'
+        print(f"  {issue['severity']:<8}{issue['check']:<10}{issue['key']:<14}{date:<12}{issue['detail']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scan price data for gaps, stale runs, outliers and mismatches')
+    parser.add_argument('--warehouse', action='store_true', help='Scan all symbols in the Parquet warehouse')
+    parser.add_argument('--interval', default='1d', help='Warehouse interval')
+    args = parser.parse_args()
+
+    if args.warehouse:
+        from warehouse import load_close_panel
+        t0 = time.perf_counter()
+        closes = load_close_panel(interval=args.interval)
+        print(f"Loaded {closes.shape[1]} symbols x {closes.shape[0]} dates in {time.perf_counter() - t0:.2f}s")
+        t0 = time.perf_counter()
+        issues, bad = scan(closes.index.to_numpy(), closes.to_numpy(), closes.columns)
+        print_report({'issues': issues, 'quarantined': int(bad.sum()), 'seconds': time.perf_counter() - t0},
+                     f"Warehouse [{args.interval}]")
+    else:
+        # The configured source already validates while fetching
+        from data_cache import default_fetch
+        default_fetch()
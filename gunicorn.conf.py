@@ -0,0 +1,21 @@
+# Gunicorn settings:
+#     gunicorn -c gunicorn.conf.py server:server
+# The server keeps state in its process: the data cache and its snapshots,
+# chart jobs, the live feed and prewarmed charts. One worker with many
+# threads is the default; identical concurrent requests are coalesced by
+# the single-flight layer. With CHARTS_WORKERS > 1 every worker keeps its
+# own cache and the features that need one process are refused (see
+# SERVER_PROCESSES in data_cache.py).
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('CHARTS_WORKERS', '1'))
+threads = int(os.environ.get('CHARTS_THREADS', '16'))
+worker_class = 'gthread'
+timeout = 120
+
+
+def on_starting(server):
+    # Tell the workers how many processes and threads serve the app (also with -w/--threads on the command line)
+    os.environ['CHARTS_SERVER_PROCESSES'] = str(server.cfg.workers)
+    os.environ['CHARTS_THREADS'] = str(server.cfg.threads)
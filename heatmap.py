@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Annualized return for every (start month, end month) pair of an asset,
+computed in one vectorized pass from cumulative log-returns
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from singleflight import SingleFlight
+
+# Shortest holding period shown (shorter periods annualize to extreme values)
+MIN_MONTHS = 12
+
+# Matrices kept in memory (assets x currencies x data versions)
+HEATMAP_CACHE_SIZE = 64
+
+
+def cagr_matrix(series, min_months=MIN_MONTHS):
+    """
+    CAGR in % for every start (rows) and end (columns) month-end
+
+    Args:
+        series: Month-end values of one asset (pd.Series, NaN allowed at the start)
+        min_months: Pairs closer than this are left empty
+
+    Returns:
+        tuple: (dates, float32 matrix len(dates) x len(dates), NaN below the diagonal)
+    """
+    series = series.dropna()
+    series = series[series > 0]
+    log_values = np.log(series.to_numpy(dtype=np.float64))
+
+    # log(V_end / V_start) and the holding period in calendar months for all
+    # pairs (from the dates, so months missing in the series still count)
+    log_growth = log_values[None, :] - log_values[:, None]
+    month_numbers = (series.index.year * 12 + series.index.month).to_numpy()
+    months = month_numbers[None, :] - month_numbers[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = np.expm1(log_growth * (12 / months)) * 100
+    cagr[months < min_months] = np.nan
+
+    return series.index, cagr.astype(np.float32)
+
+
+class HeatmapCache:
+    """
+    CAGR matrices per (data version, currency, asset), computed lazily on
+    first use. warm() precomputes all assets of a panel, so switching assets
+    in the view is instant.
+    """
+
+    def __init__(self, max_entries=HEATMAP_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def get(self, version, base_currency, asset, series):
+        key = (version, base_currency, asset)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        return self._flight.do(key, self._compute, key, series)
+
+    def _compute(self, key, series):
+        result = cagr_matrix(series)
+        with self._lock:
+            self._entries[key] = result
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def warm(self, version, base_currency, monthly_panel):
+        """Precompute all assets of a monthly panel"""
+        for asset in monthly_panel.columns:
+            self.get(version, base_currency, asset, monthly_panel[asset])
+
+
+heatmap_cache = HeatmapCache()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Versioned HTTP caching for callback and data API responses
+
+A response is identified by the data version plus the request (method,
+path, query, Accept header and body); that identity is its ETag. While the
+data snapshot is fresh:
+    - a request with a matching If-None-Match is answered with 304
+    - a repeated request is served from memory, without running the view,
+      compressed once per version with brotli or gzip
+
+Only the data API and an allowlist of deterministic Dash callbacks are
+cached; a view can opt out of caching its current response with no_store().
+Requests profiled through the X-Profile header skip the cache.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from flask import Response, g, request
+
+from data_cache import data_cache
+from profiling import bypass_cache
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Memory budget for cached responses (all encodings)
+RESPONSE_CACHE_MB = float(os.environ.get('CHARTS_RESPONSE_CACHE_MB', '64'))
+
+# Bodies smaller than this are not compressed
+MIN_COMPRESS_BYTES = 1024
+
+DASH_ENDPOINT = '/_dash-update-component'
+
+# Headers of the view's response that are replayed from the cache
+REPLAYED_HEADERS = ('X-Data-Version',)
+
+
+def no_store():
+    """Do not cache the response of the current request (e.g. a job was started)"""
+    g.http_no_store = True
+
+
+def _dash_outputs(body):
+    """Output ids of a Dash callback request ('id.prop' strings)"""
+    try:
+        output = json.loads(body)['output']
+    except (ValueError, KeyError, TypeError):
+        return set()
+    return {part.strip('.') for part in output.split('...')}
+
+
+class ResponseCache:
+    """
+    LRU store of response bodies per ETag, with precompressed variants,
+    bounded by RESPONSE_CACHE_MB
+    """
+
+    def __init__(self, cache=data_cache, max_bytes=RESPONSE_CACHE_MB * 1024 * 1024):
+        self.cache = cache
+        self.max_bytes = max_bytes
+        self.paths = ()
+        self.dash_outputs = set()
+        self.hits = 0
+        self.not_modified = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, server, paths=(), dash_outputs=()):
+        """
+        Register the hooks on a Flask app
+
+        Args:
+            paths: GET path prefixes to cache (e.g. '/api/panel')
+            dash_outputs: Callback outputs ('id.prop') whose responses are cached
+        """
+        self.paths = tuple(paths)
+        self.dash_outputs = set(dash_outputs)
+        server.before_request(self._before_request)
+        server.after_request(self._after_request)
+
+    def _is_cacheable(self):
+        if request.method == 'GET':
+            return request.path.startswith(self.paths) if self.paths else False
+        if request.method == 'POST' and request.path == DASH_ENDPOINT:
+            return bool(_dash_outputs(request.get_data(cache=True)) & self.dash_outputs)
+        return False
+
+    def _etag(self, version):
+        digest = hashlib.sha256()
+        for part in (version, request.method, request.full_path, request.headers.get('Accept', '')):
+            digest.update(part.encode())
+            digest.update(b'\0')
+        digest.update(request.get_data(cache=True))
+        return f"{version}-{digest.hexdigest()[:32]}"
+
+    def _before_request(self):
+        g.http_cache_key = None
+        if not self._is_cacheable() or not self.cache.is_fresh() or bypass_cache():
+            return None
+
+        version = self.cache.version
+        etag = self._etag(version)
+        g.http_cache_key = (version, etag)
+
+        if etag in request.if_none_match:
+            self.not_modified += 1
+            return self._not_modified(etag)
+
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+        if entry is not None:
+            self.hits += 1
+            g.http_cache_key = None
+            return self._replay(entry, etag)
+        return None
+
+    def _after_request(self, response):
+        key = getattr(g, 'http_cache_key', None)
+        if key is None or response.status_code != 200 or response.is_streamed:
+            return response
+        if getattr(g, 'http_no_store', False) or self.cache.version != key[0]:
+            return response
+
+        version, etag = key
+        body = response.get_data()
+        entry = {
+            'version': version,
+            'mimetype': response.mimetype,
+            'headers': {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers},
+            'identity': body
+        }
+        if len(body) >= MIN_COMPRESS_BYTES:
+            entry['gzip'] = gzip.compress(body, compresslevel=6)
+            if brotli is not None:
+                entry['br'] = brotli.compress(body, quality=9)
+        self._store(etag, entry)
+        return self._replay(entry, etag)
+
+    def _store(self, etag, entry):
+        size = sum(len(entry[enc]) for enc in ('identity', 'gzip', 'br') if enc in entry)
+        if size > self.max_bytes:
+            return
+        entry['size'] = size
+        with self._lock:
+            # Entries of earlier data versions stay until evicted (a rollback serves them again)
+            if etag in self._entries:
+                self._size -= self._entries.pop(etag)['size']
+            self._entries[etag] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted['size']
+
+    def _replay(self, entry, etag):
+        """Response with the best encoding the client accepts"""
+        accepted = request.accept_encodings
+        encoding = next((enc for enc in ('br', 'gzip') if enc in entry and accepted[enc]), None)
+        response = Response(entry[encoding or 'identity'], mimetype=entry['mimetype'])
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers.update(entry['headers'])
+        return self._add_validators(response, etag)
+
+    def _not_modified(self, etag):
+        return self._add_validators(Response(status=304), etag)
+
+    @staticmethod
+    def _add_validators(response, etag):
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['Vary'] = 'Accept, Accept-Encoding'
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size,
+                    'hits': self.hits, 'not_modified': self.not_modified}
+
+
+# Shared instance for the server process
+response_cache = ResponseCache()
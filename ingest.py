@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Bulk ingest of Yahoo Finance price history into the Parquet warehouse
+
+Examples:
+    python ingest.py ^GDAXI ^SP500TR QQQ GC=F EURCHF=X USDCHF=X --interval 1d --interval 1mo
+    python ingest.py AAPL --import-csv AAPL_since_2024.csv --interval 1mo
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import yfinance as yf
+
+from data_quality import print_report, validate_bars
+from warehouse import WAREHOUSE_DIR, normalize_bars, read_yfinance_csv, write_bars, write_quarantine
+
+
+def fetch_bars(symbol, interval, start, retries=3, backoff=2.0):
+    """Download OHLCV bars for one symbol, retrying with exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            df = yf.Ticker(symbol).history(start=start, interval=interval, auto_adjust=True)
+            if df.empty:
+                raise ValueError('no data returned')
+            return normalize_bars(df)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = backoff * (2 ** attempt)
+            print(f"  {symbol} [{interval}]: {e}, retrying in {delay:.0f}s...")
+            time.sleep(delay)
+
+
+def store(bars_by_symbol, interval, warehouse=WAREHOUSE_DIR):
+    """
+    Scan the bars of one interval in one pass, quarantine bad rows and write
+    the rest to the warehouse
+
+    Returns:
+        dict: symbol -> number of rows written
+    """
+    clean, quarantined, report = validate_bars(bars_by_symbol)
+    print_report(report, f"Data quality [{interval}]")
+    for symbol, rows in quarantined.items():
+        write_quarantine(rows, symbol, interval, warehouse)
+    return {symbol: write_bars(bars, symbol, interval, warehouse) for symbol, bars in clean.items()}
+
+
+def ingest(symbols, intervals, start='2000-01-01', workers=4, retries=3, warehouse=WAREHOUSE_DIR):
+    """
+    Fetch every (symbol, interval) pair with bounded concurrency, validate
+    and write it to the warehouse
+
+    Returns:
+        dict: (symbol, interval) -> number of rows written, or the error message
+    """
+    results = {}
+    fetched = {interval: {} for interval in intervals}
+    jobs = [(symbol, interval) for symbol in symbols for interval in intervals]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_bars, symbol, interval, start, retries): (symbol, interval)
+                   for symbol, interval in jobs}
+        for future in as_completed(futures):
+            symbol, interval = futures[future]
+            try:
+                fetched[interval][symbol] = future.result()
+            except Exception as e:
+                results[(symbol, interval)] = str(e)
+                print(f"  ✗ {symbol} [{interval}]: {e}")
+
+    for interval, bars_by_symbol in fetched.items():
+        if not bars_by_symbol:
+            continue
+        try:
+            for symbol, rows in store(bars_by_symbol, interval, warehouse).items():
+                results[(symbol, interval)] = rows
+                print(f"  ✓ {symbol} [{interval}]: {rows} rows")
+        except Exception as e:
+            for symbol in bars_by_symbol:
+                results[(symbol, interval)] = str(e)
+            print(f"  ✗ [{interval}]: {e}")
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Ingest price history into the Parquet warehouse')
+    parser.add_argument('symbols', nargs='+', help='Yahoo Finance symbols')
+    parser.add_argument('--interval', action='append', dest='intervals',
+                        help='Bar interval (repeatable, default: 1d)')
+    parser.add_argument('--start', default='2000-01-01', help='First date to fetch')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent downloads')
+    parser.add_argument('--retries', type=int, default=3, help='Retries per download')
+    parser.add_argument('--warehouse', default=WAREHOUSE_DIR, help='Warehouse directory')
+    parser.add_argument('--import-csv', help='Import a yf.download CSV for the (single) symbol instead of fetching')
+    args = parser.parse_args()
+    intervals = args.intervals or ['1d']
+
+    if args.import_csv:
+        if len(args.symbols) != 1 or len(intervals) != 1:
+            parser.error('--import-csv needs exactly one symbol and one interval')
+        rows = store({args.symbols[0]: read_yfinance_csv(args.import_csv)}, intervals[0], args.warehouse)
+        print(f"Imported {rows[args.symbols[0]]} rows of {args.symbols[0]} [{intervals[0]}]")
+    else:
+        t0 = time.perf_counter()
+        result = ingest(args.symbols, intervals, args.start, args.workers, args.retries, args.warehouse)
+        failed = [key for key, value in result.items() if isinstance(value, str)]
+        print(f"{len(result) - len(failed)} series written in {time.perf_counter() - t0:.1f}s, {len(failed)} failed")
+        raise SystemExit(1 if failed else 0)
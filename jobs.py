@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Local job queue for slow work (e.g. PDF rendering, cold chart loads) that
+must not block the request threads of the dashboard server
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Number of finished jobs kept for status queries
+MAX_FINISHED_JOBS = 200
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that noticed its cancellation"""
+
+
+def _process_alive(pid):
+    if os.name == 'nt':
+        # Signal 0 is CTRL_C_EVENT on Windows; shared state is for gunicorn
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by another user
+        pass
+    return True
+
+
+class JobQueue:
+    """
+    Runs submitted functions on a process pool (or a thread pool, for jobs
+    that need the server's in-memory caches) and tracks their state.
+
+    Job states: 'queued' -> 'running' -> 'done' | 'failed' | 'cancelled'
+
+    With state_dir, the public state of every job (JSON-serializable
+    results only) is also written to <state_dir>/<job id>.json, so other
+    server processes sharing the directory can answer status() for it.
+    """
+
+    def __init__(self, workers=2, max_finished=MAX_FINISHED_JOBS, threads=False, state_dir=None):
+        self.workers = workers
+        self.max_finished = max_finished
+        self.threads = threads
+        self.state_dir = state_dir
+        self._pool = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self._pool is None:
+            executor = ThreadPoolExecutor if self.threads else ProcessPoolExecutor
+            self._pool = executor(max_workers=self.workers)
+        return self._pool
+
+    def submit(self, fn, *args, **kwargs):
+        """Enqueue fn(*args, **kwargs), returns the job id"""
+        return self._submit(fn, args, kwargs, None)
+
+    def submit_cancellable(self, fn, *args, **kwargs):
+        """
+        Enqueue fn(*args, cancelled=<threading.Event>, **kwargs) (thread pool
+        only); fn should check the event between steps and raise JobCancelled
+        """
+        if not self.threads:
+            raise ValueError('Cancellable jobs need a thread pool (threads=True)')
+        cancelled = threading.Event()
+        return self._submit(fn, args, dict(kwargs, cancelled=cancelled), cancelled)
+
+    def _submit(self, fn, args, kwargs, cancelled):
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'status': 'queued',
+            'created': time.time(),
+            'finished': None,
+            'result': None,
+            'error': None,
+            'pid': os.getpid()
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._trim()
+            future = self._get_pool().submit(fn, *args, **kwargs)
+            job['future'] = future
+            job['cancelled'] = cancelled
+            self._save(job)
+        future.add_done_callback(lambda f, job=job: self._finish(job, f))
+        return job_id
+
+    def _finish(self, job, future):
+        with self._lock:
+            job['finished'] = time.time()
+            if future.cancelled():
+                job['status'] = 'cancelled'
+                self._save(job)
+                return
+            try:
+                job['result'] = future.result()
+                job['status'] = 'done'
+            except JobCancelled:
+                job['status'] = 'cancelled'
+            except Exception as e:
+                job['error'] = str(e)
+                job['status'] = 'failed'
+            finally:
+                self._save(job)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: a queued job never starts, a running cancellable job
+        is signalled to stop. Returns False if the job is unknown or finished.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['finished'] is not None:
+                return False
+            if job['cancelled'] is not None:
+                job['cancelled'].set()
+            future = job['future']
+        future.cancel()
+        return True
+
+    def _trim(self):
+        # Forget the oldest finished jobs (called with the lock held)
+        finished = [job_id for job_id, job in self._jobs.items() if job['finished'] is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+            if self.state_dir:
+                try:
+                    os.remove(self._state_path(job_id))
+                except FileNotFoundError:
+                    pass
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        # Write the public state for other processes (called with the lock held)
+        if not self.state_dir:
+            return
+        os.makedirs(self.state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({key: value for key, value in job.items() if key not in ('future', 'cancelled')}, f)
+            os.replace(tmp_path, self._state_path(job['id']))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def _load(self, job_id):
+        """State of a job of another process, None if unknown"""
+        if not self.state_dir or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._state_path(job_id)) as f:
+                info = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if info['finished'] is None and not _process_alive(info['pid']):
+            info.update(status='failed', error='server process of the job has stopped')
+        return info
+
+    def status(self, job_id):
+        """Public state of a job (without the future), None if unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return self._load(job_id)
+            info = {key: value for key, value in job.items() if key not in ('future', 'cancelled')}
+        if info['status'] == 'queued' and job['future'].running():
+            info['status'] = 'running'
+        return info
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
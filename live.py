@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Live intraday mode: price ticks are overlaid on the current data snapshot
+(see DataCache.apply_quotes) and the latest index values are pushed to all
+browsers over one server-sent-events stream
+
+    GET /api/live  (text/event-stream)
+
+Every tick is converted once into a JSON event; connected clients only
+wait for the next event and write out the preformatted message.
+
+Tick sources are iterables of (timestamp, {ticker: price}):
+    'simulated' - random walk from the last known prices (for testing)
+    'yahoo'     - polls 1-minute bars from yfinance
+"""
+import json
+import math
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from flask import Blueprint, Response, jsonify
+
+from data_cache import data_cache, SERVER_PROCESSES
+from market_data import TICKERS, INDEXES, BASE_CURRENCIES, convert_quote
+
+# Tick source started on the first stream request ('' = live mode disabled)
+LIVE_SOURCE = os.environ.get('CHARTS_LIVE_SOURCE', '')
+
+# Seconds between ticks of the simulated source and polls of the yahoo source
+SIMULATED_INTERVAL = float(os.environ.get('CHARTS_LIVE_INTERVAL', '1'))
+YAHOO_INTERVAL = 60
+
+# Open streams allowed at a time; each holds a request thread, so the
+# default leaves half of the server threads (CHARTS_THREADS) for callbacks
+MAX_CLIENTS = int(os.environ.get('CHARTS_LIVE_MAX_CLIENTS',
+                                 str(max(1, int(os.environ.get('CHARTS_THREADS', '8')) // 2))))
+
+# Comment line sent to idle clients so proxies keep the connection open
+HEARTBEAT_SECONDS = 15
+
+# Wait before restarting a failed tick source
+RETRY_SECONDS = 10
+
+live_api = Blueprint('live_api', __name__, url_prefix='/api')
+
+
+class SimulatedTickSource:
+    """Geometric random walk around the last known prices"""
+
+    def __init__(self, interval=SIMULATED_INTERVAL, volatility=0.0005, seed=None):
+        self.interval = interval
+        self.volatility = volatility
+        self.seed = seed
+
+    def ticks(self, prices):
+        rng = np.random.default_rng(self.seed)
+        prices = {key: price for key, price in prices.items() if math.isfinite(price)}
+        while True:
+            time.sleep(self.interval)
+            for key in prices:
+                prices[key] *= math.exp(rng.normal(0, self.volatility))
+            yield pd.Timestamp.now(), dict(prices)
+
+
+class YahooTickSource:
+    """Latest 1-minute close of every ticker, polled from yfinance"""
+
+    def __init__(self, interval=YAHOO_INTERVAL):
+        self.interval = interval
+
+    def ticks(self, prices):
+        symbols = {symbol: key for key, symbol in TICKERS.items()}
+        while True:
+            bars = yf.download(list(symbols), period='1d', interval='1m', progress=False, auto_adjust=False)
+            if not bars.empty:
+                latest = bars['Close'].ffill().iloc[-1]
+                yield pd.Timestamp.now(), {symbols[symbol]: float(price) for symbol, price in latest.items()
+                                           if symbol in symbols and np.isfinite(price)}
+            time.sleep(self.interval)
+
+
+TICK_SOURCES = {
+    'simulated': SimulatedTickSource,
+    'yahoo': YahooTickSource
+}
+
+
+def make_source(name):
+    """Tick source for a CHARTS_LIVE_SOURCE / --live value (None if disabled)"""
+    if not name:
+        return None
+    if name not in TICK_SOURCES:
+        raise ValueError(f"Unknown live source: {name} (expected one of {sorted(TICK_SOURCES)})")
+    return TICK_SOURCES[name]()
+
+
+class LiveFeed:
+    """
+    Consumes a tick source in a background thread. Each tick is applied to
+    the cached data as a new data version (so charts pick it up), is
+    converted to every base currency once and published as the current
+    event for all stream clients.
+    """
+
+    def __init__(self, source=None, cache=data_cache, max_clients=MAX_CLIENTS):
+        self.source = source
+        self.cache = cache
+        self.max_clients = max_clients
+        self.clients = 0
+        self._version = None
+        self._prices = {}
+        self._previous_close = {}
+        self._seq = 0
+        self._event = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.source is not None
+
+    def start(self):
+        """Start the feed thread (once)"""
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _seed(self):
+        """Take the last prices of the current snapshot as starting point"""
+        _, panel = self.cache.get_data()
+        version = self.cache.snapshot_version
+        if version == self._version:
+            return panel
+        today = pd.Timestamp.now().normalize()
+        self._version = version
+        self._prices = {key: panel.latest(key) for key in TICKERS if key in panel}
+        previous = {key: panel.latest(key, before=today) for key in TICKERS if key in panel}
+        self._previous_close = {
+            index_config['name']: {ccy: convert_quote(previous, index_config, ccy) for ccy in BASE_CURRENCIES}
+            for index_config in INDEXES
+        }
+        return panel
+
+    def _run(self):
+        while True:
+            try:
+                self._seed()
+                for timestamp, quotes in self.source.ticks(self._prices):
+                    self.apply(timestamp, quotes)
+            except Exception as e:
+                print(f"Live feed error: {e}")
+                time.sleep(RETRY_SECONDS)
+
+    def apply(self, timestamp, quotes):
+        """Apply one tick to the cached data and publish the converted values"""
+        self._seed()
+        try:
+            self.cache.apply_quotes(timestamp, quotes)
+        except ValueError as e:
+            print(f"Live tick not stored: {e}")
+        self._prices.update(quotes)
+
+        message = {'time': timestamp.isoformat(timespec='seconds'), 'quotes': {}}
+        for ccy in BASE_CURRENCIES:
+            message['quotes'][ccy] = {}
+            for index_config in INDEXES:
+                value = convert_quote(self._prices, index_config, ccy)
+                previous = self._previous_close[index_config['name']][ccy]
+                if not math.isfinite(value):
+                    continue
+                message['quotes'][ccy][index_config['name']] = {
+                    'value': round(value, 4),
+                    'change': round((value / previous - 1) * 100, 3) if math.isfinite(previous) else None
+                }
+        self.publish(message)
+
+    def publish(self, message):
+        """Make message the current event and wake all stream clients"""
+        payload = json.dumps(message)
+        with self._cond:
+            self._seq += 1
+            self._event = f"id: {self._seq}\ndata: {payload}\n\n"
+            self._cond.notify_all()
+
+    def connect(self):
+        """Reserve a stream slot, False if max_clients streams are open (release with disconnect())"""
+        with self._cond:
+            if self.clients >= self.max_clients:
+                return False
+            self.clients += 1
+            return True
+
+    def disconnect(self):
+        with self._cond:
+            self.clients -= 1
+
+    def stream(self, heartbeat=HEARTBEAT_SECONDS):
+        """Server-sent events for one client (slow clients skip to the newest tick)"""
+        with self._cond:
+            seen = self._seq - 1 if self._event else self._seq
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._seq != seen, timeout=heartbeat)
+                seq, event = self._seq, self._event
+            if seq == seen:
+                yield ': keepalive\n\n'
+                continue
+            seen = seq
+            yield event
+
+
+# Shared feed of the server process
+live_feed = LiveFeed(make_source(LIVE_SOURCE))
+
+
+@live_api.route('/live')
+def live_stream():
+    if not live_feed.enabled:
+        return jsonify({'error': 'Live mode is disabled'}), 404
+    if SERVER_PROCESSES > 1:
+        # Every worker would run its own tick source and overlay
+        return jsonify({'error': 'Live mode needs a single server process (CHARTS_WORKERS=1)'}), 409
+    if not live_feed.connect():
+        return jsonify({'error': 'Too many live streams (CHARTS_LIVE_MAX_CLIENTS)'}), 503
+    live_feed.start()
+    response = Response(live_feed.stream(), mimetype='text/event-stream')
+    # Runs when the stream ends, also if it was never iterated
+    response.call_on_close(live_feed.disconnect)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
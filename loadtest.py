@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Load generator for the dashboard: replays update_chart and
+update_date_labels callback requests over HTTP with random slider ranges
+
+Examples:
+    # Start a server on the offline data source and load it
+    python loadtest.py --spawn --concurrency 20 --duration 30
+
+    # Load an already running instance
+    python loadtest.py --url http://localhost:8000 --concurrency 50 --requests 2000
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from market_data import INDEXES, BASE_CURRENCIES
+
+DASH_ENDPOINT = '/_dash-update-component'
+
+SLIDER_MIN = datetime(2000, 1, 1).timestamp()
+SLIDER_MAX = datetime.now().timestamp()
+YEAR = 365.25 * 24 * 3600
+
+# Output a response must carry to count as a completed request; on a cold
+# cache update_chart only answers with a job id (see poll_chart)
+EXPECTED_OUTPUT = {
+    'update_chart': ('performance-chart', 'figure'),
+    'update_date_labels': ('start-date-label', 'children')
+}
+
+
+def random_slider_values(rng):
+    """Slider range like a user would pick it (at least a year, often to today)"""
+    start = rng.uniform(SLIDER_MIN, SLIDER_MAX - YEAR)
+    if rng.random() < 0.5:
+        end = SLIDER_MAX
+    else:
+        end = rng.uniform(start + YEAR, SLIDER_MAX)
+    return [start, end]
+
+
+def chart_payload(rng):
+    """Request body of the update_chart callback"""
+    assets = [idx['name'] for idx in INDEXES]
+    if rng.random() < 0.2:
+        assets = rng.sample(assets, rng.randint(1, len(assets)))
+    base_currency = 'CHF' if rng.random() < 0.7 else rng.choice(BASE_CURRENCIES)
+    return {
+        'output': '..performance-chart.figure...statistics.children...chart-job.data'
+                  '...chart-poll.disabled...chart-progress.children..',
+        'outputs': [{'id': 'performance-chart', 'property': 'figure'},
+                    {'id': 'statistics', 'property': 'children'},
+                    {'id': 'chart-job', 'property': 'data'},
+                    {'id': 'chart-poll', 'property': 'disabled'},
+                    {'id': 'chart-progress', 'property': 'children'}],
+        'inputs': [{'id': 'date-range-slider', 'property': 'value', 'value': random_slider_values(rng)},
+                   {'id': 'asset-selection', 'property': 'value', 'value': assets},
+                   {'id': 'base-currency', 'property': 'value', 'value': base_currency},
+                   {'id': 'watchlist', 'property': 'data', 'value': []}],
+        'changedPropIds': ['date-range-slider.value'],
+        'state': [{'id': 'chart-job', 'property': 'data', 'value': None}]
+    }
+
+
+def labels_payload(rng):
+    """Request body of the update_date_labels callback"""
+    return {
+        'output': '..start-date-label.children...end-date-label.children..',
+        'outputs': [{'id': 'start-date-label', 'property': 'children'},
+                    {'id': 'end-date-label', 'property': 'children'}],
+        'inputs': [{'id': 'date-range-slider', 'property': 'value', 'value': random_slider_values(rng)}],
+        'changedPropIds': ['date-range-slider.value'],
+        'state': []
+    }
+
+
+def post_json(url, payload, timeout=60):
+    """POST payload as JSON, returns (status, parsed body or None)"""
+    request = Request(url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'})
+    with urlopen(request, timeout=timeout) as response:
+        body = response.read()
+        return response.status, json.loads(body) if body else None
+
+
+def has_output(body, name):
+    """True if a Dash callback response carries the expected output of the callback"""
+    component, prop = EXPECTED_OUTPUT[name]
+    return prop in ((body or {}).get('response') or {}).get(component, {})
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float('nan')
+    index = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LoadTest:
+    """Runs the request mix with a fixed number of concurrent virtual users"""
+
+    def __init__(self, url, concurrency=10, requests_total=None, duration=None, chart_ratio=0.5, seed=0):
+        self.url = url.rstrip('/') + DASH_ENDPOINT
+        self.concurrency = concurrency
+        self.requests_total = requests_total
+        self.duration = duration
+        self.chart_ratio = chart_ratio
+        self.seed = seed
+        self.results = {'update_chart': [], 'update_date_labels': []}
+        self.errors = {'update_chart': 0, 'update_date_labels': 0}
+        # Answered with 200 but without the result (e.g. a chart job was started)
+        self.pending = {'update_chart': 0, 'update_date_labels': 0}
+        self._lock = threading.Lock()
+        self._issued = 0
+
+    def _next_request(self):
+        with self._lock:
+            if self.requests_total is not None and self._issued >= self.requests_total:
+                return False
+            self._issued += 1
+            return True
+
+    def _user(self, user_id, deadline):
+        rng = random.Random(self.seed * 1000 + user_id)
+        while (deadline is None or time.perf_counter() < deadline) and self._next_request():
+            if rng.random() < self.chart_ratio:
+                name, payload = 'update_chart', chart_payload(rng)
+            else:
+                name, payload = 'update_date_labels', labels_payload(rng)
+            t0 = time.perf_counter()
+            try:
+                status, body = post_json(self.url, payload)
+                outcome = 'ok' if status == 200 and has_output(body, name) else 'pending'
+            except (URLError, OSError, ValueError):
+                outcome = 'error'
+            latency = time.perf_counter() - t0
+            with self._lock:
+                if outcome == 'ok':
+                    self.results[name].append(latency)
+                elif outcome == 'pending':
+                    self.pending[name] += 1
+                else:
+                    self.errors[name] += 1
+
+    def run(self):
+        """Run the test, returns the report dict"""
+        t0 = time.perf_counter()
+        deadline = t0 + self.duration if self.duration else None
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for user_id in range(self.concurrency):
+                pool.submit(self._user, user_id, deadline)
+        elapsed = time.perf_counter() - t0
+        return self.report(elapsed)
+
+    def report(self, elapsed):
+        report = {'elapsed': elapsed, 'callbacks': {}}
+        total_ok = total_errors = total_pending = 0
+        for name, latencies in self.results.items():
+            latencies = sorted(latencies)
+            errors = self.errors[name]
+            pending = self.pending[name]
+            count = len(latencies) + errors + pending
+            total_ok += len(latencies)
+            total_errors += errors
+            total_pending += pending
+            report['callbacks'][name] = {
+                'requests': count,
+                'throughput': len(latencies) / elapsed if elapsed else 0,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'pending': pending,
+                'error_rate': errors / count if count else 0
+            }
+        total = total_ok + total_errors + total_pending
+        report['pending'] = total_pending
+        report['throughput'] = total_ok / elapsed if elapsed else 0
+        report['error_rate'] = total_errors / total if total else 0
+        return report
+
+
+def print_report(report, concurrency):
+    print(f"\nConcurrency {concurrency}, {report['elapsed']:.1f}s, "
+          f"{report['throughput']:.1f} req/s, error rate {report['error_rate']:.2%}")
+    print(f"{'Callback':<22}{'Requests':>10}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'Pending':>9}{'Errors':>9}")
+    for name, stats in report['callbacks'].items():
+        print(f"{name:<22}{stats['requests']:>10}{stats['throughput']:>9.1f}{stats['p50_ms']:>10.1f}"
+              f"{stats['p95_ms']:>10.1f}{stats['p99_ms']:>10.1f}{stats['pending']:>9}{stats['error_rate']:>9.2%}")
+    print("Latencies and req/s count completed requests only; pending = answered without the result "
+          "(chart job started on a cold cache)")
+
+
+def spawn_server(port, threads, latency):
+    """Start server.py in --prod mode on the offline data source"""
+    env = dict(os.environ, CHARTS_DATA_SOURCE='offline', CHARTS_OFFLINE_LATENCY=str(latency))
+    process = subprocess.Popen(
+        [sys.executable, 'server.py', '--prod', '--port', str(port), '--threads', str(threads)],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    url = f"http://localhost:{port}"
+    for _ in range(100):
+        try:
+            urlopen(url, timeout=1).close()
+            return process, url
+        except (URLError, OSError):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('server did not start')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Load test the dashboard callbacks')
+    parser.add_argument('--url', default='http://localhost:8000', help='Server to test')
+    parser.add_argument('--spawn', action='store_true', help='Start a server with the offline data source')
+    parser.add_argument('--port', type=int, default=8050, help='Port of the spawned server')
+    parser.add_argument('--threads', type=int, default=8, help='Request threads of the spawned server')
+    parser.add_argument('--latency', type=float, default=2.0, help='Simulated upstream latency of the spawned server')
+    parser.add_argument('--concurrency', type=int, default=10, help='Concurrent virtual users')
+    parser.add_argument('--requests', type=int, default=None, help='Total number of requests')
+    parser.add_argument('--duration', type=float, default=None, help='Test duration in seconds')
+    parser.add_argument('--chart-ratio', type=float, default=0.5, help='Share of update_chart requests')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.requests is None and args.duration is None:
+        args.duration = 30
+
+    server_process = None
+    url = args.url
+    if args.spawn:
+        server_process, url = spawn_server(args.port, args.threads, args.latency)
+        print(f"Spawned offline server at {url}")
+
+    try:
+        test = LoadTest(url, args.concurrency, args.requests, args.duration, args.chart_ratio, args.seed)
+        print_report(test.run(), args.concurrency)
+    finally:
+        if server_process is not None:
+            server_process.terminate()
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Market data for the index comparison: fetching, currency conversion,
+normalization and statistics (shared by the dashboard and the PDF export)
+"""
+import time
+import yfinance as yf
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from smic2 import smi as smi_data
+from smic import smi_total_return_monatlich as smi_reference_data
+from price_panel import PricePanel
+from data_quality import validate_panel, print_report
+
+# Ticker mappings
+TICKERS = {
+    'dax': '^GDAXI',  # DAX Total Return
+    'smi': 'SMIC.SW',  # SMI Total Return Index
+    'sp500': '^SP500TR',  # S&P 500 Total Return
+    'nasdaq100': 'QQQ',  # NASDAQ-100 (represented by QQQ ETF)
+    'stoxx50': '^STOXX50E',  # STOXX 50 Total Return
+    'gold': 'GC=F',  # Gold Futures
+    'eurChf': 'EURCHF=X',
+    'usdChf': 'USDCHF=X'
+}
+
+# Series that do not come from the data source (key -> origin)
+HARDCODED_SOURCES = {
+    'smi': 'smic2.py'
+}
+
+# Index configuration
+INDEXES = [
+    {'name': 'DAX (TR)', 'ticker': 'dax', 'currency': 'EUR', 'color': 'rgb(0, 104, 182)'},
+    {'name': 'S&P 500 (TR)', 'ticker': 'sp500', 'currency': 'USD', 'color': 'rgb(75, 192, 192)'},
+    {'name': 'NASDAQ-100 (TR)', 'ticker': 'nasdaq100', 'currency': 'USD', 'color': 'rgb(255, 165, 0)'},
+    {'name': 'STOXX 50 (TR)', 'ticker': 'stoxx50', 'currency': 'EUR', 'color': 'rgb(144, 238, 144)'},
+    {'name': 'SMI (TR)', 'ticker': 'smi', 'currency': 'CHF', 'color': 'rgb(255, 99, 132)'},
+    {'name': 'Gold', 'ticker': 'gold', 'currency': 'USD', 'color': 'rgb(255, 215, 0)'}
+]
+
+# Ticker of the <currency>/CHF exchange rate for each non-CHF currency
+CURRENCY_RATES = {
+    'EUR': 'eurChf',
+    'USD': 'usdChf'
+}
+
+# Currencies the comparison can be expressed in
+BASE_CURRENCIES = ['CHF', 'EUR', 'USD']
+
+
+def fetch_all_data(progress=None):
+    """
+    Fetch all ticker data from yfinance into a PricePanel
+
+    Args:
+        progress: Optional callback progress(done, total, symbol), called
+            before each ticker and once at the end
+    """
+    result = {}
+    start_date = '2000-01-01'
+    end_date = datetime.now().strftime('%Y-%m-%d')
+
+    for i, (ticker, symbol) in enumerate(TICKERS.items()):
+        if progress:
+            progress(i, len(TICKERS), symbol)
+        if ticker == 'smi':
+            print("Using hardcoded SMI data...")
+            result['smi'] = pd.Series(smi_data)
+            result['smi'].index = pd.to_datetime(result['smi'].index)
+            continue
+
+        print(f"Fetching {ticker} ({symbol})...")
+        try:
+            data = yf.download(symbol, start=start_date, end=end_date, progress=False, auto_adjust=True)
+            if not data.empty:
+                # Ensure we get a Series, not a DataFrame
+                close_data = data['Close']
+                if isinstance(close_data, pd.DataFrame):
+                    # If multiple columns, take the first one
+                    close_data = close_data.iloc[:, 0]
+                result[ticker] = close_data
+                print(f"  → {len(data)} data points")
+            else:
+                print(f"Warning: No data for {ticker}")
+                result[ticker] = pd.Series(dtype=float)
+        except Exception as e:
+            print(f"Error fetching {ticker}: {e}")
+            result[ticker] = pd.Series(dtype=float)
+
+    if progress:
+        progress(len(TICKERS), len(TICKERS), None)
+
+    # Exchange rates before their first quote are back-filled on use
+    # (PricePanel.filled), so they are not blown up to daily series here
+    return validated_panel(result)
+
+
+def validated_panel(result):
+    """
+    Build the PricePanel and quarantine bad quotes before it is cached
+
+    The hardcoded SMI series is cross-checked against the second SMI source
+    (smic.py).
+    """
+    reference = pd.Series(smi_reference_data)
+    reference.index = pd.to_datetime(reference.index)
+    panel, report = validate_panel(PricePanel.from_series(result, TICKERS), {'smi': reference})
+    print_report(report)
+    return panel
+
+
+def fetch_offline_data(seed=0, latency=0.0, progress=None):
+    """
+    Deterministic synthetic data shaped like fetch_all_data() (no network)
+
+    Used for load tests and development without Yahoo Finance access.
+
+    Args:
+        seed: Random seed of the simulated price paths
+        latency: Seconds to sleep, simulating the upstream download time
+            (spread evenly over the tickers)
+        progress: Optional callback progress(done, total, symbol)
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2000-01-03', datetime.now())
+    result = {}
+
+    for i, (ticker, symbol) in enumerate(TICKERS.items()):
+        if progress:
+            progress(i, len(TICKERS), symbol)
+        if latency:
+            time.sleep(latency / len(TICKERS))
+        if ticker == 'smi':
+            result['smi'] = pd.Series(smi_data)
+            result['smi'].index = pd.to_datetime(result['smi'].index)
+            continue
+        # FX rates drift slowly, indexes follow a geometric random walk
+        drift, vol, start = (-0.0001, 0.004, 1.5) if ticker in ('eurChf', 'usdChf') else (0.0003, 0.012, 1000.0)
+        log_returns = rng.normal(drift, vol, len(dates))
+        result[ticker] = pd.Series(start * np.exp(np.cumsum(log_returns)), index=dates)
+
+    if progress:
+        progress(len(TICKERS), len(TICKERS), None)
+    return validated_panel(result)
+
+
+def convert_to_currency(all_data, base_currency='CHF', assets=None):
+    """
+    Convert every index to the base currency (unfiltered, shared calendar)
+
+    Args:
+        all_data: PricePanel as returned by fetch_all_data() (a dict of
+            Series is converted first)
+        base_currency: One of BASE_CURRENCIES
+        assets: Optional list of index names to include (default: all)
+
+    Returns:
+        DataFrame: One float32 column per index name, NaN on days without a quote
+    """
+    panel = all_data if isinstance(all_data, PricePanel) else PricePanel.from_series(all_data)
+    converted = {}
+
+    for index_config in INDEXES:
+        ticker = index_config['ticker']
+        currency = index_config['currency']
+
+        if assets is not None and index_config['name'] not in assets:
+            continue
+        if not panel.has_data(ticker):
+            continue
+
+        # Get index data (NaN on days without a quote)
+        values = panel.column(ticker)
+
+        # Convert to CHF if needed (last known exchange rate on each day)
+        if currency != 'CHF':
+            if panel.has_data(CURRENCY_RATES[currency]):
+                values = values * panel.filled(CURRENCY_RATES[currency])
+            else:
+                continue
+
+        # Convert from CHF to the base currency
+        if base_currency != 'CHF':
+            if panel.has_data(CURRENCY_RATES[base_currency]):
+                values = values / panel.filled(CURRENCY_RATES[base_currency])
+            else:
+                continue
+
+        converted[index_config['name']] = values
+
+    return pd.DataFrame(converted, index=panel.dates)
+
+
+def convert_quote(prices, index_config, base_currency='CHF'):
+    """
+    Convert a single quote of an index to the base currency
+
+    Args:
+        prices: dict ticker -> latest price (index and exchange rates)
+        index_config: Entry of INDEXES
+        base_currency: One of BASE_CURRENCIES
+
+    Returns:
+        float: Converted value (NaN if a price or rate is missing)
+    """
+    value = prices.get(index_config['ticker'], float('nan'))
+    if index_config['currency'] != 'CHF':
+        value *= prices.get(CURRENCY_RATES[index_config['currency']], float('nan'))
+    if base_currency != 'CHF':
+        value /= prices.get(CURRENCY_RATES[base_currency], float('nan'))
+    return value
+
+
+def scale_data(converted_df, start_date, end_date):
+    """
+    Filter a converted panel to the date range, month-end dates and base 100
+
+    Returns:
+        DataFrame: Normalized data ready for plotting
+    """
+    # Filter data by date range
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+    df = converted_df[(converted_df.index >= start) & (converted_df.index <= end)]
+
+    # Filter to month-end dates only
+    df = df.resample('ME').last()
+
+    # Drop rows where all values are NaN
+    df = df.dropna(how='all')
+
+    # Forward fill missing values
+    df = df.ffill()
+
+    # Normalize to base 100 (use first valid value for each column; columns
+    # without any value are dropped)
+    if df.empty:
+        return pd.DataFrame()
+    base_values = df.bfill().iloc[0]
+    base_values = base_values[base_values.notna()]
+    return df[base_values.index] / base_values * 100
+
+
+def process_and_scale_data(all_data, start_date, end_date, base_currency='CHF', assets=None):
+    """
+    Convert to the base currency (CHF by default), filter to month-end dates,
+    and normalize to base 100
+
+    Returns:
+        dict: Processed data ready for plotting
+    """
+    converted_df = convert_to_currency(all_data, base_currency, assets)
+    return scale_data(converted_df, start_date, end_date)
+
+
+def calculate_statistics(df, colors=None):
+    """
+    Calculate CAGR and total return for each index
+
+    Args:
+        df: Normalized panel
+        colors: Optional dict name -> color for columns that are not in INDEXES
+    """
+    stats = []
+    column_colors = {idx['name']: idx['color'] for idx in INDEXES}
+    column_colors.update(colors or {})
+
+    for col in df.columns:
+        series = df[col].dropna()
+        if len(series) < 2:
+            continue
+
+        first_value = float(series.iloc[0])
+        last_value = float(series.iloc[-1])
+
+        # Skip if first value is zero or negative (cannot calculate CAGR)
+        if first_value <= 0:
+            continue
+
+        # Total return
+        total_return = ((last_value - first_value) / first_value) * 100
+
+        # CAGR
+        start_date = series.index[0]
+        end_date = series.index[-1]
+        years = (end_date - start_date).days / 365.25
+
+        cagr = (pow(last_value / first_value, 1 / years) - 1) * 100 if years > 0 else 0
+        color = column_colors.get(col, 'black')
+
+        stats.append({
+            'name': col,
+            'total_return': total_return,
+            'cagr': cagr,
+            'color': color
+        })
+
+    return stats
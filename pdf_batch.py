@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Bulk PDF report generation for many date ranges, asset sets and base currencies
+
+The market data is fetched once and converted once per base currency; the
+reports themselves are rendered in a process pool and written directly to
+their destination files. Specs with an unknown base currency or missing
+fields fail on their own, the rest of the batch is still rendered.
+
+Example spec file (JSON list):
+    [
+        {"filename": "reports/2024_chf.pdf", "start_date": "2024-01-01", "end_date": "2024-12-31"},
+        {"filename": "reports/2024_usd.pdf", "start_date": "2024-01-01", "end_date": "2024-12-31",
+         "base_currency": "USD", "assets": ["S&P 500 (TR)", "Gold"]}
+    ]
+"""
+import argparse
+import glob
+import json
+import os
+import pickle
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from data_cache import DATA_TTL
+from market_data import INDEXES, BASE_CURRENCIES, fetch_all_data, convert_to_currency, scale_data, calculate_statistics
+from pdf_export import generate_pdf_report
+from snapshots import VERSION_LENGTH, content_hash
+
+REQUIRED_FIELDS = ('filename', 'start_date', 'end_date')
+
+# Data versions whose converted panels a worker process keeps
+WORKER_VERSIONS = 2
+
+# Converted panels per (data version, base currency), shared by all reports
+# of a worker process
+_worker_panels = OrderedDict()
+
+# Data fetched by the worker itself: (fetched at, version, data)
+_worker_data = None
+
+# Snapshot data loaded from data files, per version
+_worker_snapshots = OrderedDict()
+
+
+def data_version(data):
+    """Version of raw data, the same content hash the server's snapshots use"""
+    return content_hash(data)[:VERSION_LENGTH]
+
+
+def _init_worker(panels):
+    """Receive the shared converted panels ((version, currency) -> panel) once per worker"""
+    for (version, currency), panel in panels.items():
+        _store_panel(version, currency, panel)
+
+
+def _store_panel(version, currency, panel):
+    _worker_panels[(version, currency)] = panel
+    _worker_panels.move_to_end((version, currency))
+    versions = list(dict.fromkeys(v for v, _ in reversed(_worker_panels)))
+    for key in [key for key in _worker_panels if key[0] not in versions[:WORKER_VERSIONS]]:
+        del _worker_panels[key]
+
+
+def _fetched_data():
+    """Data fetched by this worker, fetched again once older than DATA_TTL"""
+    global _worker_data
+    if _worker_data is None or time.time() - _worker_data[0] > DATA_TTL:
+        data = fetch_all_data()
+        _worker_data = (time.time(), data_version(data), data)
+    return _worker_data[1], _worker_data[2]
+
+
+def save_data(data, version, directory, keep=()):
+    """
+    Write the raw data of a version for the workers (see render_report);
+    files of versions not in keep are removed
+
+    Returns:
+        str: Path of the data file
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"data_{version}.pkl")
+    if not os.path.exists(path):
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    for stale in glob.glob(os.path.join(directory, 'data_*.pkl')):
+        if stale != path and os.path.basename(stale)[5:-4] not in keep:
+            os.remove(stale)
+    return path
+
+
+def _load_data(version, data_file):
+    """Raw data of a version, read from its data file once per worker"""
+    if version not in _worker_snapshots:
+        with open(data_file, 'rb') as f:
+            _worker_snapshots[version] = pickle.load(f)
+        while len(_worker_snapshots) > WORKER_VERSIONS:
+            _worker_snapshots.popitem(last=False)
+    return _worker_snapshots[version]
+
+
+def _get_panel(base_currency, version=None, data_file=None):
+    """
+    Converted panel for the base currency of a data version: from the data
+    file written by save_data, else the worker's own data (fetched on first
+    use and after DATA_TTL)
+    """
+    if version is not None and data_file and (version, base_currency) not in _worker_panels:
+        data = _load_data(version, data_file)
+    elif version is None or (version, base_currency) not in _worker_panels:
+        own_version, data = _fetched_data()
+        if version is not None and version != own_version:
+            raise ValueError(f"data version {version} is not available")
+        version = own_version
+    if (version, base_currency) not in _worker_panels:
+        _store_panel(version, base_currency, convert_to_currency(data, base_currency))
+    return _worker_panels[(version, base_currency)]
+
+
+def validate_spec(spec):
+    """
+    Check a report spec before it is queued
+
+    Raises:
+        ValueError: Missing field, invalid date range or unsupported base currency
+    """
+    missing = [field for field in REQUIRED_FIELDS if not spec.get(field)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    dates = []
+    for field in ('start_date', 'end_date'):
+        try:
+            dates.append(datetime.strptime(spec[field], '%Y-%m-%d'))
+        except (TypeError, ValueError):
+            raise ValueError(f"invalid {field}: {spec[field]} (expected YYYY-MM-DD)")
+    if dates[0] >= dates[1]:
+        raise ValueError(f"start_date {spec['start_date']} is not before end_date {spec['end_date']}")
+    if spec.get('base_currency', 'CHF') not in BASE_CURRENCIES:
+        raise ValueError(f"unsupported base currency: {spec['base_currency']}")
+
+
+def render_report(spec):
+    """
+    Render a single report described by spec (see generate_reports)
+
+    Can be submitted to any process pool; the data is fetched once per
+    process (and again after DATA_TTL) unless the pool was initialized with
+    shared panels of the spec's data version ('version') or the spec names
+    the data file of that version ('data_file', e.g. a server snapshot, see
+    save_data).
+
+    Returns:
+        tuple: (filename, seconds)
+    """
+    t0 = time.perf_counter()
+    base_currency = spec.get('base_currency', 'CHF')
+    panel = _get_panel(base_currency, spec.get('version'), spec.get('data_file'))
+
+    assets = spec.get('assets')
+    if assets is not None:
+        panel = panel[[name for name in panel.columns if name in assets]]
+
+    df = scale_data(panel, spec['start_date'], spec['end_date'])
+    stats = calculate_statistics(df)
+    if not stats:
+        raise ValueError('no data in the selected range')
+
+    directory = os.path.dirname(spec['filename'])
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    generate_pdf_report(
+        spec['filename'],
+        df,
+        stats,
+        (spec['start_date'], spec['end_date']),
+        INDEXES,
+        chart_format=spec.get('chart_format', 'vector'),
+        base_currency=base_currency
+    )
+    return spec['filename'], time.perf_counter() - t0
+
+
+def generate_reports(specs, workers=None, all_data=None):
+    """
+    Generate many PDF reports in parallel
+
+    Args:
+        specs: List of dicts with 'filename', 'start_date', 'end_date' and
+            optionally 'base_currency', 'assets' and 'chart_format'
+        workers: Number of worker processes (default: CPU count)
+        all_data: Pre-fetched raw data (default: fetch_all_data())
+
+    Returns:
+        dict: 'succeeded' (list of (filename, seconds)), 'failed'
+            (list of (filename, error)), 'elapsed' and 'reports_per_second'
+    """
+    t0 = time.perf_counter()
+
+    succeeded = []
+    failed = []
+
+    # Invalid specs fail on their own instead of aborting the batch
+    valid_specs = []
+    for spec in specs:
+        try:
+            validate_spec(spec)
+            valid_specs.append(spec)
+        except ValueError as e:
+            failed.append((spec.get('filename'), str(e)))
+            print(f"  ✗ {spec.get('filename')}: {e}")
+
+    # Nothing to render: no data fetch and no worker processes
+    if not valid_specs:
+        print(f"0 reports, {len(failed)} failed")
+        return {'succeeded': succeeded, 'failed': failed, 'elapsed': time.perf_counter() - t0,
+                'reports_per_second': 0}
+
+    if all_data is None:
+        all_data = fetch_all_data()
+    version = data_version(all_data)
+
+    # Convert once per base currency; every report only filters and rebases
+    currencies = {spec.get('base_currency', 'CHF') for spec in valid_specs}
+    panels = {(version, currency): convert_to_currency(all_data, currency) for currency in currencies}
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(panels,)) as pool:
+        futures = {pool.submit(render_report, dict(spec, version=version)): spec for spec in valid_specs}
+        for future in as_completed(futures):
+            spec = futures[future]
+            try:
+                filename, seconds = future.result()
+                succeeded.append((filename, seconds))
+                print(f"  ✓ {filename} ({seconds:.2f}s)")
+            except Exception as e:
+                failed.append((spec['filename'], str(e)))
+                print(f"  ✗ {spec['filename']}: {e}")
+
+    elapsed = time.perf_counter() - t0
+    reports_per_second = len(succeeded) / elapsed if elapsed > 0 else 0
+
+    print(f"{len(succeeded)} reports in {elapsed:.1f}s ({reports_per_second:.1f} reports/s), "
+          f"{len(failed)} failed")
+
+    return {
+        'succeeded': succeeded,
+        'failed': failed,
+        'elapsed': elapsed,
+        'reports_per_second': reports_per_second
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate many PDF reports from a JSON spec list')
+    parser.add_argument('specs', help='JSON file with a list of report specs')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes')
+    args = parser.parse_args()
+
+    with open(args.specs) as f:
+        report_specs = json.load(f)
+
+    result = generate_reports(report_specs, workers=args.workers)
+    raise SystemExit(1 if result['failed'] else 0)
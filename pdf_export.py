@@ -7,14 +7,16 @@ Creates compact, professional PDF reports with charts and statistics
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib.units import cm, mm
 from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.enums import TA_CENTER
+from reportlab.graphics.shapes import Drawing, Rect, Line, PolyLine, String
 from datetime import datetime
 import io
+import math
+import re
+import numpy as np
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.io import to_image
 
 
 def create_statistics_table(stats):
@@ -56,8 +58,19 @@ def create_statistics_table(stats):
     return table
 
 
-def create_performance_chart_image(df, fig_config):
-    """Create a Plotly chart and convert to image"""
+def create_performance_chart_image(df, fig_config, base_currency='CHF'):
+    """
+    Create a Plotly chart and convert to image (None without the optional
+    kaleido renderer, see the 'png' extra)
+    """
+    try:
+        import kaleido  # noqa: F401
+    except ImportError:
+        print("Warning: PNG charts need kaleido (pip install '.[png]'), using the vector chart")
+        return None
+    import plotly.graph_objects as go
+    from chart_render import get_renderer
+
     fig = go.Figure()
 
     for index_config in fig_config:
@@ -73,7 +86,7 @@ def create_performance_chart_image(df, fig_config):
             ))
 
     fig.update_layout(
-        title='Performance Vergleich (Basis 100 in CHF)',
+        title=f'Performance Vergleich (Basis 100 in {base_currency})',
         xaxis_title='Datum',
         yaxis_title='Indexwert (Basis 100)',
         hovermode='x unified',
@@ -93,31 +106,146 @@ def create_performance_chart_image(df, fig_config):
         )
     )
 
-    # Convert to image
+    # Convert to image (warm renderer pool, cached by figure content)
     try:
-        img_bytes = to_image(fig, format='png', width=900, height=400)
+        img_bytes = get_renderer().render(fig, format='png', width=900, height=400)
         return img_bytes
     except Exception as e:
         print(f"Error creating chart image: {e}")
         return None
 
 
-def generate_pdf_report(filename, df, stats, date_range, fig_config):
+def _parse_color(color):
+    """Convert a Plotly 'rgb(r, g, b)' or hex color to a ReportLab color"""
+    match = re.match(r'rgba?\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)', color)
+    if match:
+        r, g, b = (int(v) / 255 for v in match.groups())
+        return colors.Color(r, g, b)
+    try:
+        return colors.HexColor(color) if color.startswith('#') else colors.toColor(color)
+    except (ValueError, AttributeError):
+        return colors.HexColor('#e0e0e0')
+
+
+def _nice_ticks(lo, hi, max_ticks=6):
+    """Round tick values covering [lo, hi]"""
+    if hi <= lo:
+        hi = lo + 1
+    raw_step = (hi - lo) / max_ticks
+    magnitude = 10 ** math.floor(math.log10(raw_step))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw_step)
+    first = math.floor(lo / step) * step
+    last = math.ceil(hi / step) * step
+    return [first + i * step for i in range(int(round((last - first) / step)) + 1)]
+
+
+def create_performance_chart_drawing(df, fig_config, width=17*cm, height=7.5*cm, base_currency='CHF'):
+    """
+    Draw the performance chart as ReportLab vector graphics
+
+    Same content and colors as the Plotly chart (lines, axes, grid, legend),
+    but embedded as vector paths instead of a rasterized PNG.
+    """
+    drawing = Drawing(width, height)
+    drawing.add(Rect(0, 0, width, height, fillColor=colors.HexColor('#2a2a2a'), strokeColor=None))
+
+    # Series without a single value (e.g. no quotes in the range) are left out
+    series = [(cfg, df[cfg['name']].to_numpy(dtype=float))
+              for cfg in fig_config if cfg['name'] in df.columns]
+    series = [(cfg, values) for cfg, values in series if not np.isnan(values).all()]
+    if df.empty or not series:
+        return drawing
+
+    # Plot area (leave room for title, legend and axis labels)
+    left, right, bottom, top = 1.3*cm, width - 0.4*cm, 0.9*cm, height - 1.4*cm
+    drawing.add(Rect(left, bottom, right - left, top - bottom,
+                     fillColor=colors.HexColor('#1a1a1a'), strokeColor=None))
+
+    all_values = np.concatenate([values for _, values in series])
+    y_ticks = _nice_ticks(np.nanmin(all_values), np.nanmax(all_values))
+    y_min, y_max = y_ticks[0], y_ticks[-1]
+
+    x_ns = pd.DatetimeIndex(df.index).as_unit('ns').asi8.astype(float)
+    x_min = x_ns[0]
+    x_max = max(x_ns[-1], x_min + 1)
+
+    def to_x(values):
+        return left + (values - x_min) / (x_max - x_min) * (right - left)
+
+    def to_y(values):
+        return bottom + (values - y_min) / (y_max - y_min) * (top - bottom)
+
+    grid_color = colors.HexColor('#444444')
+    label_color = colors.HexColor('#e0e0e0')
+
+    # Horizontal grid + y labels
+    for tick in y_ticks:
+        y = float(to_y(tick))
+        drawing.add(Line(left, y, right, y, strokeColor=grid_color, strokeWidth=0.3))
+        drawing.add(String(left - 3, y - 2.5, f"{tick:g}", fontName='Helvetica', fontSize=6,
+                           fillColor=label_color, textAnchor='end'))
+
+    # Vertical grid + year labels
+    years = range(df.index[0].year, df.index[-1].year + 1)
+    year_step = max(1, math.ceil(len(years) / 10))
+    for year in years[::year_step]:
+        tick = pd.Timestamp(year=year, month=1, day=1)
+        if tick < df.index[0]:
+            continue
+        x = float(to_x(float(tick.value)))
+        drawing.add(Line(x, bottom, x, top, strokeColor=grid_color, strokeWidth=0.3))
+        drawing.add(String(x, bottom - 9, str(year), fontName='Helvetica', fontSize=6,
+                           fillColor=label_color, textAnchor='middle'))
+
+    # Series lines (split at gaps so missing months are not bridged)
+    xs = to_x(x_ns)
+    for cfg, values in series:
+        ys = to_y(values)
+        valid = ~np.isnan(values)
+        breaks = np.flatnonzero(np.diff(valid.astype(int)) != 0) + 1
+        for segment in np.split(np.arange(len(values)), breaks):
+            if len(segment) < 2 or not valid[segment[0]]:
+                continue
+            points = np.column_stack([xs[segment], ys[segment]]).ravel().tolist()
+            drawing.add(PolyLine(points, strokeColor=_parse_color(cfg['color']), strokeWidth=1))
+
+    # Title
+    drawing.add(String(left, height - 0.55*cm, f'Performance Vergleich (Basis 100 in {base_currency})',
+                       fontName='Helvetica-Bold', fontSize=9, fillColor=label_color))
+
+    # Legend (single row above the plot area)
+    x = left
+    legend_y = height - 1.05*cm
+    for cfg, _ in series:
+        drawing.add(Line(x, legend_y + 2, x + 12, legend_y + 2,
+                         strokeColor=_parse_color(cfg['color']), strokeWidth=1.5))
+        drawing.add(String(x + 15, legend_y, cfg['name'], fontName='Helvetica', fontSize=6.5,
+                           fillColor=label_color))
+        x += 20 + len(cfg['name']) * 3.5
+
+    return drawing
+
+
+def generate_pdf_report(filename, df, stats, date_range, fig_config, chart_format='vector',
+                        base_currency='CHF'):
     """
     Generate a compact PDF report with performance data
 
     Args:
-        filename: Output PDF filename
+        filename: Output PDF filename or writable file object
         df: DataFrame with performance data
         stats: List of statistics dictionaries
         date_range: Tuple of (start_date, end_date)
         fig_config: List of index configurations with colors
+        chart_format: 'vector' draws the chart with ReportLab graphics,
+            'png' embeds a Plotly/Kaleido raster image (vector if that
+            cannot be rendered)
+        base_currency: Currency the data was converted to
     """
 
-    # Create PDF
-    pdf_buffer = io.BytesIO()
+    # Create PDF (written straight to the destination when it is built)
     doc = SimpleDocTemplate(
-        pdf_buffer,
+        filename,
         pagesize=landscape(A4),
         rightMargin=10*mm,
         leftMargin=10*mm,
@@ -159,7 +287,7 @@ def generate_pdf_report(filename, df, stats, date_range, fig_config):
     )
 
     # Title
-    title = Paragraph('📊 Index-Performance-Vergleich (CHF, Basis 100)', title_style)
+    title = Paragraph(f'📊 Index-Performance-Vergleich ({base_currency}, Basis 100)', title_style)
     elements.append(title)
 
     # Date range info
@@ -168,12 +296,15 @@ def generate_pdf_report(filename, df, stats, date_range, fig_config):
     elements.append(Paragraph(date_text, text_style))
     elements.append(Spacer(1, 0.3*cm))
 
-    # Create chart image
-    chart_img_bytes = create_performance_chart_image(df, fig_config)
+    # Create chart
+    chart_img_bytes = None
+    if chart_format != 'vector':
+        chart_img_bytes = create_performance_chart_image(df, fig_config, base_currency)
     if chart_img_bytes:
-        chart_img = Image(io.BytesIO(chart_img_bytes), width=17*cm, height=7.5*cm)
-        elements.append(chart_img)
-        elements.append(Spacer(1, 0.2*cm))
+        elements.append(Image(io.BytesIO(chart_img_bytes), width=17*cm, height=7.5*cm))
+    else:
+        elements.append(create_performance_chart_drawing(df, fig_config, base_currency=base_currency))
+    elements.append(Spacer(1, 0.2*cm))
 
     # Statistics heading
     elements.append(Paragraph('Performance Statistiken', heading_style))
@@ -214,11 +345,6 @@ def generate_pdf_report(filename, df, stats, date_range, fig_config):
     # Build PDF
     doc.build(elements)
 
-    # Save to file
-    pdf_buffer.seek(0)
-    with open(filename, 'wb') as f:
-        f.write(pdf_buffer.getvalue())
-
     return filename
 
 
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Vectorized portfolio backtests on the monthly panel
+
+Thousands of weight vectors are evaluated at once as matrix products:
+    monthly rebalancing:   portfolio returns = R @ W.T
+    annual / no rebalancing: buy-and-hold growth per period = cumprod(1 + R) @ W.T
+"""
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Rebalancing schedules
+REBALANCE_OPTIONS = ['monthly', 'quarterly', 'annual', 'none']
+
+# Portfolios per chunk when a sweep is split across processes; sweeps with
+# fewer than two full chunks are evaluated in the calling process
+SWEEP_CHUNK_SIZE = 5000
+
+# Worker pool for large sweeps, created on first use and kept for the process
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+            atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+        return _pool
+
+
+def monthly_returns(panel):
+    """
+    Monthly simple returns over the period where every asset has data
+
+    Args:
+        panel: Month-end DataFrame (date x asset), e.g. from scale_data()
+
+    Returns:
+        DataFrame: Returns (first common month dropped)
+    """
+    return panel.dropna(how='any').pct_change().iloc[1:]
+
+
+def _period_ids(dates, rebalance):
+    """Integer id of the holding period for every month"""
+    dates = pd.DatetimeIndex(dates)
+    if rebalance == 'annual':
+        return dates.year.to_numpy()
+    if rebalance == 'quarterly':
+        return (dates.year * 4 + dates.quarter).to_numpy()
+    if rebalance == 'none':
+        return np.zeros(len(dates), dtype=int)
+    raise ValueError(f"Unknown rebalancing: {rebalance}")
+
+
+def portfolio_returns(returns, weights, rebalance='monthly', dates=None):
+    """
+    Monthly returns of many portfolios
+
+    Args:
+        returns: Array (T x N) of monthly asset returns
+        weights: Array (K x N), each row summing to 1
+        rebalance: One of REBALANCE_OPTIONS
+        dates: Month-end dates of the returns (needed unless monthly)
+
+    Returns:
+        ndarray: (T x K) portfolio returns
+    """
+    returns = np.asarray(returns, dtype=float)
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+
+    if rebalance == 'monthly':
+        return returns @ weights.T
+
+    # Between rebalancing dates every asset grows on its own; the portfolio
+    # value inside a period is the weighted sum of the asset growth factors.
+    period = _period_ids(dates, rebalance)
+    boundaries = np.flatnonzero(np.diff(period)) + 1
+    values = np.empty((returns.shape[0], weights.shape[0]))
+    level = np.ones(weights.shape[0])
+    for block in np.split(np.arange(returns.shape[0]), boundaries):
+        growth = np.cumprod(1 + returns[block], axis=0)
+        values[block] = (growth @ weights.T) * level
+        level = values[block[-1]]
+
+    previous = np.vstack([np.ones((1, weights.shape[0])), values[:-1]])
+    return values / previous - 1
+
+
+def summarize(port_returns, periods_per_year=12):
+    """Annualized return (CAGR) and volatility per portfolio column, in %"""
+    months = port_returns.shape[0]
+    growth = np.prod(1 + port_returns, axis=0)
+    cagr = (growth ** (periods_per_year / months) - 1) * 100
+    volatility = port_returns.std(axis=0, ddof=1) * np.sqrt(periods_per_year) * 100
+    return cagr, volatility
+
+
+def _evaluate_chunk(returns, weights, rebalance, dates):
+    return summarize(portfolio_returns(returns, weights, rebalance, dates))
+
+
+def evaluate(returns_df, weights, rebalance='monthly', workers=None, chunk_size=SWEEP_CHUNK_SIZE):
+    """
+    Return and volatility for every weight vector
+
+    Sweeps of at least two full chunks are split into chunks and evaluated
+    on the shared process pool.
+
+    Args:
+        returns_df: DataFrame of monthly returns (from monthly_returns())
+        weights: Array (K x N) in the column order of returns_df
+        rebalance: One of REBALANCE_OPTIONS
+        workers: Maximum number of chunks (default: CPU count)
+
+    Returns:
+        tuple: (cagr, volatility) arrays of length K, in %
+    """
+    returns = returns_df.to_numpy(dtype=float)
+    dates = returns_df.index
+    weights = np.atleast_2d(np.asarray(weights, dtype=float))
+
+    # Even chunks, so a few extra rows do not become a chunk of their own
+    n_chunks = min(len(weights) // chunk_size, workers or os.cpu_count())
+    if n_chunks < 2:
+        return _evaluate_chunk(returns, weights, rebalance, dates)
+
+    chunks = np.array_split(weights, n_chunks)
+    results = list(_get_pool().map(_evaluate_chunk, [returns] * n_chunks, chunks,
+                                   [rebalance] * n_chunks, [dates] * n_chunks))
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def random_weights(n_assets, n_portfolios, seed=0):
+    """Uniformly distributed long-only weights (Dirichlet), plus the single assets"""
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.ones(n_assets), size=n_portfolios)
+    return np.vstack([np.eye(n_assets), weights])
+
+
+def efficient_frontier(cagr, volatility):
+    """Indices of the portfolios on the efficient frontier, ordered by volatility"""
+    order = np.argsort(volatility)
+    best = np.maximum.accumulate(cagr[order])
+    on_frontier = cagr[order] >= best
+    return order[on_frontier]
+
+
+def frontier_sweep(panel, n_portfolios=5000, rebalance='monthly', seed=0, workers=None):
+    """
+    Evaluate random long-only portfolios of all panel columns
+
+    Returns:
+        dict: 'assets', 'weights' (K x N), 'cagr', 'volatility', 'frontier'
+    """
+    returns_df = monthly_returns(panel)
+    weights = random_weights(returns_df.shape[1], n_portfolios, seed)
+    cagr, volatility = evaluate(returns_df, weights, rebalance, workers)
+    return {
+        'assets': list(returns_df.columns),
+        'weights': weights,
+        'cagr': cagr,
+        'volatility': volatility,
+        'frontier': efficient_frontier(cagr, volatility)
+    }
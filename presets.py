@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Preset date ranges of the dashboard (YTD, 1Y, ... MAX) and their encoding
+in the page URL
+
+The start of a preset is a calendar date; its end is always the end of the
+history (midnight of the last day of the data), so every browser asks for
+exactly the same ranges and the prewarmed charts are hit. Slider values are
+matched to presets by date, never by exact timestamp.
+"""
+from datetime import datetime
+from urllib.parse import parse_qs, urlencode
+
+import pandas as pd
+
+# First date of the history shown in the dashboard
+HISTORY_START = datetime(2000, 1, 1)
+
+# (key, button label, years back; None = since January 1st, 0 = full history)
+PRESETS = [
+    ('ytd', 'YTD', None),
+    ('1y', '1J', 1),
+    ('3y', '3J', 3),
+    ('5y', '5J', 5),
+    ('10y', '10J', 10),
+    ('max', 'MAX', 0)
+]
+
+PRESET_KEYS = [key for key, _, _ in PRESETS]
+
+
+def _day(value):
+    """Date of a datetime or of a slider value (timestamp)"""
+    return value.date() if isinstance(value, datetime) else datetime.fromtimestamp(value).date()
+
+
+def preset_start(key, end):
+    """Start date of a preset ending at end (datetime)"""
+    years = next(years for preset, _, years in PRESETS if preset == key)
+    if years is None:
+        start = datetime(end.year, 1, 1)
+    elif years == 0:
+        start = HISTORY_START
+    else:
+        start = (pd.Timestamp(end).normalize() - pd.DateOffset(years=years)).to_pydatetime()
+    return max(start, HISTORY_START)
+
+
+def preset_range(key, end):
+    """Slider values [start, end] (timestamps at midnight) of a preset"""
+    return [preset_start(key, end).timestamp(), datetime(end.year, end.month, end.day).timestamp()]
+
+
+def match_preset(slider_values, end):
+    """Key of the preset whose days the slider is set to, None for a custom range"""
+    days = [_day(value) for value in slider_values]
+    return next((key for key in PRESET_KEYS if days == [_day(preset_start(key, end)), _day(end)]), None)
+
+
+def encode_state(slider_values, base_currency, assets, end, all_assets):
+    """
+    Query string of a dashboard view, e.g. '?range=5y&currency=EUR'
+
+    Defaults (full history, CHF, all assets) are left out; no asset
+    selected at all is written as an empty 'assets='.
+    """
+    state = {}
+    preset = match_preset(slider_values, end)
+    if preset is None:
+        state['from'] = datetime.fromtimestamp(slider_values[0]).strftime('%Y-%m-%d')
+        state['to'] = datetime.fromtimestamp(slider_values[1]).strftime('%Y-%m-%d')
+    elif preset != 'max':
+        state['range'] = preset
+    if base_currency != 'CHF':
+        state['currency'] = base_currency
+    if assets is not None and sorted(assets) != sorted(all_assets):
+        state['assets'] = ','.join(assets)
+    return f"?{urlencode(state)}" if state else ''
+
+
+def decode_state(search, end, all_assets, currencies):
+    """
+    Slider values, base currency and assets of a query string; None for
+    anything missing or invalid ([] for an empty 'assets=')
+    """
+    query = parse_qs((search or '').lstrip('?'), keep_blank_values=True)
+    query = {name: values[-1] for name, values in query.items()}
+    slider_values = None
+    if query.get('range') in PRESET_KEYS:
+        slider_values = preset_range(query['range'], end)
+    elif 'from' in query or 'to' in query:
+        try:
+            start = max(datetime.strptime(query['from'], '%Y-%m-%d'), HISTORY_START) \
+                if 'from' in query else HISTORY_START
+            stop = min(datetime.strptime(query['to'], '%Y-%m-%d'), end) if 'to' in query else end
+            if start < stop:
+                slider_values = [start.timestamp(), stop.timestamp()]
+        except ValueError:
+            pass
+
+    currency = query.get('currency') if query.get('currency') in currencies else None
+    assets = None
+    if 'assets' in query:
+        assets = [name for name in query['assets'].split(',') if name in all_assets]
+        if query['assets'] and not assets:
+            assets = None
+    return slider_values, currency, assets
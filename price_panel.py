@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compact calendar-aligned price store
+
+All series share one trading-day calendar (int32 day ordinals since
+1970-01-01) and live in a single float32 matrix (date x asset) with a
+validity mask, so consumers never have to realign separate Series.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _to_day(date):
+    """Day ordinal (days since 1970-01-01) of a date or timestamp"""
+    return np.int32(pd.Timestamp(date).to_datetime64().astype('datetime64[D]').astype(np.int64))
+
+
+class PricePanel:
+    """
+    Attributes:
+        days: int32 array (T,) of day ordinals, sorted and unique
+        values: float32 array (T x N), NaN where an asset has no quote
+        valid: bool array (T x N), True where values holds a quote
+        keys: Asset keys (e.g. 'dax', 'eurChf') as a numpy string array
+        symbols: Source symbols (e.g. '^GDAXI') as a numpy string array
+    """
+
+    __slots__ = ('days', 'values', 'valid', 'keys', 'symbols', '_positions')
+
+    def __init__(self, days, values, valid, keys, symbols=None):
+        self.days = np.asarray(days, dtype=np.int32)
+        self.values = np.asarray(values, dtype=np.float32)
+        self.valid = np.asarray(valid, dtype=bool)
+        self.keys = np.asarray(keys, dtype=str)
+        self.symbols = np.asarray(symbols if symbols is not None else keys, dtype=str)
+        self._positions = {key: i for i, key in enumerate(self.keys.tolist())}
+
+    @classmethod
+    def from_series(cls, series_by_key, symbols=None):
+        """
+        Build a panel from a dict of pandas Series (key -> Series)
+
+        Args:
+            series_by_key: Series with a DatetimeIndex per asset key
+            symbols: Optional dict key -> source symbol
+        """
+        keys = list(series_by_key)
+        indexes = [pd.DatetimeIndex(s.index).normalize() for s in series_by_key.values() if len(s)]
+        calendar = indexes[0].append(indexes[1:]).unique().sort_values() if indexes else pd.DatetimeIndex([])
+        days = calendar.values.astype('datetime64[D]').astype(np.int64).astype(np.int32)
+
+        values = np.full((len(days), len(keys)), np.nan, dtype=np.float32)
+        for column, key in enumerate(keys):
+            series = series_by_key[key]
+            if not len(series):
+                continue
+            index = pd.DatetimeIndex(series.index).normalize()
+            keep = ~index.duplicated(keep='last')
+            rows = calendar.get_indexer(index[keep])
+            values[rows, column] = np.asarray(series, dtype=np.float32)[keep]
+
+        symbols = [(symbols or {}).get(key, key) for key in keys]
+        return cls(days, values, ~np.isnan(values), keys, symbols)
+
+    def __contains__(self, key):
+        return key in self._positions
+
+    def __len__(self):
+        return len(self.days)
+
+    def __getstate__(self):
+        return (self.days, self.values, self.valid, self.keys, self.symbols)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    @property
+    def dates(self):
+        """Calendar as a pandas DatetimeIndex"""
+        return pd.DatetimeIndex(self.days.astype('datetime64[D]'))
+
+    def has_data(self, key):
+        """True if the asset has at least one quote"""
+        return key in self._positions and bool(self.valid[:, self._positions[key]].any())
+
+    def column(self, key):
+        """Values of one asset on the shared calendar (NaN where no quote)"""
+        return self.values[:, self._positions[key]]
+
+    def filled(self, key):
+        """
+        Last known value on every calendar day; days before the first quote
+        take the first quote (used for exchange rates)
+        """
+        column = self._positions[key]
+        valid = self.valid[:, column]
+        if not valid.any():
+            return np.full(len(self.days), np.nan, dtype=np.float32)
+        last = np.where(valid, np.arange(len(valid)), -1)
+        np.maximum.accumulate(last, out=last)
+        last[last < 0] = np.argmax(valid)
+        return self.values[last, column]
+
+    def series(self, key):
+        """Quotes of one asset as a pandas Series (only valid days)"""
+        column = self._positions[key]
+        valid = self.valid[:, column]
+        return pd.Series(self.values[valid, column], index=self.dates[valid], name=key)
+
+    def latest(self, key, before=None):
+        """Last quote of an asset (optionally the last one before a date), NaN if none"""
+        column = self._positions[key]
+        rows = len(self.days) if before is None else np.searchsorted(self.days, _to_day(before), 'left')
+        valid = np.flatnonzero(self.valid[:rows, column])
+        return float(self.values[valid[-1], column]) if len(valid) else float('nan')
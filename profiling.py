@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+On-demand sampling profiler for single requests of the dashboard server
+
+A request is profiled when it carries the header X-Profile: <CHARTS_PROFILE_TOKEN>
+or is drawn by the sampling rate CHARTS_PROFILE_RATE (0..1). While it runs,
+a sampler thread reads the request thread's stack every
+CHARTS_PROFILE_INTERVAL_MS and adds the time since the previous sample to
+the stack it finds (samples delayed by the interpreter's thread switching
+still count with their full time). The result is written to CHARTS_PROFILE_DIR as
+    <name>.folded - folded stacks ('frame;frame;... microseconds'), ready
+                    for flamegraph.pl, speedscope or inferno
+    <name>.json   - the request (Dash output and callback inputs), duration,
+                    data version and the time per category (resampling,
+                    FX alignment, figure construction, JSON serialization)
+The name is returned in the X-Profile-Id response header.
+
+Requests profiled through the header bypass the response, chart and panel
+caches, so the profile shows the full computation (background jobs started
+by such a request get the flag passed, see cache_bypass); sampled requests
+are profiled as they are served. Without token and rate no hooks are registered at all.
+"""
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import g, request
+
+# Share of requests profiled without header (0 = only on request)
+PROFILE_RATE = float(os.environ.get('CHARTS_PROFILE_RATE', '0'))
+
+# Value of the X-Profile header that forces a profile
+PROFILE_TOKEN = os.environ.get('CHARTS_PROFILE_TOKEN')
+
+PROFILE_DIR = os.environ.get('CHARTS_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'charts_profiles'))
+
+# Time between two samples of a profiled request
+PROFILE_INTERVAL = float(os.environ.get('CHARTS_PROFILE_INTERVAL_MS', '1')) / 1000
+
+# Requests profiled at the same time (further ones run unprofiled)
+MAX_ACTIVE = 4
+
+PROFILE_HEADER = 'X-Profile'
+
+DASH_ENDPOINT = '/_dash-update-component'
+
+# Category of a sample: the innermost frame matching one of the prefixes
+# ('module:function'); samples without a match count as 'other'
+CATEGORIES = [
+    ('json', ('json.', '_json', 'plotly.io._json', 'orjson')),
+    ('resampling', ('pandas.core.resample',)),
+    ('fx_alignment', ('market_data:convert_to_currency', 'market_data:convert_quote')),
+    ('figure', ('plotly.', 'server:build_chart')),
+    ('statistics', ('market_data:calculate_statistics',)),
+    ('scaling', ('market_data:scale_data',))
+]
+
+# Frame label per code object ('module:qualname')
+_labels = {}
+
+# Set in the thread of a request profiled through the header
+_forced = threading.local()
+
+
+def _label(frame):
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        label = f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}".replace(';', ',').replace(' ', '_')
+        _labels[code] = label
+    return label
+
+
+def _category(stack):
+    for label in reversed(stack.split(';')):
+        for category, prefixes in CATEGORIES:
+            if label.startswith(prefixes):
+                return category
+    return 'other'
+
+
+class Sampler:
+    """Samples the stack of one thread every interval until stopped"""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        # Stack -> microseconds
+        self.stacks = Counter()
+        self.samples = 0
+        self.seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.seconds = time.perf_counter() - self._started
+        return self
+
+    def _run(self):
+        last = self._started
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame))
+                frame = frame.f_back
+            now = time.perf_counter()
+            self.stacks[';'.join(reversed(stack))] += round((now - last) * 1e6)
+            self.samples += 1
+            last = now
+
+    def categories(self):
+        """Milliseconds per category"""
+        totals = Counter()
+        for stack, micros in self.stacks.items():
+            totals[_category(stack)] += micros
+        return {category: round(micros / 1000, 1) for category, micros in totals.most_common()}
+
+
+def _request_tags():
+    """Path, Dash output and callback inputs of the current request"""
+    tags = {'method': request.method, 'path': request.full_path.rstrip('?')}
+    if request.path == DASH_ENDPOINT:
+        try:
+            body = json.loads(request.get_data(cache=True))
+        except ValueError:
+            return tags
+        tags['output'] = body.get('output')
+        for section in ('inputs', 'state'):
+            items = []
+            for item in body.get(section, []):
+                # Pattern-matching callbacks send lists of inputs
+                items.extend(item if isinstance(item, list) else [item])
+            tags[section] = {f"{json.dumps(item['id'], sort_keys=True) if isinstance(item['id'], dict) else item['id']}"
+                             f".{item['property']}": item.get('value') for item in items if 'id' in item}
+    return tags
+
+
+def write_profile(sampler, tags, directory=PROFILE_DIR):
+    """Write the folded stacks and their tags, returns the file name (without extension)"""
+    os.makedirs(directory, exist_ok=True)
+    subject = (tags.get('output') or tags['path']).strip('.').split('.')[0].split('?')[0]
+    subject = re.sub(r'[^A-Za-z0-9_-]+', '-', subject).strip('-')[:40] or 'request'
+    name = f"{datetime.now():%Y%m%d-%H%M%S-%f}-{subject}"
+
+    with open(os.path.join(directory, f"{name}.folded"), 'w') as f:
+        for stack, count in sampler.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(os.path.join(directory, f"{name}.json"), 'w') as f:
+        json.dump({**tags,
+                   'duration_ms': round(sampler.seconds * 1000, 1),
+                   'samples': sampler.samples,
+                   'interval_ms': sampler.interval * 1000,
+                   'categories_ms': sampler.categories()}, f, indent=2, default=str)
+    return name
+
+
+def bypass_cache():
+    """True in the thread of a request profiled through the header (caches are skipped)"""
+    return getattr(_forced, 'active', False)
+
+
+@contextmanager
+def cache_bypass(active=True):
+    """
+    Skip the caches in the current thread while active, e.g. in a background
+    job of a request profiled through the header (pass bypass_cache() of the
+    request to the job, the flag is per thread)
+    """
+    previous = bypass_cache()
+    _forced.active = active
+    try:
+        yield
+    finally:
+        _forced.active = previous
+
+
+class RequestProfiler:
+    """Flask hooks that start and stop a Sampler around selected requests"""
+
+    def __init__(self, rate=PROFILE_RATE, token=PROFILE_TOKEN, directory=PROFILE_DIR):
+        self.rate = rate
+        self.token = token
+        self.directory = directory
+        self.tags = None
+        self._slots = threading.Semaphore(MAX_ACTIVE)
+
+    @property
+    def enabled(self):
+        return self.rate > 0 or bool(self.token)
+
+    def init_app(self, server, tags=None):
+        """
+        Register the hooks on a Flask app; register before caching hooks so
+        the profile also covers cache lookups and compression
+
+        Args:
+            tags: Optional function returning extra tags of a profile (e.g.
+                the data version)
+        """
+        self.tags = tags
+        if not self.enabled:
+            return
+        server.before_request(self._before_request)
+        server.after_request(self._after_request)
+        server.teardown_request(self._teardown_request)
+
+    def _before_request(self):
+        header = request.headers.get(PROFILE_HEADER)
+        forced = bool(header and self.token and hmac.compare_digest(header, self.token))
+        if not forced and not (self.rate > 0 and random.random() < self.rate):
+            return None
+        if not self._slots.acquire(blocking=False):
+            return None
+        g.profile_forced = _forced.active = forced
+        g.profile_sampler = Sampler(threading.get_ident()).start()
+        return None
+
+    def _finish(self):
+        sampler = g.pop('profile_sampler', None)
+        if sampler is None:
+            return None
+        sampler.stop()
+        _forced.active = False
+        self._slots.release()
+        return sampler
+
+    def _after_request(self, response):
+        sampler = self._finish()
+        if sampler is None:
+            return response
+        tags = dict(_request_tags(), **(self.tags() if self.tags else {}), status=response.status_code,
+                    trigger='header' if g.profile_forced else 'sample')
+        name = write_profile(sampler, tags, self.directory)
+        response.headers['X-Profile-Id'] = name
+        print(f"Profiled {tags.get('output') or tags['path']}: {sampler.seconds * 1000:.0f} ms, "
+              f"{sampler.samples} samples -> {os.path.join(self.directory, name)}.folded")
+        return response
+
+    def _teardown_request(self, error=None):
+        # Requests that failed before after_request still stop their sampler
+        self._finish()
+
+
+# Shared instance for the server process
+request_profiler = RequestProfiler()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Projection of future index paths by resampling historical monthly returns
+
+Methods:
+    'bootstrap'  - (block) bootstrap of historical months, either jointly for
+                   all assets (keeps their correlation) or per asset
+    'parametric' - multivariate normal log-returns with the historical mean
+                   and covariance
+
+Paths are generated in chunks and reduced to yearly checkpoints right away,
+so memory is bounded by the chunk size, not by the number of paths.
+"""
+import numpy as np
+
+# Percentiles shown in the fan chart
+FAN_PERCENTILES = [5, 25, 50, 75, 95]
+
+# Paths generated per chunk
+CHUNK_PATHS = 2000
+
+
+def _bootstrap_chunk(rng, log_returns, n_paths, horizon, block_length, joint):
+    """Resampled log-returns (paths x months x assets)"""
+    n_months, n_assets = log_returns.shape
+    block_length = max(1, min(block_length, n_months))
+    n_blocks = -(-horizon // block_length)
+    offsets = np.arange(block_length)
+
+    if joint:
+        # Same historical months for every asset
+        starts = rng.integers(0, n_months - block_length + 1, size=(n_paths, n_blocks))
+        months = (starts[:, :, None] + offsets).reshape(n_paths, -1)[:, :horizon]
+        return log_returns[months]
+
+    starts = rng.integers(0, n_months - block_length + 1, size=(n_paths, n_blocks, n_assets))
+    months = (starts[:, :, None, :] + offsets[:, None]).reshape(n_paths, -1, n_assets)[:, :horizon]
+    return log_returns[months, np.arange(n_assets)]
+
+
+def _parametric_chunk(rng, mean, cov, n_paths, horizon):
+    """Multivariate normal log-returns (paths x months x assets)"""
+    return rng.multivariate_normal(mean, cov, size=(n_paths, horizon), method='cholesky').astype(np.float32)
+
+
+def simulate(returns, years=30, n_paths=10000, method='bootstrap', block_length=12, joint=True,
+             weights=None, seed=0, chunk_paths=CHUNK_PATHS, percentiles=FAN_PERCENTILES):
+    """
+    Simulate future growth paths of every asset (and optionally a portfolio)
+
+    Args:
+        returns: DataFrame of historical monthly simple returns (month x asset)
+        years: Projection horizon
+        n_paths: Number of simulated paths
+        method: 'bootstrap' or 'parametric'
+        block_length: Months per bootstrap block (1 = i.i.d. months)
+        joint: Resample the same months for all assets (bootstrap only)
+        weights: Optional portfolio weights (monthly rebalanced), in column order
+        seed: Random seed (same seed and chunk size give the same result)
+        chunk_paths: Paths generated at once (bounds the memory use)
+
+    Returns:
+        dict: 'assets', 'years' (checkpoints 0..years), 'percentiles'
+            {q: array (checkpoints x assets)} and 'terminal' (paths x assets),
+            all as growth multiples of the starting value
+    """
+    assets = list(returns.columns)
+    simple = returns.to_numpy(dtype=np.float64)
+    log_returns = np.log1p(simple).astype(np.float32)
+    horizon = years * 12
+
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        weights = weights / weights.sum()
+        assets.append('Portfolio')
+
+    if method == 'parametric':
+        mean = log_returns.mean(axis=0)
+        cov = np.atleast_2d(np.cov(log_returns, rowvar=False))
+    elif method != 'bootstrap':
+        raise ValueError(f"Unknown projection method: {method}")
+
+    rng = np.random.default_rng(seed)
+    checkpoints = np.empty((n_paths, years + 1, len(assets)), dtype=np.float32)
+
+    for first in range(0, n_paths, chunk_paths):
+        count = min(chunk_paths, n_paths - first)
+        if method == 'bootstrap':
+            chunk = _bootstrap_chunk(rng, log_returns, count, horizon, block_length, joint)
+        else:
+            chunk = _parametric_chunk(rng, mean, cov, count, horizon)
+
+        if weights is not None:
+            # Monthly rebalanced portfolio: log(1 + sum_i w_i * r_i)
+            portfolio = np.log1p(np.expm1(chunk) @ weights.astype(np.float32))
+            chunk = np.concatenate([chunk, portfolio[:, :, None]], axis=2)
+
+        cumulative = np.cumsum(chunk, axis=1)
+        checkpoints[first:first + count, 0] = 1.0
+        checkpoints[first:first + count, 1:] = np.exp(cumulative[:, 11::12])
+
+    return {
+        'assets': assets,
+        'years': np.arange(years + 1),
+        'percentiles': {q: values for q, values in zip(percentiles, np.percentile(checkpoints, percentiles, axis=0))},
+        'terminal': checkpoints[:, -1]
+    }
@@ -2,14 +2,35 @@
 """
 Flask + Dash server to display financial data using Plotly
 """
-from flask import Flask
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from flask import Flask, jsonify, request, send_file, abort, has_request_context
 import dash
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State, ALL
+import numpy as np
 import plotly.graph_objects as go
-import yfinance as yf
-from datetime import datetime, timedelta
-import pandas as pd
-from smic2 import smi as smi_data
+from datetime import datetime
+from market_data import INDEXES, BASE_CURRENCIES, calculate_statistics, scale_data
+from data_cache import data_cache, SERVER_PROCESSES
+from data_api import api as data_api
+from jobs import JobQueue, JobCancelled
+from singleflight import SingleFlight
+from portfolio import frontier_sweep, monthly_returns, portfolio_returns, summarize
+from projection import simulate
+from heatmap import heatmap_cache
+from correlation import WINDOW_OPTIONS, rolling_correlation
+from pdf_batch import render_report, save_data
+from live import live_api, live_feed, make_source, TICK_SOURCES
+from watchlist import MAX_WATCHLIST, WATCHLIST_COLORS, SYMBOL_PATTERN, convert_watchlist, parse_entry, symbol_cache
+from symbol_index import symbol_index
+from http_cache import response_cache, no_store
+from profiling import request_profiler, bypass_cache, cache_bypass
+from presets import PRESETS, HISTORY_START, preset_range, match_preset, encode_state, decode_state
+from static_export import STATIC_DIR, chart_layout, export as export_static
 
 # CSS for animated tiles
 TILE_STYLES = """
@@ -91,188 +112,78 @@ TILE_STYLES = """
 
 # Flask app
 server = Flask(__name__)
+server.register_blueprint(data_api)
+server.register_blueprint(live_api)
 
 # Dash app integrated with Flask
 app = dash.Dash(__name__, server=server, url_base_pathname='/')
 
-# Ticker mappings
-TICKERS = {
-    'dax': '^GDAXI',  # DAX Total Return
-    'smi': 'SMIC.SW',  # SMI Total Return Index
-    'sp500': '^SP500TR',  # S&P 500 Total Return
-    'nasdaq100': 'QQQ',  # NASDAQ-100 (represented by QQQ ETF)
-    'stoxx50': '^STOXX50E',  # STOXX 50 Total Return
-    'gold': 'GC=F',  # Gold Futures
-    'eurChf': 'EURCHF=X',
-    'usdChf': 'USDCHF=X'
-}
-
-# Index configuration
-INDEXES = [
-    {'name': 'DAX (TR)', 'ticker': 'dax', 'currency': 'EUR', 'color': 'rgb(0, 104, 182)'},
-    {'name': 'S&P 500 (TR)', 'ticker': 'sp500', 'currency': 'USD', 'color': 'rgb(75, 192, 192)'},
-    {'name': 'NASDAQ-100 (TR)', 'ticker': 'nasdaq100', 'currency': 'USD', 'color': 'rgb(255, 165, 0)'},
-    {'name': 'STOXX 50 (TR)', 'ticker': 'stoxx50', 'currency': 'EUR', 'color': 'rgb(144, 238, 144)'},
-    {'name': 'SMI (TR)', 'ticker': 'smi', 'currency': 'CHF', 'color': 'rgb(255, 99, 132)'},
-    {'name': 'Gold', 'ticker': 'gold', 'currency': 'USD', 'color': 'rgb(255, 215, 0)'}
-]
-
-
-def fetch_all_data():
-    """Fetch all ticker data from yfinance"""
-    result = {}
-    start_date = '2000-01-01'
-    end_date = datetime.now().strftime('%Y-%m-%d')
-
-    for ticker, symbol in TICKERS.items():
-        if ticker == 'smi':
-            print("Using hardcoded SMI data...")
-            result['smi'] = pd.Series(smi_data)
-            result['smi'].index = pd.to_datetime(result['smi'].index)
-            continue
-
-        print(f"Fetching {ticker} ({symbol})...")
-        try:
-            data = yf.download(symbol, start=start_date, end=end_date, progress=False, auto_adjust=True)
-            if not data.empty:
-                # Ensure we get a Series, not a DataFrame
-                close_data = data['Close']
-                if isinstance(close_data, pd.DataFrame):
-                    # If multiple columns, take the first one
-                    close_data = close_data.iloc[:, 0]
-                result[ticker] = close_data
-                print(f"  → {len(data)} data points")
-            else:
-                print(f"Warning: No data for {ticker}")
-                result[ticker] = pd.Series(dtype=float)
-        except Exception as e:
-            print(f"Error fetching {ticker}: {e}")
-            result[ticker] = pd.Series(dtype=float)
-
-    # Back-fill exchange rates to 2000-01-01
-    for currency_ticker in ['eurChf', 'usdChf']:
-        if currency_ticker in result and not result[currency_ticker].empty:
-            first_rate = result[currency_ticker].iloc[0]
-            first_date = result[currency_ticker].index[0]
-
-            # Create date range from 2000-01-01 to first available date
-            start = pd.Timestamp('2000-01-01')
-            if first_date > start:
-                date_range = pd.date_range(start=start, end=first_date - timedelta(days=1), freq='D')
-                backfill = pd.Series(first_rate, index=date_range)
-                result[currency_ticker] = pd.concat([backfill, result[currency_ticker]]).sort_index()
-                print(f"  Back-filled {currency_ticker} with {len(date_range)} days")
-
-    return result
-
-
-def process_and_scale_data(all_data, start_date, end_date):
-    """
-    Convert to CHF, filter to month-end dates, and normalize to base 100
-
-    Returns:
-        dict: Processed data ready for plotting
-    """
-    # Filter data by date range
-    start = pd.Timestamp(start_date)
-    end = pd.Timestamp(end_date)
-
-    # Prepare DataFrames for each index in CHF
-    chf_data = {}
-
-    for index_config in INDEXES:
-        ticker = index_config['ticker']
-        currency = index_config['currency']
-
-        if ticker not in all_data or all_data[ticker].empty:
-            continue
-
-        # Get index data
-        index_series = all_data[ticker].copy()
-
-        # Convert to CHF if needed
-        if currency == 'EUR':
-            if 'eurChf' in all_data:
-                index_series = index_series * all_data['eurChf']
-            else:
-                continue
-        elif currency == 'USD':
-            if 'usdChf' in all_data:
-                index_series = index_series * all_data['usdChf']
-            else:
-                continue
-
-        # Filter by date range
-        index_series = index_series[(index_series.index >= start) & (index_series.index <= end)]
-
-        if not index_series.empty:
-            chf_data[index_config['name']] = index_series
+# Selected requests are profiled (X-Profile header or CHARTS_PROFILE_RATE);
+# registered first so the profile includes the response cache
+request_profiler.init_app(server, tags=lambda: {'version': data_cache.version})
 
-    # Combine all data into a single DataFrame
-    df = pd.DataFrame(chf_data)
+# Data API and callbacks that only depend on the data version and their
+# inputs are answered from memory (ETag / 304, precompressed)
+response_cache.init_app(server, paths=['/api/panel', '/api/statistics'],
+                        dash_outputs=['performance-chart.figure', 'start-date-label.children',
+                                      'frontier-chart.figure', 'projection-fan.figure', 'cagr-heatmap.figure',
+                                      'correlation-heatmap.figure'])
 
-    # Filter to month-end dates only
-    df = df.resample('M').last()
+# PDF exports run on a local worker pool, never in a request thread; the
+# job states are kept in EXPORT_DIR/jobs as well, so every server process
+# (gunicorn worker) can answer status and download requests
+EXPORT_DIR = os.environ.get('CHARTS_EXPORT_DIR', os.path.join(tempfile.gettempdir(), 'charts_exports'))
+export_queue = JobQueue(workers=int(os.environ.get('CHARTS_EXPORT_WORKERS', '2')),
+                        state_dir=os.path.join(EXPORT_DIR, 'jobs'))
 
-    # Drop rows where all values are NaN
-    df = df.dropna(how='all')
+# Snapshot data the export workers load (once per version and worker)
+EXPORT_DATA_DIR = os.path.join(EXPORT_DIR, 'data')
 
-    # Forward fill missing values
-    df = df.ffill()
+# Export job per (data version, range, assets, currency): the same report of
+# the same snapshot is rendered once
+export_jobs = {}
+export_jobs_lock = threading.Lock()
 
-    # Normalize to base 100 (use first valid value for each column)
-    normalized_df = pd.DataFrame()
-    for col in df.columns:
-        first_valid = df[col].first_valid_index()
-        if first_valid is not None:
-            base_value = df.loc[first_valid, col]
-            normalized_df[col] = (df[col] / base_value) * 100
+# Identical concurrent chart requests share one figure computation
+chart_flight = SingleFlight()
 
-    return normalized_df
+# Chart loads on a cold data cache run as cancellable background jobs
+# (threads, so they fill the same in-memory cache as the request threads)
+chart_jobs = JobQueue(workers=int(os.environ.get('CHARTS_CHART_WORKERS', '4')), threads=True)
 
+# Built charts (figure and statistics tiles) and frontier sweeps per data
+# version and inputs; the preset charts in every currency are prewarmed when
+# a snapshot is published
+CHART_CACHE_SIZE = int(os.environ.get('CHARTS_CHART_CACHE_SIZE', '128'))
+chart_cache = OrderedDict()
+chart_cache_lock = threading.Lock()
 
-def calculate_statistics(df):
-    """Calculate CAGR and total return for each index"""
-    stats = []
+ALL_ASSETS = [idx['name'] for idx in INDEXES]
 
-    for col in df.columns:
-        series = df[col].dropna()
-        if len(series) < 2:
-            continue
-
-        first_value = series.iloc[0]
-        last_value = series.iloc[-1]
-
-        # Skip if first value is zero or negative (cannot calculate CAGR)
-        if first_value <= 0:
-            continue
+# Default portfolio mix (in %) shown in the portfolio section
+DEFAULT_MIX = {'SMI (TR)': 60, 'S&P 500 (TR)': 30, 'Gold': 10}
 
-        # Total return
-        total_return = ((last_value - first_value) / first_value) * 100
+# Random portfolios evaluated for the efficient frontier
+FRONTIER_PORTFOLIOS = int(os.environ.get('CHARTS_FRONTIER_PORTFOLIOS', '5000'))
 
-        # CAGR
-        start_date = series.index[0]
-        end_date = series.index[-1]
-        years = (end_date - start_date).days / 365.25
+# Simulated paths of the projection
+PROJECTION_PATHS = int(os.environ.get('CHARTS_PROJECTION_PATHS', '10000'))
 
-        cagr = (pow(last_value / first_value, 1 / years) - 1) * 100 if years > 0 else 0
-        color = next((idx['color'] for idx in INDEXES if idx['name'] == col), 'black')
 
-        stats.append({
-            'name': col,
-            'total_return': total_return,
-            'cagr': cagr,
-            'color': color
-        })
-
-    return stats
+def history_end():
+    """
+    End of the date slider and of every preset: the last day of the current
+    data (today before the first refresh), so the presets of all workers
+    and browsers agree and move on with every refresh
+    """
+    return data_cache.last_date or datetime.combine(datetime.now().date(), datetime.min.time())
 
 
-def generate_slider_marks():
+def generate_slider_marks(end):
     """Generate marks for the date slider (every 2 years)"""
     marks = {}
     start_year = 2000
-    end_year = datetime.now().year
+    end_year = end.year
 
     for year in range(start_year, end_year + 1, 2):
         timestamp = datetime(year, 1, 1).timestamp()
@@ -286,11 +197,79 @@ def generate_slider_marks():
     return marks
 
 
+PRESET_STYLE = {'margin': '0 5px', 'backgroundColor': '#2a2a2a', 'color': '#4da6ff', 'border': '1px solid #4da6ff',
+                'borderRadius': '3px', 'padding': '4px 12px', 'cursor': 'pointer'}
+PRESET_ACTIVE_STYLE = {**PRESET_STYLE, 'backgroundColor': '#4da6ff', 'color': '#1a1a1a'}
+
+
 # Dash Layout
 app.layout = html.Div(style={'backgroundColor': '#1a1a1a', 'color': '#e0e0e0', 'padding': '20px', 'fontFamily': 'sans-serif'}, children=[
-    html.H1('🚀 Index-Performance-Vergleich (CHF, Basis 100)',
+    dcc.Location(id='url', refresh=False),
+    html.H1('🚀 Index-Performance-Vergleich (CHF, Basis 100)', id='page-title',
             style={'color': '#e0e0e0', 'marginBottom': '20px'}),
 
+    html.Div([
+        html.Div([
+            html.Label('Basiswährung:', style={'color': '#b0b0b0', 'marginRight': '10px'}),
+            dcc.RadioItems(
+                id='base-currency',
+                options=[{'label': currency, 'value': currency} for currency in BASE_CURRENCIES],
+                value='CHF',
+                inline=True,
+                inputStyle={'marginRight': '5px', 'marginLeft': '10px'}
+            )
+        ], style={'display': 'inline-block', 'marginRight': '30px'}),
+        html.Div([
+            html.Label('Indizes:', style={'color': '#b0b0b0', 'marginRight': '10px'}),
+            dcc.Checklist(
+                id='asset-selection',
+                options=[{'label': idx['name'], 'value': idx['name']} for idx in INDEXES],
+                value=[idx['name'] for idx in INDEXES],
+                inline=True,
+                inputStyle={'marginRight': '5px', 'marginLeft': '10px'}
+            )
+        ], style={'display': 'inline-block'})
+    ], style={'marginBottom': '20px', 'fontSize': '14px'}),
+
+    html.Div([
+        html.Label('Eigene Symbole:', style={'color': '#b0b0b0', 'marginRight': '10px'}),
+        html.Div(
+            dcc.Dropdown(id='watch-symbol', placeholder='Symbol oder Name suchen, z.B. Nestle', searchable=True,
+                         options=[], style={'color': '#1a1a1a'}),
+            style={'display': 'inline-block', 'width': '320px', 'verticalAlign': 'middle'}
+        ),
+        dcc.Input(id='watch-currency', type='text', value='USD', maxLength=3,
+                  style={'width': '50px', 'marginLeft': '5px', 'backgroundColor': '#1a1a1a', 'color': '#e0e0e0', 'border': '1px solid #444', 'borderRadius': '3px', 'padding': '4px'}),
+        html.Button('Hinzufügen', id='watch-add', n_clicks=0, style={
+            'marginLeft': '5px', 'backgroundColor': '#2a2a2a', 'color': '#4da6ff', 'border': '1px solid #4da6ff',
+            'borderRadius': '3px', 'padding': '4px 10px', 'cursor': 'pointer'
+        }),
+        html.Span(id='watch-status', style={'color': '#b0b0b0', 'marginLeft': '15px'}),
+        html.Div(id='watch-items', style={'display': 'inline-block', 'marginLeft': '15px'}),
+        dcc.Store(id='watchlist', storage_type='local', data=[])
+    ], style={'marginBottom': '20px', 'fontSize': '14px'}),
+
+    html.Div([
+        dcc.Checklist(
+            id='live-toggle',
+            options=[{'label': 'Live-Kurse', 'value': 'on'}],
+            value=[],
+            inline=True,
+            inputStyle={'marginRight': '5px'},
+            style={'display': 'inline-block', 'marginRight': '20px'}
+        ),
+        html.Span(id='live-status', style={'color': '#b0b0b0', 'marginRight': '20px'}),
+        *[html.Span([
+            html.Span(f"{idx['name']}: ", style={'color': idx['color']}),
+            html.Span('–', id={'type': 'live-value', 'index': idx['name']}, style={'fontWeight': 'bold'})
+        ], style={'marginRight': '20px'}) for idx in INDEXES],
+        dcc.Store(id='live-tick')
+    ], style={'marginBottom': '20px', 'fontSize': '14px'}),
+
+    html.Div(id='chart-progress', style={'color': '#b0b0b0', 'fontSize': '14px', 'textAlign': 'center', 'minHeight': '20px'}),
+    dcc.Store(id='chart-job'),
+    dcc.Interval(id='chart-poll', interval=500, disabled=True),
+
     dcc.Loading(
         id="loading",
         type="default",
@@ -314,10 +293,10 @@ app.layout = html.Div(style={'backgroundColor': '#1a1a1a', 'color': '#e0e0e0', '
         ], style={'marginBottom': '25px', 'textAlign': 'center'}),
         dcc.RangeSlider(
             id='date-range-slider',
-            min=datetime(2000, 1, 1).timestamp(),
-            max=datetime.now().timestamp(),
-            value=[datetime(2000, 1, 1).timestamp(), datetime.now().timestamp()],
-            marks=generate_slider_marks(),
+            min=HISTORY_START.timestamp(),
+            max=preset_range('max', history_end())[1],
+            value=preset_range('max', history_end()),
+            marks=generate_slider_marks(history_end()),
             tooltip={
                 "placement": "top",
                 "always_visible": True,
@@ -325,6 +304,10 @@ app.layout = html.Div(style={'backgroundColor': '#1a1a1a', 'color': '#e0e0e0', '
             },
             allowCross=False
         ),
+        html.Div([
+            html.Button(label, id={'type': 'range-preset', 'index': key}, n_clicks=0, style=PRESET_STYLE)
+            for key, label, _ in PRESETS
+        ], style={'marginTop': '35px', 'textAlign': 'center'}),
         html.Div(id='tooltip-formatter', style={'display': 'none'})
     ], style={
         'marginTop': '20px',
@@ -342,10 +325,261 @@ app.layout = html.Div(style={'backgroundColor': '#1a1a1a', 'color': '#e0e0e0', '
                  'backgroundColor': '#2a2a2a',
                  'border': '1px solid #444',
                  'borderRadius': '5px'
-             })
+             }),
+
+    html.Div([
+        html.H2('Portfolio-Mix & Effizienzkurve', style={'marginTop': '0', 'marginBottom': '20px', 'color': '#4da6ff', 'textAlign': 'center'}),
+        html.Div([
+            html.Label('Rebalancing:', style={'color': '#b0b0b0', 'marginRight': '10px'}),
+            dcc.RadioItems(
+                id='rebalance',
+                options=[
+                    {'label': 'Monatlich', 'value': 'monthly'},
+                    {'label': 'Quartalsweise', 'value': 'quarterly'},
+                    {'label': 'Jährlich', 'value': 'annual'},
+                    {'label': 'Nie', 'value': 'none'}
+                ],
+                value='annual',
+                inline=True,
+                inputStyle={'marginRight': '5px', 'marginLeft': '10px'}
+            )
+        ], style={'marginBottom': '15px', 'textAlign': 'center', 'fontSize': '14px'}),
+        html.Div([
+            html.Div([
+                html.Label(f"{idx['name']} (%)", style={'display': 'block', 'color': idx['color'], 'fontSize': '13px', 'marginBottom': '5px'}),
+                dcc.Input(
+                    id={'type': 'portfolio-weight', 'index': idx['name']},
+                    type='number', min=0, max=100, step=5,
+                    value=DEFAULT_MIX.get(idx['name'], 0),
+                    debounce=True,
+                    style={'width': '80px', 'backgroundColor': '#1a1a1a', 'color': '#e0e0e0', 'border': '1px solid #444', 'borderRadius': '3px', 'padding': '4px'}
+                )
+            ], style={'display': 'inline-block', 'margin': '0 10px'})
+            for idx in INDEXES
+        ], style={'textAlign': 'center', 'marginBottom': '15px'}),
+        dcc.Loading(type='default', children=[
+            dcc.Graph(id='frontier-chart', style={'height': '500px'})
+        ])
+    ], style={
+        'marginTop': '20px',
+        'padding': '15px',
+        'backgroundColor': '#2a2a2a',
+        'border': '1px solid #444',
+        'borderRadius': '5px'
+    }),
+
+    html.Div([
+        html.H2('Projektion (Monte Carlo)', style={'marginTop': '0', 'marginBottom': '20px', 'color': '#4da6ff', 'textAlign': 'center'}),
+        html.Div([
+            html.Div([
+                html.Label('Methode:', style={'color': '#b0b0b0', 'marginRight': '10px'}),
+                dcc.RadioItems(
+                    id='projection-method',
+                    options=[
+                        {'label': 'Block-Bootstrap (12 Monate)', 'value': 'block'},
+                        {'label': 'Bootstrap (einzelne Monate)', 'value': 'iid'},
+                        {'label': 'Normalverteilt', 'value': 'parametric'}
+                    ],
+                    value='block',
+                    inline=True,
+                    inputStyle={'marginRight': '5px', 'marginLeft': '10px'}
+                )
+            ], style={'display': 'inline-block', 'marginRight': '30px'}),
+            html.Div([
+                html.Label('Horizont (Jahre):', style={'color': '#b0b0b0', 'marginRight': '10px'}),
+                dcc.Input(id='projection-years', type='number', min=1, max=50, step=1, value=30, debounce=True,
+                          style={'width': '70px', 'backgroundColor': '#1a1a1a', 'color': '#e0e0e0', 'border': '1px solid #444', 'borderRadius': '3px', 'padding': '4px'})
+            ], style={'display': 'inline-block', 'marginRight': '30px'}),
+            html.Div([
+                dcc.Dropdown(id='projection-asset', value='Portfolio', clearable=False,
+                             style={'width': '220px', 'color': '#1a1a1a'})
+            ], style={'display': 'inline-block', 'verticalAlign': 'middle'})
+        ], style={'marginBottom': '15px', 'textAlign': 'center', 'fontSize': '14px'}),
+        dcc.Loading(type='default', children=[
+            html.Div([
+                dcc.Graph(id='projection-fan', style={'height': '450px', 'flex': '2'}),
+                dcc.Graph(id='projection-terminal', style={'height': '450px', 'flex': '1'})
+            ], style={'display': 'flex', 'gap': '10px'})
+        ])
+    ], style={
+        'marginTop': '20px',
+        'padding': '15px',
+        'backgroundColor': '#2a2a2a',
+        'border': '1px solid #444',
+        'borderRadius': '5px'
+    }),
+
+    html.Div([
+        html.H2('Rendite nach Ein- und Ausstiegsmonat', style={'marginTop': '0', 'marginBottom': '20px', 'color': '#4da6ff', 'textAlign': 'center'}),
+        html.Div([
+            dcc.Dropdown(
+                id='heatmap-asset',
+                options=[{'label': idx['name'], 'value': idx['name']} for idx in INDEXES],
+                value=INDEXES[0]['name'],
+                clearable=False,
+                style={'width': '250px', 'color': '#1a1a1a', 'margin': '0 auto'}
+            )
+        ], style={'marginBottom': '15px'}),
+        dcc.Loading(type='default', children=[
+            dcc.Graph(id='cagr-heatmap', style={'height': '650px'})
+        ])
+    ], style={
+        'marginTop': '20px',
+        'padding': '15px',
+        'backgroundColor': '#2a2a2a',
+        'border': '1px solid #444',
+        'borderRadius': '5px'
+    }),
+
+    html.Div([
+        html.H2('Korrelation & Beta', style={'marginTop': '0', 'marginBottom': '20px', 'color': '#4da6ff', 'textAlign': 'center'}),
+        html.Div([
+            html.Div([
+                html.Label('Fenster (Monate):', style={'color': '#b0b0b0', 'marginRight': '10px'}),
+                dcc.RadioItems(
+                    id='correlation-window',
+                    options=[{'label': str(w), 'value': w} for w in WINDOW_OPTIONS],
+                    value=36,
+                    inline=True,
+                    inputStyle={'marginRight': '5px', 'marginLeft': '10px'}
+                )
+            ], style={'display': 'inline-block', 'marginRight': '30px'}),
+            html.Div([
+                html.Label('Zeitreihe:', style={'color': '#b0b0b0', 'marginRight': '10px'}),
+                dcc.RadioItems(
+                    id='correlation-metric',
+                    options=[{'label': 'Beta', 'value': 'beta'},
+                             {'label': 'Korrelation', 'value': 'correlation'}],
+                    value='beta',
+                    inline=True,
+                    inputStyle={'marginRight': '5px', 'marginLeft': '10px'}
+                )
+            ], style={'display': 'inline-block', 'marginRight': '30px'}),
+            html.Div([
+                dcc.Dropdown(id='correlation-benchmark',
+                             options=[{'label': f"gegenüber {idx['name']}", 'value': idx['name']} for idx in INDEXES],
+                             value='S&P 500 (TR)', clearable=False,
+                             style={'width': '250px', 'color': '#1a1a1a'})
+            ], style={'display': 'inline-block', 'verticalAlign': 'middle'})
+        ], style={'marginBottom': '15px', 'textAlign': 'center', 'fontSize': '14px'}),
+        dcc.Loading(type='default', children=[
+            html.Div([
+                dcc.Graph(id='correlation-heatmap', style={'height': '450px', 'flex': '1'}),
+                dcc.Graph(id='correlation-series', style={'height': '450px', 'flex': '2'})
+            ], style={'display': 'flex', 'gap': '10px'})
+        ])
+    ], style={
+        'marginTop': '20px',
+        'padding': '15px',
+        'backgroundColor': '#2a2a2a',
+        'border': '1px solid #444',
+        'borderRadius': '5px'
+    }),
+
+    html.Div([
+        html.Button('📄 PDF exportieren', id='export-button', n_clicks=0, style={
+            'backgroundColor': '#4da6ff',
+            'color': '#1a1a1a',
+            'border': 'none',
+            'borderRadius': '5px',
+            'padding': '10px 20px',
+            'fontWeight': 'bold',
+            'cursor': 'pointer'
+        }),
+        html.Span(id='export-status', style={'marginLeft': '15px', 'color': '#b0b0b0'}),
+        dcc.Store(id='export-job'),
+        dcc.Interval(id='export-poll', interval=1000, disabled=True)
+    ], style={'marginTop': '20px', 'textAlign': 'center'})
 ])
 
 
+def submit_export(start_date, end_date, assets=None, base_currency='CHF'):
+    """
+    Enqueue a PDF report job of the current data snapshot, returns the job
+    id (an existing job for the same snapshot and view is reused)
+    """
+    if base_currency not in BASE_CURRENCIES:
+        raise ValueError(f"Unsupported base currency: {base_currency}")
+    # Validate the dates before the job is queued
+    start = datetime.strptime(start_date, '%Y-%m-%d')
+    end = datetime.strptime(end_date, '%Y-%m-%d')
+
+    # The report is rendered from the snapshot the dashboard shows (without
+    # live quotes); the workers load its data once per version from
+    # EXPORT_DATA_DIR
+    data_cache.get_data()
+    snapshot = data_cache.snapshot
+    version = snapshot.version
+    data_file = save_data(snapshot.panel, version, EXPORT_DATA_DIR,
+                          keep=[snapshot['version'] for snapshot in data_cache.snapshots.list()])
+    key = (version, start_date, end_date, tuple(sorted(assets)) if assets is not None else None, base_currency)
+    with export_jobs_lock:
+        job_id = export_jobs.get(key)
+        job = export_queue.status(job_id) if job_id else None
+        if job is not None and job['status'] in ('queued', 'running'):
+            return job_id
+        if job is not None and job['status'] == 'done' and os.path.exists(job['result'][0]):
+            return job_id
+
+        for stale in [k for k, j in export_jobs.items() if export_queue.status(j) is None]:
+            del export_jobs[stale]
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        filename = os.path.join(
+            EXPORT_DIR,
+            f"index_vergleich_{start:%Y%m%d}_{end:%Y%m%d}_{base_currency}_{version}_{datetime.now():%H%M%S%f}.pdf"
+        )
+        spec = {
+            'filename': filename,
+            'start_date': start_date,
+            'end_date': end_date,
+            'assets': assets,
+            'base_currency': base_currency,
+            'version': version,
+            'data_file': data_file
+        }
+        job_id = export_jobs[key] = export_queue.submit(render_report, spec)
+        return job_id
+
+
+@server.route('/api/export', methods=['POST'])
+def api_export():
+    """Enqueue a PDF export: {start_date, end_date, assets?, base_currency?}"""
+    params = request.get_json(silent=True) or {}
+    try:
+        job_id = submit_export(
+            params['start_date'],
+            params['end_date'],
+            params.get('assets'),
+            params.get('base_currency', 'CHF')
+        )
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f"Invalid export request: {e}"}), 400
+    return jsonify({'job_id': job_id, 'status_url': f"/api/export/{job_id}"}), 202
+
+
+@server.route('/api/export/<job_id>')
+def api_export_status(job_id):
+    """Status of an export job"""
+    job = export_queue.status(job_id)
+    if job is None:
+        abort(404)
+    response = {'job_id': job_id, 'status': job['status'], 'error': job['error']}
+    if job['status'] == 'done':
+        response['download_url'] = f"/api/export/{job_id}/pdf"
+    return jsonify(response)
+
+
+@server.route('/api/export/<job_id>/pdf')
+def api_export_download(job_id):
+    """Download the finished PDF of an export job"""
+    job = export_queue.status(job_id)
+    if job is None or job['status'] != 'done':
+        abort(404)
+    filename, _ = job['result']
+    return send_file(filename, mimetype='application/pdf', as_attachment=True,
+                     download_name=os.path.basename(filename))
+
+
 @app.callback(
     [Output('start-date-label', 'children'),
      Output('end-date-label', 'children')],
@@ -358,6 +592,50 @@ def update_date_labels(slider_values):
     return start_date, end_date
 
 
+@app.callback(
+    [Output('date-range-slider', 'max'),
+     Output('date-range-slider', 'marks'),
+     Output('date-range-slider', 'value'),
+     Output('base-currency', 'value'),
+     Output('asset-selection', 'value'),
+     Output('url', 'search'),
+     Output({'type': 'range-preset', 'index': ALL}, 'style')],
+    [Input('url', 'search'),
+     Input({'type': 'range-preset', 'index': ALL}, 'n_clicks'),
+     Input('date-range-slider', 'value'),
+     Input('base-currency', 'value'),
+     Input('asset-selection', 'value')]
+)
+def sync_url(search, preset_clicks, slider_values, base_currency, assets):
+    """
+    Keep the view and the URL in sync: a loaded or edited URL sets the
+    controls, a preset button sets the slider, and every change of the
+    controls is written back to the URL (shareable links). The slider ends
+    at the last day of the current data when the page is loaded.
+    """
+    triggered = dash.ctx.triggered_id
+    end = history_end()
+    slider = [dash.no_update, dash.no_update]
+    controls = [dash.no_update, dash.no_update, dash.no_update]
+
+    if triggered is None or triggered == 'url':
+        decoded = decode_state(search, end, ALL_ASSETS, BASE_CURRENCIES)
+        slider = [preset_range('max', end)[1], generate_slider_marks(end)]
+        # A URL without a range shows the full history
+        slider_values = decoded[0] or preset_range('max', end)
+        base_currency = decoded[1] or base_currency
+        assets = decoded[2] if decoded[2] is not None else assets
+        controls = [slider_values] + [value if value is not None else dash.no_update for value in decoded[1:]]
+    elif isinstance(triggered, dict) and triggered.get('type') == 'range-preset':
+        slider_values = preset_range(triggered['index'], end)
+        controls[0] = slider_values
+
+    new_search = encode_state(slider_values, base_currency, assets, end, ALL_ASSETS)
+    preset = match_preset(slider_values, end)
+    styles = [PRESET_ACTIVE_STYLE if key == preset else PRESET_STYLE for key, _, _ in PRESETS]
+    return *slider, *controls, new_search if new_search != (search or '') else dash.no_update, styles
+
+
 # Clientside callback to format tooltip values as human-readable dates
 app.clientside_callback(
     """
@@ -391,23 +669,392 @@ app.clientside_callback(
 )
 
 
+# Page title follows the base currency of charts and exports
+app.clientside_callback(
+    """
+    function(baseCurrency) {
+        return `🚀 Index-Performance-Vergleich (${baseCurrency}, Basis 100)`;
+    }
+    """,
+    Output('page-title', 'children'),
+    Input('base-currency', 'value')
+)
+
+
+# Live mode: one EventSource per browser, ticks land in the live-tick store
+app.clientside_callback(
+    """
+    function(enabled) {
+        if (window.chartsLiveSource) {
+            window.chartsLiveSource.close();
+            window.chartsLiveSource = null;
+        }
+        if (!enabled || enabled.length === 0) return '';
+
+        const source = new EventSource('/api/live');
+        source.onmessage = (event) => {
+            window.dash_clientside.set_props('live-tick', {data: JSON.parse(event.data)});
+        };
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                window.dash_clientside.set_props('live-status', {children: 'Live-Modus nicht verfügbar'});
+            }
+        };
+        window.chartsLiveSource = source;
+        return 'Verbinde...';
+    }
+    """,
+    Output('live-status', 'children'),
+    Input('live-toggle', 'value')
+)
+
+
+# Latest values of the current tick in the selected base currency
+app.clientside_callback(
+    """
+    function(tick, baseCurrency) {
+        const outputs = window.dash_clientside.callback_context.outputs_list;
+        if (!tick) return outputs.map(() => '–');
+        const quotes = tick.quotes[baseCurrency] || {};
+        window.dash_clientside.set_props('live-status', {children: 'Stand ' + tick.time.slice(11)});
+        return outputs.map((output) => {
+            const quote = quotes[output.id.index];
+            if (!quote) return '–';
+            const value = quote.value.toLocaleString('de-CH', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+            if (quote.change === null) return value;
+            return `${value} (${quote.change >= 0 ? '+' : ''}${quote.change.toFixed(2)}%)`;
+        });
+    }
+    """,
+    Output({'type': 'live-value', 'index': ALL}, 'children'),
+    [Input('live-tick', 'data'),
+     Input('base-currency', 'value')]
+)
+
+
+@app.callback(
+    [Output('export-job', 'data'),
+     Output('export-poll', 'disabled', allow_duplicate=True),
+     Output('export-status', 'children', allow_duplicate=True)],
+    [Input('export-button', 'n_clicks')],
+    [State('date-range-slider', 'value'),
+     State('asset-selection', 'value'),
+     State('base-currency', 'value')],
+    prevent_initial_call=True
+)
+def start_export(n_clicks, slider_values, assets, base_currency):
+    """Enqueue a PDF export for the current view and start polling"""
+    start_date = datetime.fromtimestamp(slider_values[0]).strftime('%Y-%m-%d')
+    end_date = datetime.fromtimestamp(slider_values[1]).strftime('%Y-%m-%d')
+    job_id = submit_export(start_date, end_date, assets, base_currency)
+    return job_id, False, 'PDF wird erstellt...'
+
+
+@app.callback(
+    [Output('export-status', 'children'),
+     Output('export-poll', 'disabled')],
+    [Input('export-poll', 'n_intervals')],
+    [State('export-job', 'data')],
+    prevent_initial_call=True
+)
+def poll_export(n_intervals, job_id):
+    """Show the state of the running export, stop polling when it is finished"""
+    job = export_queue.status(job_id) if job_id else None
+    if job is None:
+        return ('Export-Auftrag nicht gefunden' if job_id else ''), True
+    if job['status'] == 'done':
+        return html.A('📥 PDF herunterladen', href=f"/api/export/{job_id}/pdf",
+                      style={'color': '#4da6ff', 'fontWeight': 'bold'}), True
+    if job['status'] == 'failed':
+        return f"Fehler beim Export: {job['error']}", True
+    return 'PDF wird erstellt...', False
+
+
+@app.callback(
+    [Output('watchlist', 'data'),
+     Output('watch-status', 'children'),
+     Output('watch-symbol', 'value')],
+    [Input('watch-add', 'n_clicks'),
+     Input({'type': 'watch-remove', 'index': ALL}, 'n_clicks')],
+    [State('watch-symbol', 'value'),
+     State('watch-currency', 'value'),
+     State('watchlist', 'data')],
+    prevent_initial_call=True
+)
+def update_watchlist(n_clicks, remove_clicks, symbol, currency, watchlist):
+    """Add a symbol to the browser's watchlist or remove one"""
+    watchlist = watchlist or []
+    triggered = dash.ctx.triggered_id
+
+    if isinstance(triggered, dict):
+        # Remove buttons also fire when they are rendered (n_clicks None)
+        if not dash.ctx.triggered[0]['value']:
+            return dash.no_update, dash.no_update, dash.no_update
+        return [e for e in watchlist if e['symbol'] != triggered['index']], '', dash.no_update
+
+    try:
+        entry = parse_entry(symbol, currency)
+    except ValueError as e:
+        return dash.no_update, str(e), dash.no_update
+    if any(e['symbol'] == entry['symbol'] for e in watchlist):
+        return dash.no_update, f"{entry['symbol']} ist bereits in der Liste", None
+    if len(watchlist) >= MAX_WATCHLIST:
+        return dash.no_update, f"Maximal {MAX_WATCHLIST} eigene Symbole", dash.no_update
+
+    # Fetch right away: unknown symbols are rejected, known ones are cached for the chart
+    _, errors = symbol_cache.get_many([entry['symbol']])
+    if errors:
+        return dash.no_update, f"Keine Daten für {entry['symbol']}", dash.no_update
+
+    used = {e['color'] for e in watchlist}
+    entry['color'] = next((c for c in WATCHLIST_COLORS if c not in used), WATCHLIST_COLORS[0])
+    return watchlist + [entry], '', None
+
+
+@app.callback(
+    Output('watch-symbol', 'options'),
+    [Input('watch-symbol', 'search_value')],
+    [State('watch-symbol', 'value')]
+)
+def search_symbols(search_value, value):
+    """Autocomplete from the offline symbol index (runs on every keystroke)"""
+    if not search_value:
+        return dash.no_update
+    options = [{'label': f"{r['symbol']} – {r['name']} ({r['exchange']}, {r['currency']})", 'value': r['symbol']}
+               for r in symbol_index.search(search_value)]
+    # Symbols missing from the list can still be entered as typed
+    typed = search_value.strip().upper()
+    if SYMBOL_PATTERN.match(typed) and all(o['value'] != typed for o in options):
+        options.append({'label': f"{typed} (nicht im Verzeichnis)", 'value': typed})
+    if value and all(o['value'] != value for o in options):
+        options.insert(0, {'label': value, 'value': value})
+    return options
+
+
+@app.callback(
+    Output('watch-currency', 'value'),
+    [Input('watch-symbol', 'value')],
+    prevent_initial_call=True
+)
+def fill_currency(symbol):
+    """Quote currency of a listed symbol"""
+    record = symbol_index.get(symbol) if symbol else None
+    return record['currency'] if record else dash.no_update
+
+
+@app.callback(
+    Output('watch-items', 'children'),
+    [Input('watchlist', 'data')]
+)
+def render_watchlist(watchlist):
+    """Watchlist symbols with remove buttons"""
+    return [
+        html.Span([
+            html.Span(f"{e['symbol']} ({e['currency']})", style={'color': e['color']}),
+            html.Button('×', id={'type': 'watch-remove', 'index': e['symbol']}, style={
+                'marginLeft': '4px', 'backgroundColor': 'transparent', 'color': '#b0b0b0',
+                'border': 'none', 'cursor': 'pointer'
+            })
+        ], style={'marginRight': '12px'})
+        for e in watchlist or []
+    ]
+
+
 @app.callback(
     [Output('performance-chart', 'figure'),
-     Output('statistics', 'children')],
-    [Input('date-range-slider', 'value')]
+     Output('statistics', 'children'),
+     Output('chart-job', 'data'),
+     Output('chart-poll', 'disabled'),
+     Output('chart-progress', 'children')],
+    [Input('date-range-slider', 'value'),
+     Input('asset-selection', 'value'),
+     Input('base-currency', 'value'),
+     Input('watchlist', 'data')],
+    [State('chart-job', 'data')]
+)
+def update_chart(slider_values, assets, base_currency, watchlist=None, previous_job=None):
+    """
+    Update chart and statistics based on date range, assets, base currency and watchlist
+
+    With fresh data the chart is built right away. On a cold cache the work
+    goes to a background job that poll_chart follows; a job still running
+    for an earlier input of this browser is cancelled. Jobs live in this
+    process, so with several server processes (where a poll may reach
+    another one) the chart is always built within the request.
+    """
+    if previous_job:
+        chart_jobs.cancel(previous_job)
+
+    if data_cache.is_fresh() or SERVER_PROCESSES > 1:
+        fig, stats_children = render_chart(slider_values, assets, base_currency, watchlist)
+        return fig, stats_children, None, True, ''
+
+    no_store()
+    # A profiled request skipping the caches passes that on to the job thread
+    job_id = chart_jobs.submit_cancellable(chart_job, slider_values, assets, base_currency, watchlist,
+                                           bypass=bypass_cache())
+    return dash.no_update, dash.no_update, job_id, False, 'Lade Kursdaten...'
+
+
+@app.callback(
+    [Output('performance-chart', 'figure', allow_duplicate=True),
+     Output('statistics', 'children', allow_duplicate=True),
+     Output('chart-poll', 'disabled', allow_duplicate=True),
+     Output('chart-progress', 'children', allow_duplicate=True)],
+    [Input('chart-poll', 'n_intervals')],
+    [State('chart-job', 'data'),
+     State('date-range-slider', 'value'),
+     State('asset-selection', 'value'),
+     State('base-currency', 'value'),
+     State('watchlist', 'data')],
+    prevent_initial_call=True
 )
-def update_chart(slider_values):
-    """Update chart and statistics based on date range"""
+def poll_chart(n_intervals, job_id, slider_values=None, assets=None, base_currency='CHF', watchlist=None):
+    """
+    Progress of the background chart job, the chart once it is done
+
+    A job this process does not know (e.g. after a server restart) is not
+    waited for: the chart is built within the request instead.
+    """
+    if not job_id:
+        return dash.no_update, dash.no_update, True, ''
+    job = chart_jobs.status(job_id)
+    if job is None:
+        fig, stats_children = render_chart(slider_values, assets, base_currency, watchlist)
+        return fig, stats_children, True, ''
+    if job['status'] == 'cancelled':
+        return dash.no_update, dash.no_update, True, ''
+    if job['status'] == 'done':
+        fig, stats_children = job['result']
+        return fig, stats_children, True, ''
+    if job['status'] == 'failed':
+        return dash.no_update, dash.no_update, True, f"Fehler beim Laden: {job['error']}"
+
+    progress = data_cache.progress
+    if progress and progress['total']:
+        symbol = f" – {progress['symbol']}" if progress['symbol'] else ''
+        return dash.no_update, dash.no_update, False, [
+            html.Progress(value=str(progress['done']), max=str(progress['total']),
+                          style={'width': '200px', 'marginRight': '10px', 'verticalAlign': 'middle'}),
+            f"Lade Kursdaten {progress['done']}/{progress['total']}{symbol}"
+        ]
+    return dash.no_update, dash.no_update, False, 'Berechne Chart...'
+
+
+def chart_job(slider_values, assets, base_currency, watchlist, cancelled, bypass=False):
+    """
+    Background chart load, stops at the next step once superseded (bypass:
+    skip the caches like the profiled request that started it)
+    """
+    def checkpoint():
+        if cancelled.is_set():
+            raise JobCancelled()
+
+    with cache_bypass(bypass):
+        checkpoint()
+        data_cache.get_data()
+        return render_chart(slider_values, assets, base_currency, watchlist, checkpoint)
+
+
+def render_chart(slider_values, assets, base_currency, watchlist=None, checkpoint=None):
+    """Chart figure and statistics tiles for the inputs of update_chart"""
+    checkpoint = checkpoint or (lambda: None)
 
     # Convert timestamps to date strings
     start_date = datetime.fromtimestamp(slider_values[0]).strftime('%Y-%m-%d')
     end_date = datetime.fromtimestamp(slider_values[1]).strftime('%Y-%m-%d')
 
-    # Fetch all data
-    all_data = fetch_all_data()
+    # Process and scale data (cached per data version, shared with the data API)
+    version, df = data_cache.get_panel(start_date, end_date, assets, base_currency)
+    checkpoint()
+
+    # User symbols come from the shared symbol cache and are scaled on their own
+    colors = {e['symbol']: e['color'] for e in watchlist or []}
+    if watchlist:
+        extra, errors = convert_watchlist(watchlist, base_currency)
+        if errors and has_request_context():
+            # Retry the missing symbols on the next request
+            no_store()
+        if not extra.empty:
+            df = df.join(scale_data(extra, start_date, end_date), how='outer')
+        checkpoint()
+
+    asset_key = tuple(sorted(assets)) if assets is not None else None
+    watch_key = tuple(sorted(colors.items()))
+    key = (version, start_date, end_date, asset_key, base_currency, watch_key)
+    return cached_result(key, build_chart, df, base_currency, colors, data_cache.snapshot_of(version), version)
+
+
+def cached_result(key, fn, *args):
+    """
+    fn(*args) from the chart cache (key must start with the data version),
+    computed once for concurrent identical requests
+    """
+    with chart_cache_lock:
+        if key in chart_cache and not bypass_cache():
+            chart_cache.move_to_end(key)
+            return chart_cache[key]
+
+    result = chart_flight.do(key, fn, *args)
+    with chart_cache_lock:
+        # Results of earlier snapshots stay until evicted (served again after a rollback)
+        chart_cache[key] = result
+        while len(chart_cache) > CHART_CACHE_SIZE:
+            chart_cache.popitem(last=False)
+    return result
+
+
+@data_cache.on_publish
+def prewarm_presets(version):
+    """Build the preset charts (all assets, no own symbols) in every currency in the background"""
+    def run():
+        t0 = time.perf_counter()
+        end = data_cache.snapshots.get(version).panel.dates[-1].to_pydatetime()
+        for base_currency in BASE_CURRENCIES:
+            for key, _, _ in PRESETS:
+                if data_cache.snapshot_version != version:
+                    return
+                render_chart(preset_range(key, end), ALL_ASSETS, base_currency)
+        print(f"Prewarmed {len(PRESETS) * len(BASE_CURRENCIES)} preset charts for {version} "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+@data_cache.on_publish
+def prewarm_heatmaps(version):
+    """Compute the CAGR matrices of all assets in every currency in the background"""
+    def run():
+        for base_currency in BASE_CURRENCIES:
+            if data_cache.snapshot_version != version:
+                return
+            _, converted = data_cache.get_converted(base_currency)
+            heatmap_cache.warm(version, base_currency, converted.resample('ME').last())
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+@data_cache.on_publish
+def publish_static(version):
+    """Regenerate the static page (CHARTS_STATIC_DIR) for the new snapshot in the background"""
+    if not STATIC_DIR:
+        return
+
+    def run():
+        try:
+            export_static(data_cache, STATIC_DIR, data_cache.snapshots.get(version))
+        except Exception as e:
+            print(f"Static export for {version} failed: {e}")
+
+    threading.Thread(target=run, daemon=True).start()
 
-    # Process and scale data
-    df = process_and_scale_data(all_data, start_date, end_date)
+
+def build_chart(df, base_currency, colors=None, snapshot=None, version=None):
+    """
+    Chart figure and statistics tiles for a normalized panel (colors: user
+    symbols, snapshot and version: the data it was computed from, version
+    differs from the snapshot's with live quotes)
+    """
 
     # Create Plotly figure
     fig = go.Figure()
@@ -424,28 +1071,22 @@ def update_chart(slider_values):
                 hovertemplate='%{y:.2f}<extra></extra>'
             ))
 
-    # Update layout
-    fig.update_layout(
-        title='Index Performance Vergleich (Basis 100 in CHF)',
-        xaxis_title='Datum',
-        yaxis_title='Indexwert (Basis 100)',
-        hovermode='x unified',
-        template='plotly_dark',
-        plot_bgcolor='#1a1a1a',
-        paper_bgcolor='#2a2a2a',
-        font=dict(color='#e0e0e0'),
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        margin=dict(l=50, r=50, t=80, b=50)
-    )
+    for name, color in (colors or {}).items():
+        if name in df.columns:
+            fig.add_trace(go.Scatter(
+                x=df.index,
+                y=df[name],
+                mode='lines',
+                name=name,
+                line=dict(color=color, width=2, dash='dot'),
+                hovertemplate='%{y:.2f}<extra></extra>'
+            ))
+
+    # Update layout (shared with the static page)
+    fig.update_layout(**chart_layout(base_currency))
 
     # Calculate statistics
-    stats = calculate_statistics(df)
+    stats = calculate_statistics(df, colors)
 
     # Create statistics display with animated tiles
     stats_children = [
@@ -483,11 +1124,302 @@ def update_chart(slider_values):
             for i, stat in enumerate(stats)
         ])
     ]
+    if snapshot is not None:
+        stats_children.append(html.Div(
+            f"Datenstand {snapshot.created_at:%d.%m.%Y %H:%M} · Version {version or snapshot.version}"
+            + (" · mit Live-Kursen" if version and version != snapshot.version else ""),
+            style={'marginTop': '10px', 'textAlign': 'right', 'fontSize': '12px', 'color': '#808080'}
+        ))
 
     return fig, stats_children
 
 
+@app.callback(
+    Output('frontier-chart', 'figure'),
+    [Input('date-range-slider', 'value'),
+     Input('asset-selection', 'value'),
+     Input('base-currency', 'value'),
+     Input('rebalance', 'value'),
+     Input({'type': 'portfolio-weight', 'index': ALL}, 'value')]
+)
+def update_frontier(slider_values, assets, base_currency, rebalance, mix_values):
+    """Efficient frontier of random portfolios plus the user's own mix"""
+    start_date = datetime.fromtimestamp(slider_values[0]).strftime('%Y-%m-%d')
+    end_date = datetime.fromtimestamp(slider_values[1]).strftime('%Y-%m-%d')
+    version, df = data_cache.get_panel(start_date, end_date, assets, base_currency, live=False)
+
+    fig = go.Figure()
+    fig.update_layout(
+        title=f'Rendite vs. Volatilität ({base_currency})',
+        xaxis_title='Volatilität p.a. (%)',
+        yaxis_title='CAGR (%)',
+        template='plotly_dark',
+        plot_bgcolor='#1a1a1a',
+        paper_bgcolor='#2a2a2a',
+        font=dict(color='#e0e0e0'),
+        hovermode='closest',
+        margin=dict(l=50, r=50, t=60, b=50)
+    )
+    if len(monthly_returns(df)) < 2:
+        return fig
+
+    asset_key = tuple(sorted(assets)) if assets is not None else None
+    sweep = cached_result((version, 'frontier', start_date, end_date, asset_key, base_currency, rebalance),
+                          frontier_sweep, df, FRONTIER_PORTFOLIOS, rebalance)
+    names = sweep['assets']
+    colors = {idx['name']: idx['color'] for idx in INDEXES}
+    hover = '<br>'.join(f"{name}: %{{customdata[{i}]:.0%}}" for i, name in enumerate(names))
+
+    fig.add_trace(go.Scattergl(
+        x=sweep['volatility'], y=sweep['cagr'],
+        mode='markers',
+        name='Zufällige Portfolios',
+        marker=dict(size=4, opacity=0.5, color=sweep['cagr'] / sweep['volatility'],
+                    colorscale='Viridis', colorbar=dict(title='CAGR / Vol.')),
+        customdata=sweep['weights'],
+        hovertemplate='CAGR %{y:.2f}%, Vol. %{x:.2f}%<br>' + hover + '<extra></extra>'
+    ))
+    frontier = sweep['frontier']
+    fig.add_trace(go.Scatter(
+        x=sweep['volatility'][frontier], y=sweep['cagr'][frontier],
+        mode='lines', name='Effizienzkurve', line=dict(color='#4da6ff', width=2),
+        hoverinfo='skip'
+    ))
+
+    # Single assets are the first len(names) rows of the sweep
+    fig.add_trace(go.Scatter(
+        x=sweep['volatility'][:len(names)], y=sweep['cagr'][:len(names)],
+        mode='markers+text', name='Einzelne Indizes',
+        text=names, textposition='top center',
+        marker=dict(size=10, color=[colors.get(name, '#e0e0e0') for name in names]),
+        hovertemplate='%{text}<br>CAGR %{y:.2f}%, Vol. %{x:.2f}%<extra></extra>'
+    ))
+
+    # User's mix, normalized over the assets present in the panel
+    mix = dict(zip([idx['name'] for idx in INDEXES], mix_values))
+    weights = [max(mix.get(name) or 0, 0) for name in names]
+    if sum(weights) > 0:
+        weights = [w / sum(weights) for w in weights]
+        returns = monthly_returns(df)
+        cagr, volatility = summarize(portfolio_returns(returns.to_numpy(), [weights], rebalance, returns.index))
+        label = ', '.join(f"{w:.0%} {name}" for name, w in zip(names, weights) if w > 0)
+        fig.add_trace(go.Scatter(
+            x=volatility, y=cagr,
+            mode='markers', name='Ihr Mix',
+            marker=dict(size=16, symbol='star', color='#ffffff', line=dict(color='#4da6ff', width=2)),
+            hovertemplate=f'Ihr Mix: {label}<br>CAGR %{{y:.2f}}%, Vol. %{{x:.2f}}%<extra></extra>'
+        ))
+
+    return fig
+
+
+@app.callback(
+    [Output('projection-fan', 'figure'),
+     Output('projection-terminal', 'figure'),
+     Output('projection-asset', 'options')],
+    [Input('date-range-slider', 'value'),
+     Input('asset-selection', 'value'),
+     Input('base-currency', 'value'),
+     Input('projection-method', 'value'),
+     Input('projection-years', 'value'),
+     Input('projection-asset', 'value'),
+     Input({'type': 'portfolio-weight', 'index': ALL}, 'value')]
+)
+def update_projection(slider_values, assets, base_currency, method, years, selected, mix_values):
+    """Percentile fan and terminal distribution from resampled monthly returns"""
+    start_date = datetime.fromtimestamp(slider_values[0]).strftime('%Y-%m-%d')
+    end_date = datetime.fromtimestamp(slider_values[1]).strftime('%Y-%m-%d')
+    version, df = data_cache.get_panel(start_date, end_date, assets, base_currency, live=False)
+    years = int(years or 30)
+
+    layout = dict(
+        template='plotly_dark',
+        plot_bgcolor='#1a1a1a',
+        paper_bgcolor='#2a2a2a',
+        font=dict(color='#e0e0e0'),
+        margin=dict(l=50, r=30, t=60, b=50)
+    )
+    fan = go.Figure(layout=layout)
+    terminal = go.Figure(layout=layout)
+
+    returns = monthly_returns(df)
+    names = list(returns.columns)
+    mix = dict(zip([idx['name'] for idx in INDEXES], mix_values))
+    weights = tuple(max(mix.get(name) or 0, 0) for name in names)
+    options = [{'label': 'Ihr Mix', 'value': 'Portfolio'}] if sum(weights) > 0 else []
+    options += [{'label': name, 'value': name} for name in names]
+    if len(returns) < 12 or not options:
+        return fan, terminal, options
+
+    settings = {'block': ('bootstrap', 12), 'iid': ('bootstrap', 1), 'parametric': ('parametric', 1)}[method]
+    key = ('projection', version, start_date, end_date, tuple(names), base_currency, method, years, weights)
+    result = chart_flight.do(key, simulate, returns, years, PROJECTION_PATHS, settings[0],
+                             block_length=settings[1], weights=weights if sum(weights) > 0 else None)
+
+    if selected not in result['assets']:
+        selected = result['assets'][-1] if 'Portfolio' in result['assets'] else names[0]
+    column = result['assets'].index(selected)
+    color = next((idx['color'] for idx in INDEXES if idx['name'] == selected), '#4da6ff')
+    label = 'Ihr Mix' if selected == 'Portfolio' else selected
+    p = {q: values[:, column] * 100 for q, values in result['percentiles'].items()}
+    x = result['years']
+
+    fan.add_trace(go.Scatter(x=x, y=p[95], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+    fan.add_trace(go.Scatter(x=x, y=p[5], mode='lines', line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(77, 166, 255, 0.15)', name='5–95 %'))
+    fan.add_trace(go.Scatter(x=x, y=p[75], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'))
+    fan.add_trace(go.Scatter(x=x, y=p[25], mode='lines', line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(77, 166, 255, 0.35)', name='25–75 %'))
+    fan.add_trace(go.Scatter(x=x, y=p[50], mode='lines', line=dict(color=color, width=3), name='Median',
+                             hovertemplate='Jahr %{x}: %{y:.0f}<extra></extra>'))
+    fan.update_layout(
+        title=f"{label}: {PROJECTION_PATHS:,} Pfade über {years} Jahre".replace(',', "'") + f" (Start 100, {base_currency})",
+        xaxis_title='Jahre', yaxis_title='Wert (Start 100)', yaxis_type='log', hovermode='x unified'
+    )
+
+    terminal_values = result['terminal'][:, column] * 100
+    terminal.add_trace(go.Histogram(x=np.log10(terminal_values), nbinsx=60, marker_color=color,
+                                    hovertemplate='%{y} Pfade<extra></extra>'))
+    ticks = [v for v in (10, 30, 100, 300, 1000, 3000, 10000, 30000) if terminal_values.min() / 2 <= v <= terminal_values.max() * 2]
+    terminal.update_layout(
+        title=f'Endwert nach {years} Jahren',
+        xaxis=dict(title='Endwert (Start 100)', tickvals=np.log10(ticks), ticktext=[str(v) for v in ticks]),
+        yaxis_title='Anzahl Pfade', bargap=0.05
+    )
+
+    return fan, terminal, options
+
+
+@app.callback(
+    Output('cagr-heatmap', 'figure'),
+    [Input('heatmap-asset', 'value'),
+     Input('base-currency', 'value')]
+)
+def update_heatmap(asset, base_currency):
+    """CAGR for every start and end month of the full history"""
+    version, converted = data_cache.get_converted(base_currency)
+    monthly = converted.resample('ME').last()
+
+    fig = go.Figure()
+    fig.update_layout(
+        title=f'{asset}: CAGR p.a. in {base_currency} (Zeile = Einstieg, Spalte = Ausstieg)',
+        xaxis_title='Ausstieg',
+        yaxis_title='Einstieg',
+        template='plotly_dark',
+        plot_bgcolor='#1a1a1a',
+        paper_bgcolor='#2a2a2a',
+        font=dict(color='#e0e0e0'),
+        margin=dict(l=60, r=30, t=60, b=50)
+    )
+    if asset not in monthly.columns:
+        return fig
+
+    dates, cagr = heatmap_cache.get(version, base_currency, asset, monthly[asset])
+
+    labels = dates.strftime('%Y-%m')
+    limit = float(np.nanpercentile(np.abs(cagr), 98)) if np.isfinite(cagr).any() else 1
+    fig.add_trace(go.Heatmap(
+        x=labels, y=labels, z=cagr,
+        colorscale='RdYlGn', zmid=0, zmin=-limit, zmax=limit,
+        colorbar=dict(title='% p.a.'),
+        hovertemplate='Einstieg %{y}<br>Ausstieg %{x}<br>CAGR %{z:.1f}% p.a.<extra></extra>'
+    ))
+    return fig
+
+
+@app.callback(
+    [Output('correlation-heatmap', 'figure'),
+     Output('correlation-series', 'figure')],
+    [Input('date-range-slider', 'value'),
+     Input('asset-selection', 'value'),
+     Input('base-currency', 'value'),
+     Input('correlation-window', 'value'),
+     Input('correlation-benchmark', 'value'),
+     Input('correlation-metric', 'value')]
+)
+def update_correlation(slider_values, assets, base_currency, window, benchmark, metric):
+    """Correlation matrix of the last window and rolling beta / correlation against the benchmark"""
+    start_date = datetime.fromtimestamp(slider_values[0]).strftime('%Y-%m-%d')
+    end_date = datetime.fromtimestamp(slider_values[1]).strftime('%Y-%m-%d')
+
+    # The benchmark is always included, even if it is not shown in the main chart
+    selected = sorted(set(assets or []) | {benchmark})
+    _, panel = data_cache.get_panel(start_date, end_date, selected, base_currency, live=False)
+    returns = monthly_returns(panel)
+
+    layout = dict(
+        template='plotly_dark',
+        plot_bgcolor='#1a1a1a',
+        paper_bgcolor='#2a2a2a',
+        font=dict(color='#e0e0e0'),
+        margin=dict(l=60, r=30, t=60, b=50)
+    )
+    heatmap = go.Figure()
+    heatmap.update_layout(**layout)
+    series = go.Figure()
+    series.update_layout(**layout)
+
+    if benchmark not in returns.columns or len(returns) < window:
+        message = f'Zu wenig gemeinsame Monate für ein Fenster von {window} Monaten'
+        heatmap.update_layout(title=message)
+        series.update_layout(title=message)
+        return heatmap, series
+
+    result = rolling_correlation(returns, window, benchmark)
+    names = result['assets']
+    heatmap.add_trace(go.Heatmap(
+        x=names, y=names, z=result['correlation'][-1],
+        colorscale='RdBu', zmid=0, zmin=-1, zmax=1,
+        texttemplate='%{z:.2f}',
+        hovertemplate='%{y} / %{x}<br>Korrelation %{z:.2f}<extra></extra>'
+    ))
+    heatmap.update_layout(title=f"Korrelation {window} Monate bis {result['dates'][-1]:%Y-%m} ({base_currency})",
+                          yaxis=dict(autorange='reversed'))
+
+    b = names.index(benchmark)
+    colors = {idx['name']: idx['color'] for idx in INDEXES}
+    for i, name in enumerate(names):
+        if i == b:
+            continue
+        values = result['beta'][:, i] if metric == 'beta' else result['correlation'][:, i, b]
+        series.add_trace(go.Scatter(
+            x=result['dates'], y=values, mode='lines', name=name,
+            line=dict(color=colors.get(name), width=2),
+            hovertemplate='%{y:.2f}<extra></extra>'
+        ))
+    label = 'Beta' if metric == 'beta' else 'Korrelation'
+    series.update_layout(
+        title=f'Rollierendes {label} gegenüber {benchmark} ({window} Monate, {base_currency})',
+        xaxis_title='Fensterende',
+        yaxis_title=label,
+        hovermode='x unified',
+        legend=dict(orientation='h', yanchor='bottom', y=1.02, xanchor='right', x=1)
+    )
+    return heatmap, series
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Index performance comparison dashboard')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', '8000')))
+    parser.add_argument('--prod', action='store_true',
+                        help='Serve with waitress (multi-threaded production WSGI server)')
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('CHARTS_THREADS', '8')),
+                        help='Request threads in --prod mode')
+    parser.add_argument('--live', choices=sorted(TICK_SOURCES),
+                        help='Enable the live intraday mode with this tick source')
+    args = parser.parse_args()
+
+    if args.live:
+        live_feed.source = make_source(args.live)
+    if args.prod and 'CHARTS_LIVE_MAX_CLIENTS' not in os.environ:
+        live_feed.max_clients = max(1, args.threads // 2)
+
     print("Starting Flask + Dash server...")
-    print("Access the application at: http://localhost:8000")
-    server.run(debug=False, host='0.0.0.0', port=8000)
+    print(f"Access the application at: http://localhost:{args.port}")
+    if args.prod:
+        from waitress import serve
+        print(f"Production mode: waitress with {args.threads} threads")
+        serve(server, host=args.host, port=args.port, threads=args.threads)
+    else:
+        server.run(debug=False, host=args.host, port=args.port)
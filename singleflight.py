@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Single-flight request coalescing: concurrent calls with the same key share
+one in-flight computation instead of each doing the work
+"""
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Usage:
+        flight = SingleFlight()
+        value = flight.do(('panel', version, start, end), compute_panel, start, end)
+
+    The first caller for a key runs fn; callers arriving while it runs wait
+    and receive the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self):
+        """Number of computations currently running"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Immutable, content-addressed snapshots of the market data
+
+Every refresh publishes a Snapshot: the PricePanel (arrays made read-only),
+its content hash, the creation time and where each series came from. The
+version of a snapshot is derived from its content, so a refresh that
+returns identical data keeps the version and every cache keyed on it stays
+valid. The last SNAPSHOT_HISTORY snapshots are kept, so a bad refresh can
+be rolled back to an earlier one; caches still holding results for that
+version serve them without recomputing.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+# Snapshots kept for rollback
+SNAPSHOT_HISTORY = int(os.environ.get('CHARTS_SNAPSHOT_HISTORY', '5'))
+
+# Hex digits of the content hash used as version
+VERSION_LENGTH = 16
+
+
+def content_hash(panel):
+    """SHA-256 over keys, symbols, calendar, values and validity of a panel"""
+    digest = hashlib.sha256()
+    for part in (panel.keys, panel.symbols):
+        digest.update('\0'.join(part.tolist()).encode())
+        digest.update(b'\1')
+    # Values without a quote are NaN with arbitrary payload bits; hash them as 0
+    values = np.where(panel.valid, panel.values, np.float32(0))
+    for array in (panel.days, values, panel.valid):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def describe_sources(panel, provider, overrides=None):
+    """
+    Per-series source metadata of a panel
+
+    Args:
+        provider: Name of the data source (e.g. 'yahoo', 'offline')
+        overrides: Optional dict key -> provider for series from elsewhere
+            (e.g. hardcoded data)
+
+    Returns:
+        dict: key -> {'symbol', 'provider', 'rows', 'first', 'last'}
+    """
+    sources = {}
+    dates = panel.dates
+    for column, key in enumerate(panel.keys.tolist()):
+        rows = np.flatnonzero(panel.valid[:, column])
+        sources[key] = {
+            'symbol': str(panel.symbols[column]),
+            'provider': (overrides or {}).get(key, provider),
+            'rows': int(len(rows)),
+            'first': f"{dates[rows[0]]:%Y-%m-%d}" if len(rows) else None,
+            'last': f"{dates[rows[-1]]:%Y-%m-%d}" if len(rows) else None
+        }
+    return sources
+
+
+class Snapshot:
+    """
+    One published state of the market data
+
+    Attributes:
+        version: Short content hash, used as cache key everywhere
+        content_hash: Full SHA-256 of the panel
+        created_at: datetime of the refresh that produced it
+        panel: PricePanel with read-only arrays
+        sources: Per-series metadata (see describe_sources)
+    """
+
+    __slots__ = ('version', 'content_hash', 'created_at', 'panel', 'sources')
+
+    def __init__(self, panel, sources=None, created_at=None):
+        for array in (panel.days, panel.values, panel.valid):
+            array.flags.writeable = False
+        self.panel = panel
+        self.content_hash = content_hash(panel)
+        self.version = self.content_hash[:VERSION_LENGTH]
+        self.created_at = created_at or datetime.now()
+        self.sources = sources or {}
+
+    def metadata(self):
+        return {
+            'version': self.version,
+            'content_hash': self.content_hash,
+            'created_at': self.created_at.isoformat(timespec='seconds'),
+            'sources': self.sources
+        }
+
+
+class SnapshotStore:
+    """The current snapshot and the most recent earlier ones"""
+
+    def __init__(self, history=SNAPSHOT_HISTORY):
+        self.history = history
+        self._snapshots = OrderedDict()
+        self._current = None
+        self._lock = threading.Lock()
+
+    @property
+    def current(self):
+        return self._current
+
+    def get(self, version):
+        with self._lock:
+            return self._snapshots.get(version)
+
+    def publish(self, snapshot):
+        """
+        Make snapshot current; if its content is already known, the stored
+        snapshot (same version, original creation time) becomes current
+        """
+        with self._lock:
+            if snapshot.version in self._snapshots:
+                snapshot = self._snapshots[snapshot.version]
+            self._snapshots[snapshot.version] = snapshot
+            self._snapshots.move_to_end(snapshot.version)
+            while len(self._snapshots) > self.history:
+                self._snapshots.popitem(last=False)
+            self._current = snapshot
+            return snapshot
+
+    def rollback(self, version=None):
+        """
+        Make an earlier snapshot current (default: the one published before
+        the current one)
+
+        Raises:
+            KeyError: Unknown version or nothing to roll back to
+        """
+        with self._lock:
+            versions = list(self._snapshots)
+            if version is None:
+                position = versions.index(self._current.version) if self._current else -1
+                if position < 1:
+                    raise KeyError('no earlier snapshot')
+                version = versions[position - 1]
+            if version not in self._snapshots:
+                raise KeyError(f"unknown snapshot {version}")
+            self._current = self._snapshots[version]
+            return self._current
+
+    def list(self):
+        """Metadata of the kept snapshots, newest first"""
+        with self._lock:
+            current = self._current.version if self._current else None
+            return [{**snapshot.metadata(), 'current': snapshot.version == current}
+                    for snapshot in reversed(self._snapshots.values())]
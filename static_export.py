@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Static export of the dashboard: one self-contained HTML page with the chart,
+the statistics tiles, the preset ranges and a date range slider
+
+The month-end history of all indexes in every base currency is embedded as
+compact JSON; the page rebases the selected range to 100 and computes the
+statistics in the browser the same way as scale_data and
+calculate_statistics, so it can be served by any static file server or
+CDN without a Python process. The server regenerates it whenever a data
+snapshot is published (CHARTS_STATIC_DIR), or it is written on demand:
+
+Usage:
+    python static_export.py --out-dir dist
+    python static_export.py --out-dir dist --plotlyjs file   # plotly.min.js next to the page
+"""
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+from string import Template
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+from plotly.offline.offline import get_plotlyjs_version
+
+from market_data import INDEXES, BASE_CURRENCIES, convert_to_currency
+from presets import PRESETS, HISTORY_START, preset_start
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Directory the server writes the page to on every new snapshot (unset: off)
+STATIC_DIR = os.environ.get('CHARTS_STATIC_DIR')
+
+# How plotly.js is included: 'inline' (self-contained), 'file' (plotly.min.js
+# next to the page, cached by browsers across refreshes) or 'cdn'
+PLOTLYJS_MODE = os.environ.get('CHARTS_STATIC_PLOTLYJS', 'inline')
+
+# Significant digits of the embedded values
+DIGITS = 6
+
+PAGE = Template("""<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Index-Performance-Vergleich</title>
+<style>
+body { background: #1a1a1a; color: #e0e0e0; padding: 20px; margin: 0; font-family: sans-serif; }
+h1 { margin-bottom: 20px; }
+h2 { margin: 0 0 20px; color: #4da6ff; text-align: center; }
+.controls { display: flex; flex-wrap: wrap; gap: 20px; align-items: center; margin-bottom: 20px; }
+.controls label { color: #b0b0b0; margin-right: 10px; }
+button { margin: 0 5px; background: #2a2a2a; color: #4da6ff; border: 1px solid #4da6ff; border-radius: 3px;
+         padding: 4px 12px; cursor: pointer; }
+button.active { background: #4da6ff; color: #1a1a1a; }
+.range { display: flex; gap: 20px; align-items: center; margin-bottom: 20px; }
+.range input { flex: 1; accent-color: #4da6ff; }
+.range span { color: #4da6ff; min-width: 90px; }
+#chart { height: 600px; }
+.stats { display: flex; flex-wrap: wrap; gap: 10px; justify-content: space-around; margin-top: 20px; }
+.tile { background: linear-gradient(135deg, #2a2a2a 0%, #1a1a1a 100%); border: 1px solid; border-radius: 8px;
+        padding: 20px; margin: 10px; flex: 1; min-width: 200px; box-shadow: 0 4px 6px rgba(0, 0, 0, 0.3); }
+.tile .name { font-size: 18px; font-weight: bold; margin-bottom: 15px; padding-bottom: 10px; border-bottom: 2px solid; }
+.tile .row { display: flex; justify-content: space-between; margin: 10px 0; padding: 8px 0; font-size: 14px;
+             color: #b0b0b0; }
+.tile .row b { font-size: 16px; color: #4da6ff; }
+.footer { margin-top: 10px; text-align: right; font-size: 12px; color: #808080; }
+</style>
+$plotlyjs
+</head>
+<body>
+<h1>🚀 Index-Performance-Vergleich</h1>
+<div class="controls">
+  <div><label>Basiswährung:</label><span id="currencies"></span></div>
+  <div><label>Zeitraum:</label><span id="presets"></span></div>
+</div>
+<div class="range">
+  <span id="start-label"></span><input id="start" type="range" min="0" step="1">
+  <input id="end" type="range" min="0" step="1"><span id="end-label"></span>
+</div>
+<div id="chart"></div>
+<h2>Performance Statistiken</h2>
+<div class="stats" id="stats"></div>
+<div class="footer" id="footer"></div>
+<script id="dashboard-data" type="application/json">$data</script>
+<script>
+(function () {
+  var D = JSON.parse(document.getElementById('dashboard-data').textContent);
+  var dates = D.dates.map(function (d) { return new Date(d + 'T00:00:00Z'); });
+  var last = dates.length - 1;
+  var state = {currency: D.currencies[0], start: 0, end: last};
+  var start = document.getElementById('start'), end = document.getElementById('end');
+  start.max = end.max = last;
+
+  function monthIndex(iso) {
+    // Month-end row of the month containing iso
+    var i = D.dates.findIndex(function (d) { return d.slice(0, 7) >= iso.slice(0, 7); });
+    return i < 0 ? last : i;
+  }
+  function label(i) { return D.dates[i].slice(8, 10) + '.' + D.dates[i].slice(5, 7) + '.' + D.dates[i].slice(0, 4); }
+  function button(text, onclick) {
+    var b = document.createElement('button');
+    b.textContent = text;
+    b.onclick = onclick;
+    return b;
+  }
+  function element(tag, className, text) {
+    // Text only through textContent: asset names are data, not markup
+    var e = document.createElement(tag);
+    e.className = className;
+    e.textContent = text;
+    return e;
+  }
+  function statRow(label, value) {
+    var row = element('div', 'row', '');
+    row.appendChild(element('span', '', label));
+    row.appendChild(element('b', '', value));
+    return row;
+  }
+
+  D.currencies.forEach(function (ccy) {
+    document.getElementById('currencies').appendChild(button(ccy, function () { state.currency = ccy; render(); }));
+  });
+  D.presets.forEach(function (p) {
+    document.getElementById('presets').appendChild(button(p.label, function () {
+      state.start = monthIndex(p.start);
+      state.end = last;
+      render();
+    }));
+  });
+  start.oninput = function () { state.start = Math.min(+start.value, state.end - 1); render(); };
+  end.oninput = function () { state.end = Math.max(+end.value, state.start + 1); render(); };
+
+  function scale(values) {
+    // Same as scale_data: month-ends of the range where any asset has a
+    // value, forward filled, each asset divided by its first value (x 100)
+    var rows = [], series = {};
+    for (var i = state.start; i <= state.end; i++) {
+      if (D.assets.some(function (asset) { return values[asset.name] && values[asset.name][i] !== null; })) {
+        rows.push(i);
+      }
+    }
+    D.assets.forEach(function (asset) {
+      var raw = values[asset.name], out = [], prev = null, base = null;
+      if (!raw) return;
+      rows.forEach(function (i) {
+        var v = raw[i] === null ? prev : raw[i];
+        prev = v;
+        if (base === null && v !== null) base = v;
+        out.push(v === null ? null : v / base * 100);
+      });
+      if (base !== null) series[asset.name] = out;
+    });
+    return {rows: rows, series: series};
+  }
+
+  function render() {
+    var scaled = scale(D.values[state.currency]), rows = scaled.rows, traces = [], tiles = [];
+    var x = rows.map(function (i) { return D.dates[i]; });
+    D.assets.forEach(function (asset) {
+      var y = scaled.series[asset.name];
+      if (!y) return;
+      traces.push({x: x, y: y, mode: 'lines', name: asset.name, line: {color: asset.color, width: 2},
+                   hovertemplate: '%{y:.2f}<extra></extra>'});
+      // Same as calculate_statistics: first valid value to the last row
+      var first = y.findIndex(function (v) { return v !== null; });
+      var firstValue = y[first], lastValue = y[y.length - 1];
+      if (y.length - first < 2 || firstValue <= 0) return;
+      var years = (dates[rows[rows.length - 1]] - dates[rows[first]]) / (365.25 * 864e5);
+      var cagr = years > 0 ? (Math.pow(lastValue / firstValue, 1 / years) - 1) * 100 : 0;
+      var tile = element('div', 'tile', ''), name = element('div', 'name', asset.name);
+      tile.style.borderColor = name.style.color = name.style.borderColor = asset.color;
+      tile.appendChild(name);
+      tile.appendChild(statRow('Kursanstieg:', ((lastValue - firstValue) / firstValue * 100).toFixed(2) + '%'));
+      tile.appendChild(statRow('CAGR:', cagr.toFixed(2) + '%'));
+      tiles.push(tile);
+    });
+    var layout = JSON.parse(JSON.stringify(D.layout));
+    layout.title.text = 'Index Performance Vergleich (Basis 100 in ' + state.currency + ')';
+    Plotly.react('chart', traces, layout, {responsive: true});
+    var stats = document.getElementById('stats');
+    stats.replaceChildren.apply(stats, tiles);
+
+    start.value = state.start;
+    end.value = state.end;
+    document.getElementById('start-label').textContent = label(state.start);
+    document.getElementById('end-label').textContent = label(state.end);
+    var preset = D.presets.find(function (p) { return state.end === last && monthIndex(p.start) === state.start; });
+    document.querySelectorAll('#currencies button').forEach(function (b) {
+      b.className = b.textContent === state.currency ? 'active' : '';
+    });
+    document.querySelectorAll('#presets button').forEach(function (b, i) {
+      b.className = preset && D.presets[i].key === preset.key ? 'active' : '';
+    });
+
+    // Same query parameters as the dashboard (range, from/to, currency)
+    var query = new URLSearchParams();
+    if (!preset) {
+      query.set('from', D.dates[state.start]);
+      query.set('to', D.dates[state.end]);
+    } else if (preset.key !== 'max') {
+      query.set('range', preset.key);
+    }
+    if (state.currency !== D.currencies[0]) query.set('currency', state.currency);
+    try {
+      history.replaceState(null, '', query.toString() ? '?' + query : location.pathname);
+    } catch (e) {
+      // Some browsers refuse to change file:// URLs
+    }
+  }
+
+  var query = new URLSearchParams(location.search);
+  if (D.currencies.indexOf(query.get('currency')) >= 0) state.currency = query.get('currency');
+  var preset = D.presets.find(function (p) { return p.key === query.get('range'); });
+  if (preset) state.start = monthIndex(preset.start);
+  if (query.get('from')) state.start = monthIndex(query.get('from'));
+  if (query.get('to')) state.end = Math.min(monthIndex(query.get('to')), last);
+  if (state.start >= state.end) { state.start = 0; state.end = last; }
+  document.getElementById('footer').textContent = D.footer;
+  render();
+})();
+</script>
+</body>
+</html>
+""")
+
+
+def chart_layout(base_currency):
+    """Plotly layout of the performance chart (dashboard and static page)"""
+    return dict(
+        title=f'Index Performance Vergleich (Basis 100 in {base_currency})',
+        xaxis_title='Datum',
+        yaxis_title='Indexwert (Basis 100)',
+        hovermode='x unified',
+        template='plotly_dark',
+        plot_bgcolor='#1a1a1a',
+        paper_bgcolor='#2a2a2a',
+        font=dict(color='#e0e0e0'),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        margin=dict(l=50, r=50, t=80, b=50)
+    )
+
+
+def _compact(values):
+    """Values with DIGITS significant digits, None for missing"""
+    return [float(f"{v:.{DIGITS}g}") if np.isfinite(v) else None for v in values.tolist()]
+
+
+def month_ends(converted, end):
+    """
+    Last value of every month from HISTORY_START to end, neither forward
+    filled nor rebased (the page does both per range, like scale_data)
+    """
+    df = converted[(converted.index >= pd.Timestamp(HISTORY_START)) & (converted.index <= pd.Timestamp(end))]
+    return df.resample('ME').last().dropna(how='all')
+
+
+def page_data(panels, end, snapshot=None):
+    """
+    Data embedded in the page
+
+    Args:
+        panels: dict currency -> converted month-end values of the full
+            history (see month_ends), all on the same dates
+        end: End of the history (datetime), the end of every preset
+        snapshot: Optional Snapshot the panels were computed from
+    """
+    dates = next(iter(panels.values())).index
+    data = {
+        'dates': [f"{date:%Y-%m-%d}" for date in dates],
+        'currencies': list(panels),
+        'assets': [{'name': idx['name'], 'color': idx['color']}
+                   for idx in INDEXES if any(idx['name'] in df.columns for df in panels.values())],
+        'presets': [{'key': key, 'label': label, 'start': f"{preset_start(key, end):%Y-%m-%d}"}
+                    for key, label, _ in PRESETS],
+        'values': {currency: {name: _compact(df[name].reindex(dates).to_numpy(dtype=np.float64))
+                              for name in df.columns}
+                   for currency, df in panels.items()},
+        'layout': json.loads(go.Figure(layout=chart_layout(next(iter(panels)))).to_json())['layout'],
+        'footer': f"Stand {end:%d.%m.%Y %H:%M}"
+    }
+    if snapshot is not None:
+        data['footer'] = f"Datenstand {snapshot.created_at:%d.%m.%Y %H:%M} · Version {snapshot.version}"
+    return data
+
+
+def render_page(data, plotlyjs=PLOTLYJS_MODE):
+    """HTML of the static page"""
+    if plotlyjs == 'inline':
+        script = f"<script>{get_plotlyjs()}</script>"
+    elif plotlyjs == 'file':
+        script = '<script src="plotly.min.js"></script>'
+    else:
+        script = f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>'
+    # '</' must not end the embedded JSON early
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+    return PAGE.substitute(plotlyjs=script, data=payload)
+
+
+def _write(path, content):
+    """
+    Write atomically, so a static server never serves half a file (the
+    temporary file is unique, so several server processes can export at once)
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        # mkstemp creates the file private; the web server has to read it
+        os.fchmod(fd, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_bundle(html_text, out_dir, plotlyjs=PLOTLYJS_MODE):
+    """
+    Write index.html plus precompressed .gz/.br variants (for gzip_static /
+    brotli_static); returns the path of index.html
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if plotlyjs == 'file' and not os.path.exists(os.path.join(out_dir, 'plotly.min.js')):
+        _write(os.path.join(out_dir, 'plotly.min.js'), get_plotlyjs().encode())
+
+    body = html_text.encode()
+    path = os.path.join(out_dir, 'index.html')
+    _write(f"{path}.gz", gzip.compress(body, compresslevel=9))
+    if brotli is not None:
+        _write(f"{path}.br", brotli.compress(body, quality=9))
+    _write(path, body)
+    return path
+
+
+def export(data_cache, out_dir, snapshot=None, plotlyjs=PLOTLYJS_MODE):
+    """
+    Render the static page from one snapshot of a DataCache (default: the
+    current one); every currency is converted from that snapshot and the
+    presets end at its last day
+
+    Returns:
+        str: Path of index.html
+    """
+    t0 = time.perf_counter()
+    if snapshot is None:
+        data_cache.get_data()
+        snapshot = data_cache.snapshot
+    end = snapshot.panel.dates[-1].to_pydatetime()
+    panels = {currency: month_ends(convert_to_currency(snapshot.panel, currency), end)
+              for currency in BASE_CURRENCIES}
+    path = write_bundle(render_page(page_data(panels, end, snapshot), plotlyjs), out_dir, plotlyjs)
+    print(f"Static dashboard for {snapshot.version} written to {path} "
+          f"({os.path.getsize(path) / 1024:.0f} KB) in {time.perf_counter() - t0:.2f}s")
+    return path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Export the dashboard as a static HTML page')
+    parser.add_argument('--out-dir', default=STATIC_DIR or 'static', help='Output directory')
+    parser.add_argument('--plotlyjs', choices=['inline', 'file', 'cdn'], default=PLOTLYJS_MODE,
+                        help='Embed plotly.js, write it next to the page or load it from the CDN')
+    args = parser.parse_args()
+
+    from data_cache import data_cache
+    export(data_cache, args.out_dir, plotlyjs=args.plotlyjs)
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Out-of-core comparison over the Parquet warehouse
+
+The in-memory path (convert_to_currency -> scale_data -> calculate_statistics)
+holds every series as one pandas object. For universes larger than memory
+the same steps run as a generator pipeline over chunks of the warehouse:
+
+    read_chunks  - close prices of SYMBOL_CHUNK symbols x DATE_CHUNK_YEARS
+                   years at a time (column- and partition-pruned reads)
+    convert      - into the base currency with the (small, in-memory)
+                   exchange rates
+    month_end    - month-end values, forward filled across chunk borders
+    rebase       - base 100 at the first value of each symbol
+
+Statistics are collected in mergeable accumulators (SeriesStats), so memory
+is bounded by the chunk size, not by the universe.
+
+Usage:
+    python streaming.py --currency EUR --symbol-chunk 500 --compare
+"""
+import argparse
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from warehouse import WAREHOUSE_DIR, list_symbols, load_close_panel, load_prices, open_dataset
+
+# Symbols read together (columns of a chunk)
+SYMBOL_CHUNK = 256
+
+# Years read together (rows of a chunk); year partitions are read whole
+DATE_CHUNK_YEARS = 5
+
+
+class SeriesStats:
+    """
+    Running statistics of month-end values per symbol
+
+    update() folds in the next chunk of the same symbols; merge() combines
+    the accumulators of two consecutive date ranges (self first), or of two
+    disjoint symbol sets. Drawdowns merge exactly: a dip in the later range
+    is measured against the earlier peak via its minimum.
+    """
+
+    FIELDS = ('first_date', 'first_value', 'last_date', 'last_value', 'count',
+              'sum_returns', 'sum_squares', 'peak', 'trough', 'max_drawdown')
+
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self.first_date = np.full(n, np.datetime64('NaT'), dtype='datetime64[D]')
+        self.last_date = self.first_date.copy()
+        self.first_value = np.full(n, np.nan)
+        self.last_value = np.full(n, np.nan)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.sum_returns = np.zeros(n)
+        self.sum_squares = np.zeros(n)
+        self.peak = np.full(n, np.nan)
+        self.trough = np.full(n, np.nan)
+        self.max_drawdown = np.zeros(n)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Accumulator of one chunk (month-end values, date x symbol)"""
+        stats = cls(df.columns)
+        values = df.to_numpy(dtype=np.float64)
+        valid = np.isfinite(values) & (values > 0)
+        if not len(values):
+            return stats
+        dates = df.index.to_numpy().astype('datetime64[D]')
+        has = valid.any(axis=0)
+        first = np.argmax(valid, axis=0)
+        last = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+        cols = np.arange(values.shape[1])
+
+        stats.first_date = np.where(has, dates[first], np.datetime64('NaT'))
+        stats.last_date = np.where(has, dates[last], np.datetime64('NaT'))
+        stats.first_value = np.where(has, values[first, cols], np.nan)
+        stats.last_value = np.where(has, values[last, cols], np.nan)
+        stats.count = valid.sum(axis=0)
+
+        # Log returns between consecutive valid values
+        filled = np.where(valid, values, np.nan)
+        previous = pd.DataFrame(filled).ffill().shift(1).to_numpy()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where(valid & np.isfinite(previous), np.log(filled / previous), 0.0)
+            stats.sum_returns = returns.sum(axis=0)
+            stats.sum_squares = (returns ** 2).sum(axis=0)
+            peaks = np.fmax.accumulate(filled, axis=0)
+            stats.peak = np.where(has, np.nanmax(np.where(valid, filled, -np.inf), axis=0), np.nan)
+            stats.trough = np.where(has, np.nanmin(np.where(valid, filled, np.inf), axis=0), np.nan)
+            stats.max_drawdown = np.where(has, np.nanmin(np.where(valid, filled / peaks - 1, 0.0), axis=0), 0.0)
+        return stats
+
+    def update(self, df):
+        """Fold in the next chunk (same symbols, later dates)"""
+        self.merge(SeriesStats.from_frame(df[self.symbols]))
+        return self
+
+    def merge(self, other):
+        """Combine with a later date range of the same symbols, or add other symbols"""
+        if other.symbols != self.symbols:
+            for name in self.FIELDS:
+                setattr(self, name, np.concatenate([getattr(self, name), getattr(other, name)]))
+            self.symbols = self.symbols + other.symbols
+            return self
+
+        before, after = self.count > 0, other.count > 0
+        both = before & after
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # Return across the border and the dip of the later range below the earlier peak
+            border = np.where(both, np.log(other.first_value / self.last_value), 0.0)
+            dip = np.where(both, other.trough / self.peak - 1, 0.0)
+
+        self.sum_returns = self.sum_returns + other.sum_returns + border
+        self.sum_squares = self.sum_squares + other.sum_squares + border ** 2
+        self.max_drawdown = np.minimum(np.minimum(self.max_drawdown, other.max_drawdown), dip)
+        self.peak = np.fmax(self.peak, other.peak)
+        self.trough = np.fmin(self.trough, other.trough)
+        self.first_date = np.where(before, self.first_date, other.first_date)
+        self.first_value = np.where(before, self.first_value, other.first_value)
+        self.last_date = np.where(after, other.last_date, self.last_date)
+        self.last_value = np.where(after, other.last_value, self.last_value)
+        self.count = self.count + other.count
+        return self
+
+    def result(self, periods_per_year=12):
+        """
+        Statistics per symbol like market_data.calculate_statistics, plus
+        annualized volatility and maximum drawdown (all in %)
+        """
+        stats = []
+        for i, symbol in enumerate(self.symbols):
+            if self.count[i] < 2 or not self.first_value[i] > 0:
+                continue
+            years = (self.last_date[i] - self.first_date[i]).astype(int) / 365.25
+            growth = self.last_value[i] / self.first_value[i]
+            returns = self.count[i] - 1
+            variance = (self.sum_squares[i] - self.sum_returns[i] ** 2 / returns) / (returns - 1) if returns > 1 else 0.0
+            stats.append({
+                'name': symbol,
+                'total_return': (growth - 1) * 100,
+                'cagr': (growth ** (1 / years) - 1) * 100 if years > 0 else 0,
+                'volatility': np.sqrt(max(variance, 0) * periods_per_year) * 100,
+                'max_drawdown': self.max_drawdown[i] * 100
+            })
+        return stats
+
+
+def read_chunks(symbols, start=None, end=None, interval='1d', symbol_chunk=SYMBOL_CHUNK,
+                date_chunk_years=DATE_CHUNK_YEARS, warehouse=WAREHOUSE_DIR):
+    """
+    Close prices in chunks (wide DataFrames, date x symbol)
+
+    Yields:
+        tuple: (batch_index, DataFrame) - all date chunks of a symbol batch,
+            in date order, before the next batch
+    """
+    dataset = open_dataset(interval, warehouse)
+    start = pd.Timestamp(start) if start is not None else _first_date(dataset)
+    end = pd.Timestamp(end) if end is not None else pd.Timestamp.now()
+    for batch_index, first in enumerate(range(0, len(symbols), symbol_chunk)):
+        batch = list(symbols[first:first + symbol_chunk])
+        for year in range(start.year, end.year + 1, date_chunk_years):
+            chunk_start = max(start, pd.Timestamp(year=year, month=1, day=1))
+            chunk_end = min(end, pd.Timestamp(year=year + date_chunk_years - 1, month=12, day=31))
+            long_df = load_prices(batch, chunk_start, chunk_end, ('close',), interval, dataset=dataset)
+            if long_df.empty:
+                continue
+            wide = long_df.pivot(index='date', columns='symbol', values='close')
+            yield batch_index, wide.reindex(columns=batch)
+
+
+def _first_date(dataset):
+    """First January of the earliest year partition (from the file paths, no data read)"""
+    years = [int(match.group(1)) for match in map(re.compile(r'year=(\d+)').search, dataset.files) if match]
+    return pd.Timestamp(year=min(years) if years else pd.Timestamp.now().year, month=1, day=1)
+
+
+def convert(chunks, currencies, fx_rates, base_currency='CHF'):
+    """
+    Convert each chunk into the base currency
+
+    Args:
+        currencies: dict symbol -> quote currency (missing: already in base)
+        fx_rates: DataFrame of <currency>/CHF rates (date x currency), small
+            enough to stay in memory
+    """
+    rates = fx_rates.sort_index()
+    for batch_index, chunk in chunks:
+        factors = pd.DataFrame(index=chunk.index)
+        base_rate = _rate(rates, base_currency, chunk.index)
+        for ccy in {currencies.get(symbol, base_currency) for symbol in chunk.columns}:
+            factors[ccy] = _rate(rates, ccy, chunk.index) / base_rate
+        columns = [currencies.get(symbol, base_currency) for symbol in chunk.columns]
+        yield batch_index, chunk * factors[columns].to_numpy()
+
+
+def _rate(rates, ccy, index):
+    """<ccy>/CHF on the given dates (forward filled, back-filled before the first quote)"""
+    if ccy == 'CHF':
+        return pd.Series(1.0, index=index)
+    return rates[ccy].reindex(rates.index.union(index)).ffill().bfill().reindex(index)
+
+
+def month_end(chunks):
+    """Month-end values, forward filled across the borders of a batch's date chunks"""
+    carry = None
+    current = None
+    for batch_index, chunk in chunks:
+        if batch_index != current:
+            carry, current = None, batch_index
+        monthly = chunk.resample('ME').last().dropna(how='all')
+        if carry is not None:
+            monthly = pd.concat([carry.to_frame().T, monthly]).ffill().iloc[1:]
+        else:
+            monthly = monthly.ffill()
+        if len(monthly):
+            carry = monthly.iloc[-1]
+        yield batch_index, monthly
+
+
+def rebase(chunks):
+    """Base 100 at the first month-end value of each symbol in the stream"""
+    base = None
+    current = None
+    for batch_index, chunk in chunks:
+        if batch_index != current:
+            base, current = pd.Series(np.nan, index=chunk.columns), batch_index
+        first = chunk.bfill().iloc[0] if len(chunk) else base
+        base = base.fillna(first)
+        yield batch_index, chunk / base * 100
+
+
+def stream_panel(symbols, start=None, end=None, base_currency='CHF', currencies=None, fx_rates=None,
+                 interval='1d', symbol_chunk=SYMBOL_CHUNK, date_chunk_years=DATE_CHUNK_YEARS,
+                 warehouse=WAREHOUSE_DIR):
+    """
+    Normalized month-end panel as a stream of chunks (the out-of-core
+    counterpart of convert_to_currency + scale_data)
+
+    Yields:
+        tuple: (batch_index, DataFrame) - consecutive chunks of one batch
+            cover consecutive dates
+    """
+    currencies = currencies if currencies is not None else symbol_currencies(symbols)
+    if fx_rates is None:
+        fx_rates = load_fx_rates(set(currencies.values()) | {base_currency}, interval, warehouse)
+    chunks = read_chunks(symbols, start, end, interval, symbol_chunk, date_chunk_years, warehouse)
+    return rebase(month_end(convert(chunks, currencies, fx_rates, base_currency)))
+
+
+def stream_statistics(symbols, start=None, end=None, base_currency='CHF', **kwargs):
+    """Statistics of every symbol from stream_panel(), in symbol order"""
+    total, batch, current = None, None, None
+    for batch_index, chunk in stream_panel(symbols, start, end, base_currency, **kwargs):
+        if batch_index != current:
+            if batch is not None:
+                total = batch if total is None else total.merge(batch)
+            batch, current = SeriesStats(chunk.columns), batch_index
+        batch.update(chunk)
+    if batch is not None:
+        total = batch if total is None else total.merge(batch)
+    return total.result() if total is not None else []
+
+
+def symbol_currencies(symbols):
+    """Quote currency of each symbol from the bundled symbol list (unlisted: base currency)"""
+    from symbol_index import symbol_index
+    currencies = {}
+    for symbol in symbols:
+        record = symbol_index.get(symbol)
+        if record is not None:
+            currencies[symbol] = record['currency']
+    return currencies
+
+
+def load_fx_rates(currencies, interval='1d', warehouse=WAREHOUSE_DIR):
+    """<currency>/CHF rates from the warehouse (symbols <CCY>CHF=X)"""
+    from watchlist import fx_symbol
+    needed = sorted(ccy for ccy in currencies if ccy != 'CHF')
+    if not needed:
+        return pd.DataFrame()
+    closes = load_close_panel([fx_symbol(ccy) for ccy in needed], interval=interval, warehouse=warehouse)
+    missing = [ccy for ccy in needed if fx_symbol(ccy) not in closes.columns]
+    if missing:
+        raise ValueError(f"No exchange rates in the warehouse for {', '.join(missing)}")
+    return closes.rename(columns={fx_symbol(ccy): ccy for ccy in needed})[needed].astype(np.float64)
+
+
+def in_memory_statistics(symbols, start=None, end=None, base_currency='CHF', currencies=None, fx_rates=None,
+                         interval='1d', warehouse=WAREHOUSE_DIR):
+    """Reference: the same statistics with the whole universe loaded at once"""
+    from market_data import scale_data
+    currencies = currencies if currencies is not None else symbol_currencies(symbols)
+    if fx_rates is None:
+        fx_rates = load_fx_rates(set(currencies.values()) | {base_currency}, interval, warehouse)
+    closes = load_close_panel(list(symbols), start, end, interval, warehouse).reindex(columns=list(symbols))
+    converted = next(convert([(0, closes.astype(np.float64))], currencies, fx_rates, base_currency))[1]
+    panel = scale_data(converted, start or converted.index[0], end or converted.index[-1])
+    return SeriesStats.from_frame(panel).result()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Statistics over the warehouse, chunk by chunk')
+    parser.add_argument('symbols', nargs='*', help='Symbols (default: all in the warehouse)')
+    parser.add_argument('--start', default=None)
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--currency', default='CHF', help='Base currency')
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--symbol-chunk', type=int, default=SYMBOL_CHUNK)
+    parser.add_argument('--date-chunk-years', type=int, default=DATE_CHUNK_YEARS)
+    parser.add_argument('--warehouse', default=WAREHOUSE_DIR)
+    parser.add_argument('--compare', action='store_true', help='Also run the in-memory path and compare')
+    args = parser.parse_args()
+
+    symbols = args.symbols or [s for s in list_symbols(args.interval, args.warehouse) if not s.endswith('CHF=X')]
+    options = dict(interval=args.interval, warehouse=args.warehouse)
+
+    t0 = time.perf_counter()
+    stats = stream_statistics(symbols, args.start, args.end, args.currency, symbol_chunk=args.symbol_chunk,
+                              date_chunk_years=args.date_chunk_years, **options)
+    elapsed = time.perf_counter() - t0
+    print(f"Streaming: {len(stats)} symbols in {elapsed:.2f}s "
+          f"({args.symbol_chunk} symbols x {args.date_chunk_years} years per chunk)")
+    for stat in stats[:10]:
+        print(f"  {stat['name']:<14}{stat['total_return']:>10.1f}%{stat['cagr']:>8.2f}%"
+              f"{stat['volatility']:>8.1f}%{stat['max_drawdown']:>8.1f}%")
+
+    if args.compare:
+        t0 = time.perf_counter()
+        reference = in_memory_statistics(symbols, args.start, args.end, args.currency, **options)
+        print(f"In memory: {len(reference)} symbols in {time.perf_counter() - t0:.2f}s")
+        by_name = {stat['name']: stat for stat in reference}
+        worst = max((abs(stat[k] - by_name[stat['name']][k]) for stat in stats if stat['name'] in by_name
+                     for k in ('total_return', 'cagr', 'volatility', 'max_drawdown')), default=0)
+        print(f"Largest difference: {worst:.2e} percentage points")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Offline search over the bundled symbol list (symbols.csv) for the
+autocomplete of the own-symbols input
+
+Two in-memory indexes are built once at import:
+    trie    - every prefix of the symbol and of each name word maps to the
+              matching records, so prefix lookups walk len(query) nodes
+    trigram - typo-tolerant fallback; candidate terms share trigrams with
+              the query and are ranked by their Dice coefficient
+
+Usage:
+    python symbol_index.py nestle "s&p 500" nasdq
+"""
+import csv
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import defaultdict
+
+SYMBOLS_FILE = os.environ.get('CHARTS_SYMBOLS_FILE',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'symbols.csv'))
+
+# Minimum Dice similarity of a fuzzy match
+FUZZY_THRESHOLD = 0.4
+
+# Match kinds in ranking order
+EXACT, SYMBOL_PREFIX, NAME_PREFIX, WORD_PREFIX, FUZZY = range(5)
+
+
+def _normalize(text):
+    """Lowercase without accents"""
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+def _tokens(text):
+    return re.findall(r'[a-z0-9]+', _normalize(text))
+
+
+def _compact(text):
+    return ''.join(_tokens(text))
+
+
+def _trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_symbols(path=SYMBOLS_FILE):
+    """Records (symbol, name, exchange, currency, asset_class) of the symbol list"""
+    with open(path, newline='', encoding='utf-8') as f:
+        return [dict(row) for row in csv.DictReader(f)]
+
+
+class SymbolIndex:
+    """Prefix (trie) and fuzzy (trigram) search over symbol records"""
+
+    def __init__(self, records):
+        self.records = records
+        self._trie = ({}, [])
+        self._terms = []
+        self._term_records = {}
+        self._grams = defaultdict(list)
+
+        for record_id, record in enumerate(records):
+            for term in self._record_terms(record):
+                self._insert(term, record_id)
+                if term not in self._term_records:
+                    self._term_records[term] = []
+                    for gram in _trigrams(term):
+                        self._grams[gram].append(len(self._terms))
+                    self._terms.append(term)
+                if record_id not in self._term_records[term]:
+                    self._term_records[term].append(record_id)
+
+    @classmethod
+    def from_csv(cls, path=SYMBOLS_FILE):
+        return cls(load_symbols(path))
+
+    @staticmethod
+    def _record_terms(record):
+        """Searchable terms: symbol (as typed and alphanumeric only) and name words"""
+        terms = [_normalize(record['symbol']), _compact(record['symbol'])]
+        terms += _tokens(record['name'])
+        terms.append(_compact(record['name']))
+        return [t for t in dict.fromkeys(terms) if t]
+
+    def _insert(self, term, record_id):
+        node = self._trie
+        for char in term:
+            children = node[0]
+            if char not in children:
+                children[char] = ({}, [])
+            node = children[char]
+            if not node[1] or node[1][-1] != record_id:
+                node[1].append(record_id)
+
+    def _prefix(self, prefix):
+        """Record ids with a term starting with prefix"""
+        node = self._trie
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return set()
+        return set(node[1])
+
+    def _kind(self, record, query, compact_query):
+        symbol = _normalize(record['symbol'])
+        if query == symbol or compact_query == _compact(symbol):
+            return EXACT
+        if symbol.startswith(query) or _compact(symbol).startswith(compact_query):
+            return SYMBOL_PREFIX
+        if _compact(record['name']).startswith(compact_query):
+            return NAME_PREFIX
+        return WORD_PREFIX
+
+    def _fuzzy(self, compact_query, exclude):
+        """Record ids of terms similar to the query, best first"""
+        grams = _trigrams(compact_query)
+        shared = defaultdict(int)
+        for gram in grams:
+            for term_id in self._grams.get(gram, ()):
+                shared[term_id] += 1
+
+        best = {}
+        for term_id, count in shared.items():
+            term = self._terms[term_id]
+            score = 2 * count / (len(grams) + len(term) + 1)
+            if score < FUZZY_THRESHOLD:
+                continue
+            for record_id in self._term_records[term]:
+                if record_id not in exclude and score > best.get(record_id, 0):
+                    best[record_id] = score
+        return sorted(best, key=lambda record_id: (-best[record_id], record_id))
+
+    def search(self, query, limit=10, asset_class=None):
+        """
+        Records matching a query, best matches first
+
+        Every query word must prefix a term of the record (or the whole
+        query must prefix the symbol); if that gives fewer than limit
+        results, typo-tolerant matches are appended.
+
+        Args:
+            query: Symbol or name fragment, e.g. 'nesn', 'euro stoxx', 'nasdq'
+            limit: Maximum number of records
+            asset_class: Optional filter ('index', 'equity', 'etf', 'fx', ...)
+        """
+        query = _normalize(query).strip()
+        compact_query = _compact(query)
+        if not compact_query:
+            return []
+
+        words = _tokens(query)
+        matches = set.intersection(*(self._prefix(word) for word in words)) if words else set()
+        matches |= self._prefix(query) | self._prefix(compact_query)
+        if asset_class:
+            matches = {i for i in matches if self.records[i]['asset_class'] == asset_class}
+
+        ranked = sorted(matches, key=lambda i: (self._kind(self.records[i], query, compact_query), i))
+        if len(ranked) < limit and len(compact_query) >= 3:
+            fuzzy = self._fuzzy(compact_query, matches)
+            if asset_class:
+                fuzzy = [i for i in fuzzy if self.records[i]['asset_class'] == asset_class]
+            ranked += fuzzy
+
+        return [self.records[i] for i in ranked[:limit]]
+
+    def get(self, symbol):
+        """Record of an exact symbol, None if not listed"""
+        symbol = symbol.upper()
+        return next((r for r in self.records if r['symbol'].upper() == symbol), None)
+
+
+# Shared index of the bundled symbol list
+symbol_index = SymbolIndex.from_csv()
+
+
+if __name__ == '__main__':
+    for query in sys.argv[1:] or ['nestle', 'euro stoxx', 'nasdq', 'eurchf', 'apple']:
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            results = symbol_index.search(query)
+        elapsed_us = (time.perf_counter() - t0) * 1000
+        print(f"{query!r}: {elapsed_us:.0f} µs per lookup")
+        for record in results:
+            print(f"    {record['symbol']:<12}{record['name']:<45}{record['exchange']:<20}"
+                  f"{record['currency']:<5}{record['asset_class']}")
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Columnar price warehouse: OHLCV bars stored as Parquet, partitioned by
+interval, symbol and year
+
+Layout:
+    warehouse/<interval>/symbol=<symbol>/year=<year>/part-0.parquet
+"""
+import os
+from urllib.parse import quote, unquote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+WAREHOUSE_DIR = os.environ.get(
+    'CHARTS_WAREHOUSE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'warehouse')
+)
+
+# Stored columns with their compact types
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+SCHEMA = pa.schema([
+    ('date', pa.timestamp('s')),
+    ('open', pa.float32()),
+    ('high', pa.float32()),
+    ('low', pa.float32()),
+    ('close', pa.float32()),
+    ('volume', pa.int64()),
+    ('symbol', pa.string()),
+    ('year', pa.int16()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('symbol', pa.string()), ('year', pa.int16())]),
+    flavor='hive'
+)
+
+
+def normalize_bars(df):
+    """
+    Bring a yfinance OHLCV frame into warehouse form
+
+    Returns:
+        DataFrame: Columns date, open, high, low, close, volume
+    """
+    if isinstance(df.columns, pd.MultiIndex):
+        # yf.download returns (field, ticker) columns
+        df = df.droplevel(1, axis=1) if df.columns.nlevels > 1 else df
+    df = df.rename(columns=str.lower)
+
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        # Keep the exchange's local wall time (daily bars stay on their trading date)
+        index = index.tz_localize(None)
+
+    bars = pd.DataFrame({'date': index.as_unit('s')})
+    for col in ['open', 'high', 'low', 'close']:
+        bars[col] = df[col].to_numpy(dtype=np.float32) if col in df.columns else np.float32('nan')
+    volume = df['volume'] if 'volume' in df.columns else pd.Series(0, index=df.index)
+    bars['volume'] = volume.fillna(0).to_numpy(dtype=np.int64)
+
+    return bars.dropna(subset=['close']).reset_index(drop=True)
+
+
+def read_yfinance_csv(path):
+    """
+    Read a CSV written by yf.download(...).to_csv() (three header rows:
+    Price / Ticker / Date)
+    """
+    df = pd.read_csv(path, header=[0, 1], index_col=0, skiprows=[2], parse_dates=True)
+    return normalize_bars(df)
+
+
+def write_bars(bars, symbol, interval, warehouse=WAREHOUSE_DIR):
+    """Write (replace) the bars of one symbol and interval"""
+    table_df = bars.copy()
+    table_df['symbol'] = symbol
+    table_df['year'] = table_df['date'].dt.year.astype(np.int16)
+    table = pa.Table.from_pandas(table_df, schema=SCHEMA, preserve_index=False)
+
+    ds.write_dataset(
+        table,
+        os.path.join(warehouse, interval),
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template='part-{i}.parquet',
+        existing_data_behavior='delete_matching'
+    )
+    return len(table)
+
+
+def write_quarantine(rows, symbol, interval, warehouse=WAREHOUSE_DIR):
+    """
+    Keep bars rejected by the data-quality scan (with their check and
+    detail) outside the warehouse for inspection
+
+    Layout:
+        warehouse/quarantine/<interval>/<symbol>.parquet
+    """
+    path = os.path.join(warehouse, 'quarantine', interval)
+    os.makedirs(path, exist_ok=True)
+    rows.to_parquet(os.path.join(path, f"{quote(symbol, safe='')}.parquet"), index=False)
+    return len(rows)
+
+
+def open_dataset(interval, warehouse=WAREHOUSE_DIR):
+    """Dataset of one interval (file discovery happens here, reuse it for repeated reads)"""
+    return ds.dataset(os.path.join(warehouse, interval), format='parquet',
+                      partitioning=PARTITIONING, schema=SCHEMA)
+
+
+def load_prices(symbols=None, start=None, end=None, columns=('close',), interval='1d',
+                warehouse=WAREHOUSE_DIR, dataset=None):
+    """
+    Load bars for a subset of symbols and dates
+
+    Only the requested columns are read, and only the symbol/year partitions
+    overlapping the request are opened.
+
+    Args:
+        dataset: Optional dataset from open_dataset() (skips the file discovery)
+
+    Returns:
+        DataFrame: Long format with date, symbol and the requested columns
+    """
+    dataset = dataset if dataset is not None else open_dataset(interval, warehouse)
+
+    condition = None
+
+    def add(expr):
+        return expr if condition is None else condition & expr
+
+    if symbols is not None:
+        condition = add(ds.field('symbol').isin(list(symbols)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        condition = add((ds.field('year') >= start.year) & (ds.field('date') >= start.to_datetime64()))
+    if end is not None:
+        end = pd.Timestamp(end)
+        condition = add((ds.field('year') <= end.year) & (ds.field('date') <= end.to_datetime64()))
+
+    table = dataset.to_table(columns=['date', 'symbol', *columns], filter=condition)
+    return table.to_pandas().sort_values(['symbol', 'date'], kind='stable').reset_index(drop=True)
+
+
+def load_close_panel(symbols=None, start=None, end=None, interval='1d', warehouse=WAREHOUSE_DIR):
+    """Close prices as a wide DataFrame (date x symbol)"""
+    long_df = load_prices(symbols, start, end, ('close',), interval, warehouse)
+    return long_df.pivot(index='date', columns='symbol', values='close')
+
+
+def list_symbols(interval='1d', warehouse=WAREHOUSE_DIR):
+    """Symbols stored for an interval (from the partition directories)"""
+    path = os.path.join(warehouse, interval)
+    if not os.path.isdir(path):
+        return []
+    return sorted(unquote(name.split('=', 1)[1]) for name in os.listdir(path) if name.startswith('symbol='))
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+User-defined symbols next to the built-in indexes
+
+Each browser keeps its own watchlist (symbol + quote currency). Price
+histories are fetched on demand and shared by all users in one
+size-limited LRU cache: a symbol on many watchlists is downloaded once,
+concurrent requests for it wait on the same download, and the least
+recently used symbols are evicted once the cache is full. Downloads pass
+the same data-quality scan as the index data before they are cached;
+failed downloads are remembered for a short time.
+"""
+import os
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from data_cache import DATA_SOURCE, DATA_TTL
+from data_quality import validate_panel, print_report
+from price_panel import PricePanel
+
+# Symbols kept in memory (each about 25 KB for 25 years of daily closes)
+SYMBOL_CACHE_SIZE = int(os.environ.get('CHARTS_SYMBOL_CACHE_SIZE', '200'))
+
+# Seconds a failed download (unknown symbol, no data) is not retried
+SYMBOL_ERROR_TTL = int(os.environ.get('CHARTS_SYMBOL_ERROR_TTL', '300'))
+
+# Concurrent downloads from the upstream source
+FETCH_WORKERS = int(os.environ.get('CHARTS_FETCH_WORKERS', '4'))
+
+# Entries per watchlist
+MAX_WATCHLIST = 10
+
+# Line colors of the user symbols, in order of addition
+WATCHLIST_COLORS = ['rgb(186, 104, 200)', 'rgb(255, 138, 101)', 'rgb(77, 208, 225)', 'rgb(174, 213, 129)',
+                    'rgb(240, 98, 146)', 'rgb(121, 134, 203)', 'rgb(255, 241, 118)', 'rgb(161, 136, 127)',
+                    'rgb(128, 203, 196)', 'rgb(224, 224, 224)']
+
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9^=.\-]{1,20}$')
+CURRENCY_PATTERN = re.compile(r'^[A-Z]{3}$')
+
+
+def fx_symbol(currency):
+    """Yahoo symbol of the <currency>/CHF exchange rate"""
+    return f"{currency}CHF=X"
+
+
+def fetch_symbol(symbol):
+    """Daily closes of a symbol since 2000 from yfinance (float32)"""
+    data = yf.download(symbol, start='2000-01-01', end=datetime.now().strftime('%Y-%m-%d'),
+                       progress=False, auto_adjust=True)
+    if data.empty:
+        raise ValueError(f"No data for {symbol}")
+    close = data['Close']
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+    return close.dropna().astype(np.float32)
+
+
+def fetch_offline_symbol(symbol):
+    """Deterministic synthetic closes for any symbol (no network)"""
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()))
+    dates = pd.bdate_range('2000-01-03', datetime.now())
+    drift, vol, start = (0.0, 0.004, 1.0) if symbol.endswith('=X') else (0.0003, 0.015, 100.0)
+    return pd.Series(start * np.exp(np.cumsum(rng.normal(drift, vol, len(dates)))), index=dates).astype(np.float32)
+
+
+def default_symbol_fetch(symbol):
+    """Symbol fetch function selected by CHARTS_DATA_SOURCE"""
+    if DATA_SOURCE == 'offline':
+        return fetch_offline_symbol(symbol)
+    return fetch_symbol(symbol)
+
+
+def validate_series(symbol, series):
+    """
+    Series without the points quarantined by the data-quality scan
+
+    Raises:
+        ValueError: No valid quote left
+    """
+    panel, report = validate_panel(PricePanel.from_series({symbol: series}))
+    if report['issues']:
+        print_report(report, f"Data quality {symbol}")
+    series = panel.series(symbol)
+    if not len(series):
+        raise ValueError(f"No valid data for {symbol}")
+    return series
+
+
+def parse_entry(symbol, currency):
+    """
+    Validated watchlist entry
+
+    Raises:
+        ValueError: Malformed symbol or currency
+    """
+    symbol = (symbol or '').strip().upper()
+    currency = (currency or '').strip().upper()
+    if not SYMBOL_PATTERN.match(symbol):
+        raise ValueError(f"Ungültiges Symbol: {symbol or '(leer)'}")
+    if not CURRENCY_PATTERN.match(currency):
+        raise ValueError(f"Ungültige Währung: {currency or '(leer)'}")
+    return {'symbol': symbol, 'currency': currency}
+
+
+class SymbolCache:
+    """
+    Shared LRU cache of daily close series per symbol
+
+    Downloads run on a bounded thread pool; a symbol that is already being
+    downloaded is not requested again, and one whose download failed is
+    not requested again for error_ttl seconds.
+    """
+
+    def __init__(self, fetch=default_symbol_fetch, max_symbols=SYMBOL_CACHE_SIZE, workers=FETCH_WORKERS, ttl=DATA_TTL,
+                 error_ttl=SYMBOL_ERROR_TTL):
+        self.fetch = fetch
+        self.max_symbols = max_symbols
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.fetches = 0
+        self._entries = OrderedDict()
+        self._failures = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='symbol-fetch')
+
+    def _load(self, symbol):
+        try:
+            try:
+                series = validate_series(symbol, self.fetch(symbol))
+            except Exception as e:
+                with self._lock:
+                    self.fetches += 1
+                    self._failures[symbol] = (time.time(), str(e))
+                    self._failures.move_to_end(symbol)
+                    while len(self._failures) > self.max_symbols:
+                        self._failures.popitem(last=False)
+                raise
+            with self._lock:
+                self.fetches += 1
+                self._failures.pop(symbol, None)
+                self._entries[symbol] = (time.time(), series)
+                self._entries.move_to_end(symbol)
+                while len(self._entries) > self.max_symbols:
+                    self._entries.popitem(last=False)
+            return series
+        finally:
+            with self._lock:
+                self._pending.pop(symbol, None)
+
+    def get_many(self, symbols):
+        """
+        Close series of several symbols, downloading missing ones in parallel
+
+        Returns:
+            tuple: ({symbol: Series}, {symbol: error message})
+        """
+        results, waiting, errors = {}, {}, {}
+        now = time.time()
+        with self._lock:
+            for symbol in dict.fromkeys(symbols):
+                entry = self._entries.get(symbol)
+                if entry is not None and now - entry[0] <= self.ttl:
+                    self._entries.move_to_end(symbol)
+                    results[symbol] = entry[1]
+                    continue
+                failure = self._failures.get(symbol)
+                if failure is not None and now - failure[0] <= self.error_ttl:
+                    errors[symbol] = failure[1]
+                    continue
+                if symbol not in self._pending:
+                    self._pending[symbol] = self._pool.submit(self._load, symbol)
+                waiting[symbol] = self._pending[symbol]
+
+        for symbol, future in waiting.items():
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                errors[symbol] = str(e)
+        return results, errors
+
+
+def convert_watchlist(entries, base_currency='CHF', cache=None):
+    """
+    Watchlist symbols converted to the base currency (daily, unfiltered)
+
+    Args:
+        entries: List of {'symbol', 'currency'} dicts
+        base_currency: Target currency
+        cache: SymbolCache (default: the shared symbol_cache)
+
+    Returns:
+        tuple: (DataFrame with one column per symbol, {symbol: error message})
+    """
+    cache = cache or symbol_cache
+    rates = {fx_symbol(ccy) for ccy in [base_currency] + [e['currency'] for e in entries] if ccy != 'CHF'}
+    series, errors = cache.get_many([e['symbol'] for e in entries] + sorted(rates))
+    panel = PricePanel.from_series(series)
+
+    converted = {}
+    for entry in entries:
+        symbol, currency = entry['symbol'], entry['currency']
+        if not panel.has_data(symbol):
+            continue
+        needed = [fx_symbol(ccy) for ccy in (currency, base_currency) if ccy != 'CHF']
+        missing = [rate for rate in needed if not panel.has_data(rate)]
+        if missing:
+            errors.setdefault(symbol, f"Kein Wechselkurs {', '.join(missing)}")
+            continue
+
+        values = panel.column(symbol)
+        if currency != 'CHF':
+            values = values * panel.filled(fx_symbol(currency))
+        if base_currency != 'CHF':
+            values = values / panel.filled(fx_symbol(base_currency))
+        converted[symbol] = values
+
+    return pd.DataFrame(converted, index=panel.dates), errors
+
+
+# Shared instance for the server process
+symbol_cache = SymbolCache()